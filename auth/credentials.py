@@ -1,14 +1,28 @@
+import asyncio
 import json
 import os
+import threading
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
 
+import httpx
 import requests
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 
+from utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are only coordinated within a process
+    fcntl = None
+
+STRAVA_TOKEN_URL = "https://www.strava.com/oauth/token"
+REFRESH_MARGIN = 300  # Refresh tokens expiring within 5 minutes
+
 
 @dataclass
 class StravaCredentials:
@@ -16,14 +30,36 @@ class StravaCredentials:
     refresh_token: str
     expires_at: int
 
+    def expiring(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return self.expires_at <= int(now) + REFRESH_MARGIN
+
 
 class CredentialStore:
+    """Encrypted Strava credentials with single-flight token refresh.
+
+    Decrypted credentials are cached in memory until the file's inode, mtime or
+    size changes, so checking the token costs one ``stat``. Refreshes hold a lock
+    file next to the credentials and re-check the token once they have it:
+    concurrent callers, in this process or others, wait for the first refresh
+    and reuse its token instead of racing on the refresh token.
+    """
+
     def __init__(
         self,
         config_dir: Optional[Path] = None,
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
+        """Initialize CredentialStore.
+
+        Args:
+            config_dir: Directory for the key and credentials. Defaults to ~/.running_coach
+            client_id: Strava client ID. Defaults to STRAVA_CLIENT_ID
+            client_secret: Strava client secret. Defaults to STRAVA_CLIENT_SECRET
+            transport: Optional httpx transport for async refreshes, e.g. for tests
+        """
         load_dotenv()  # Load environment variables from .env
 
         # Get credentials from parameters or environment
@@ -49,6 +85,13 @@ class CredentialStore:
         self._init_encryption_key()
         self.fernet = Fernet(self._load_key())
 
+        self.creds_path = self.config_dir / "strava_creds"
+        self.lock_path = self.config_dir / "strava_creds.lock"
+        self.transport = transport
+        self._cached: Optional[Tuple[Tuple[int, int, int], StravaCredentials]] = None
+        self._thread_lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+
     def _init_encryption_key(self) -> None:
         """Initialize encryption key if it doesn't exist"""
         if not self.key_path.exists():
@@ -69,31 +112,89 @@ class CredentialStore:
         }
         encrypted = self.fernet.encrypt(json.dumps(data).encode())
 
-        creds_path = self.config_dir / "strava_creds"
-        creds_path.write_bytes(encrypted)
-        os.chmod(creds_path, 0o600)
+        # Write a new file and swap it in, so readers never see a partial token
+        tmp_path = self.creds_path.with_name(f".strava_creds.{os.getpid()}.tmp")
+        tmp_path.write_bytes(encrypted)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.creds_path)
+        self._cached = (self._signature(), creds)
 
     def load_strava_credentials(self) -> Optional[StravaCredentials]:
-        """Load and decrypt Strava credentials"""
-        creds_path = self.config_dir / "strava_creds"
-        if not creds_path.exists():
+        """Load and decrypt Strava credentials, cached until the file changes"""
+        signature = self._signature()
+        if signature is None:
+            self._cached = None
             return None
+        if self._cached is not None and self._cached[0] == signature:
+            return self._cached[1]
 
-        encrypted = creds_path.read_bytes()
+        encrypted = self.creds_path.read_bytes()
         data = json.loads(self.fernet.decrypt(encrypted))
 
-        return StravaCredentials(
+        creds = StravaCredentials(
             access_token=data["access_token"],
             refresh_token=data["refresh_token"],
             expires_at=data["expires_at"],
         )
+        self._cached = (signature, creds)
+        return creds
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the credentials file, None if it doesn't exist.
+
+        Saves replace the file, so the inode changes even when another process
+        writes within the filesystem's mtime resolution.
+        """
+        try:
+            stat = self.creds_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
 
     def needs_refresh(self) -> bool:
         """Check if token needs refresh (buffer of 5 minutes)"""
         creds = self.load_strava_credentials()
         if not creds:
             return True
-        return creds.expires_at <= int(time.time()) + 300  # 5 min buffer
+        return creds.expiring()
+
+    def _acquire_file_lock(self) -> IO[str]:
+        """Exclusive lock shared with other processes using this config_dir"""
+        lock_file = open(self.lock_path, "a")
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _release_file_lock(lock_file: IO[str]) -> None:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        lock_file = self._acquire_file_lock()
+        try:
+            yield
+        finally:
+            self._release_file_lock(lock_file)
+
+    def _refresh_data(self, refresh_token: str) -> Dict[str, Any]:
+        return {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+        }
+
+    def _store_refreshed(self, data: Dict[str, Any]) -> StravaCredentials:
+        creds = StravaCredentials(
+            access_token=data["access_token"],
+            refresh_token=data["refresh_token"],
+            expires_at=data["expires_at"],
+        )
+        self.save_strava_credentials(creds)
+        return creds
 
     def refresh_token(self) -> Tuple[bool, Optional[str]]:
         """
@@ -107,27 +208,17 @@ class CredentialStore:
         if not creds:
             return False, "No credentials found"
 
-        response = requests.post(
-            "https://www.strava.com/oauth/token",
-            data={
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "grant_type": "refresh_token",
-                "refresh_token": creds.refresh_token,
-            },
-        )
+        with metrics.span("auth.refresh", mode="sync"):
+            response = requests.post(
+                STRAVA_TOKEN_URL, data=self._refresh_data(creds.refresh_token)
+            )
 
         if response.status_code != 200:
+            metrics.inc("credential_refreshes_total", outcome="error")
             return False, f"Token refresh failed: {response.text}"
+        metrics.inc("credential_refreshes_total", outcome="ok")
 
-        data = response.json()
-        new_creds = StravaCredentials(
-            access_token=data["access_token"],
-            refresh_token=data["refresh_token"],
-            expires_at=data["expires_at"],
-        )
-
-        self.save_strava_credentials(new_creds)
+        self._store_refreshed(response.json())
         return True, None
 
     def get_valid_token(self) -> Tuple[Optional[str], Optional[str]]:
@@ -135,13 +226,75 @@ class CredentialStore:
         Get a valid access token, refreshing if necessary
         Returns: (token, error_message)
         """
-        if self.needs_refresh():
-            success, error = self.refresh_token()
-            if not success:
-                return None, error
-
         creds = self.load_strava_credentials()
+        if creds is None:
+            return None, "No credentials found"
+        if not creds.expiring():
+            return creds.access_token, None
+
+        with self._thread_lock, self._file_lock():
+            # Another thread or process may have refreshed while we waited
+            if self.needs_refresh():
+                success, error = self.refresh_token()
+                if not success:
+                    return None, error
+            creds = self.load_strava_credentials()
+
         if not creds:
             return None, "No credentials found"
 
         return creds.access_token, None
+
+    async def aget_valid_token(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get a valid access token without blocking the event loop
+        Returns: (token, error_message)
+        """
+        creds = self.load_strava_credentials()
+        if creds is None:
+            return None, "No credentials found"
+        if not creds.expiring():
+            return creds.access_token, None
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            creds = self.load_strava_credentials()
+            if creds is not None and not creds.expiring():
+                return creds.access_token, None
+            # Only the coroutine holding the async lock waits on the file lock
+            loop = asyncio.get_running_loop()
+            acquiring = loop.run_in_executor(None, self._acquire_file_lock)
+            try:
+                lock_file = await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # The thread still takes the lock; let go of it once it does
+                acquiring.add_done_callback(
+                    lambda done: done.exception()
+                    or self._release_file_lock(done.result())
+                )
+                raise
+            try:
+                return await self._arefresh()
+            finally:
+                self._release_file_lock(lock_file)
+
+    async def _arefresh(self) -> Tuple[Optional[str], Optional[str]]:
+        """Refresh under the file lock unless another process already has"""
+        creds = self.load_strava_credentials()
+        if creds is None:
+            return None, "No credentials found"
+        if not creds.expiring():
+            return creds.access_token, None
+
+        with metrics.span("auth.refresh", mode="async"):
+            async with httpx.AsyncClient(transport=self.transport) as client:
+                response = await client.post(
+                    STRAVA_TOKEN_URL, data=self._refresh_data(creds.refresh_token)
+                )
+        if response.status_code != 200:
+            metrics.inc("credential_refreshes_total", outcome="error")
+            return None, f"Token refresh failed: {response.text}"
+        metrics.inc("credential_refreshes_total", outcome="ok")
+
+        return self._store_refreshed(response.json()).access_token, None
@@ -0,0 +1,222 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .credentials import CredentialStore
+
+STRAVA_API_URL = "https://www.strava.com/api/v3"
+
+# Stream types requested for each activity
+STREAM_KEYS = (
+    "time",
+    "distance",
+    "latlng",
+    "altitude",
+    "velocity_smooth",
+    "heartrate",
+    "cadence",
+    "watts",
+    "temp",
+    "moving",
+    "grade_smooth",
+)
+
+SHORT_WINDOW = 15 * 60
+DAILY_WINDOW = 24 * 60 * 60
+
+
+class StravaError(Exception):
+    """Strava API request failed"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Strava API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+def _parse_pair(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse a "15-minute,daily" header value"""
+    if not value:
+        return None
+    try:
+        short, daily = value.split(",")
+        return int(short), int(daily)
+    except ValueError:
+        return None
+
+
+class StravaRateLimiter:
+    """Paces requests to stay within Strava's 15-minute and daily limits.
+
+    Strava reports limits and usage for both windows on every response, and
+    the windows reset at quarter hours and at midnight UTC. The limiter
+    counts requests locally, corrects the counts from those headers, and
+    when a window is spent it waits for the reset instead of failing.
+    Read requests use the stricter ``X-ReadRateLimit-*`` headers when present.
+    """
+
+    def __init__(
+        self,
+        short_limit: int = 100,
+        daily_limit: int = 1000,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """Initialize StravaRateLimiter.
+
+        Args:
+            short_limit: Requests per 15 minutes until a response reports the limit
+            daily_limit: Requests per day until a response reports the limit
+            clock: Wall-clock time source, injectable for tests
+            sleep: Async sleep function, injectable for tests
+        """
+        self.limits = [short_limit, daily_limit]
+        self.usage = [0, 0]
+        self._clock = clock
+        self._sleep = sleep
+        self._windows = self._current_windows()
+        self._lock = asyncio.Lock()
+
+    def _current_windows(self) -> List[int]:
+        now = self._clock()
+        return [int(now // SHORT_WINDOW), int(now // DAILY_WINDOW)]
+
+    def _roll(self) -> None:
+        """Reset the usage of any window that has ended"""
+        windows = self._current_windows()
+        for i in range(2):
+            if windows[i] != self._windows[i]:
+                self.usage[i] = 0
+        self._windows = windows
+
+    def _wait_time(self) -> float:
+        """Seconds until the next request fits both windows"""
+        now = self._clock()
+        if self.usage[1] >= self.limits[1]:
+            return (self._windows[1] + 1) * DAILY_WINDOW - now
+        if self.usage[0] >= self.limits[0]:
+            return (self._windows[0] + 1) * SHORT_WINDOW - now
+        return 0.0
+
+    async def acquire(self) -> None:
+        """Wait until a request fits both windows and count it"""
+        async with self._lock:
+            while True:
+                self._roll()
+                wait = self._wait_time()
+                if wait <= 0:
+                    self.usage[0] += 1
+                    self.usage[1] += 1
+                    return
+                await self._sleep(wait)
+
+    def update(self, headers: httpx.Headers) -> None:
+        """Correct limits and usage from a response's rate-limit headers"""
+        limits = _parse_pair(headers.get("X-ReadRateLimit-Limit")) or _parse_pair(
+            headers.get("X-RateLimit-Limit")
+        )
+        usage = _parse_pair(headers.get("X-ReadRateLimit-Usage")) or _parse_pair(
+            headers.get("X-RateLimit-Usage")
+        )
+        self._roll()
+        if limits:
+            self.limits = list(limits)
+        if usage:
+            # Local counts include requests still in flight, so never lower them
+            self.usage = [max(mine, theirs) for mine, theirs in zip(self.usage, usage)]
+
+    def exhaust(self) -> None:
+        """Mark the 15-minute window as spent, e.g. after a 429 response"""
+        self._roll()
+        self.usage[0] = max(self.usage[0], self.limits[0])
+
+
+class StravaClient:
+    """Async Strava API client sharing one pooled HTTP client across requests"""
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = STRAVA_API_URL,
+        rate_limiter: Optional[StravaRateLimiter] = None,
+        max_connections: int = 8,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """Initialize StravaClient.
+
+        Args:
+            access_token: OAuth access token of the athlete
+            base_url: API root, e.g. a local mock server in tests
+            rate_limiter: Shared limiter. Defaults to a new StravaRateLimiter
+            max_connections: Size of the HTTP connection pool
+            timeout: Request timeout in seconds
+            transport: Optional httpx transport, e.g. httpx.MockTransport
+        """
+        self.access_token = access_token
+        self.rate_limiter = rate_limiter or StravaRateLimiter()
+        self.requests_made = 0
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    @classmethod
+    def from_credentials(cls, store: CredentialStore, **kwargs: Any) -> "StravaClient":
+        """Create a client with a valid token from the credential store"""
+        token, error = store.get_valid_token()
+        if token is None:
+            raise StravaError(401, error or "No credentials found")
+        return cls(token, **kwargs)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET a JSON resource, waiting out rate limits instead of failing"""
+        while True:
+            await self.rate_limiter.acquire()
+            response = await self._client.get(path, params=params)
+            self.requests_made += 1
+            self.rate_limiter.update(response.headers)
+            if response.status_code == 429:
+                self.rate_limiter.exhaust()
+                continue
+            if response.status_code != 200:
+                raise StravaError(response.status_code, response.text)
+            return response.json()
+
+    async def list_activities(
+        self, after: Optional[int] = None, page: int = 1, per_page: int = 200
+    ) -> List[Dict[str, Any]]:
+        """One page of the athlete's activity summaries, oldest first after ``after``"""
+        params: Dict[str, Any] = {"page": page, "per_page": per_page}
+        if after is not None:
+            params["after"] = after
+        return await self.get("/athlete/activities", params)
+
+    async def get_activity(self, activity_id: int) -> Dict[str, Any]:
+        """Detailed representation of one activity"""
+        return await self.get(f"/activities/{activity_id}")
+
+    async def get_streams(
+        self, activity_id: int, keys: Sequence[str] = STREAM_KEYS
+    ) -> Dict[str, Any]:
+        """Time-series streams of one activity, keyed by stream type"""
+        return await self.get(
+            f"/activities/{activity_id}/streams",
+            {"keys": ",".join(keys), "key_by_type": "true"},
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "StravaClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
@@ -0,0 +1,85 @@
+"""Throughput of the workout analytics over batches of activities.
+
+Summarizes synthetic activities (time, distance, HR, velocity and grade at
+1 Hz) batch by batch, and compares the batched engine against calling it
+once per activity.
+
+Run from the repository root:
+
+    python -m benchmarks.analytics --activities 1000 100000
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from data import analytics
+from data.analytics import ActivityBatch
+
+
+def synthetic_batch(count: int, samples: int, rng: np.random.Generator) -> List[dict]:
+    runs = []
+    lengths = rng.integers(samples // 2, samples * 3 // 2, count)
+    for n in lengths:
+        velocity = np.clip(rng.normal(3.2, 0.3) + rng.normal(0, 0.2, n), 0.5, None)
+        runs.append(
+            {
+                "time": np.arange(n, dtype=float),
+                "distance": np.cumsum(velocity),
+                "heartrate": 135 + np.arange(n) / 200 + rng.normal(0, 2, n),
+                "velocity_smooth": velocity,
+                "grade_smooth": rng.normal(0, 3, n),
+            }
+        )
+    return runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--activities", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--samples", type=int, default=3600)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # One pool of synthetic activities, cycled to reach the larger sizes
+    pool = [
+        synthetic_batch(args.batch_size, args.samples, rng)
+        for _ in range(min(4, max(args.activities) // args.batch_size or 1))
+    ]
+
+    for total in args.activities:
+        elapsed = 0.0
+        samples = 0
+        for b in range(0, total, args.batch_size):
+            runs = pool[(b // args.batch_size) % len(pool)][: total - b]
+            start = time.perf_counter()
+            batch = ActivityBatch.from_streams(runs)
+            analytics.summarize(batch)
+            elapsed += time.perf_counter() - start
+            samples += len(batch.time)
+        print(
+            f"{total:>7} activities: {elapsed:7.2f} s, "
+            f"{total / elapsed:8.0f} activities/s, "
+            f"{samples / elapsed / 1e6:5.1f} M samples/s"
+        )
+
+    runs = pool[0][:200]
+    start = time.perf_counter()
+    for run in runs:
+        analytics.summarize(ActivityBatch.from_streams([run]))
+    single = (time.perf_counter() - start) / len(runs)
+    start = time.perf_counter()
+    analytics.summarize(ActivityBatch.from_streams(runs))
+    batched = (time.perf_counter() - start) / len(runs)
+    print(
+        f"per activity: {single * 1000:.2f} ms one at a time, "
+        f"{batched * 1000:.2f} ms batched"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Recall vs latency of IVFIndex against exact search.
+
+Run from the repository root:
+
+    python -m benchmarks.ann_recall --size 100000 --dim 64
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from data.vector_store.ann import IVFIndex
+from data.vector_store.utils import squared_l2, top_k
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=n)
+    return (centers[labels] + rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=256)
+    parser.add_argument(
+        "--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic_embeddings(args.size, args.dim, 100, args.seed)
+    norms = np.einsum("ij,ij->i", data, data)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = data[rng.choice(args.size, args.queries, replace=False)]
+    queries = queries + rng.normal(scale=0.5, size=queries.shape).astype(np.float32)
+
+    start = time.perf_counter()
+    exact = [
+        set(top_k(squared_l2(data, norms, q), args.limit).tolist()) for q in queries
+    ]
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+    index = IVFIndex(n_lists=args.n_lists, seed=args.seed)
+    start = time.perf_counter()
+    index.add_many([str(i) for i in range(args.size)], data)
+    if not index.is_trained:
+        index.train()
+    build_s = time.perf_counter() - start
+
+    print(f"vectors={args.size} dim={args.dim} n_lists={args.n_lists}")
+    print(f"build: {build_s:.2f}s  exact search: {exact_ms:.3f} ms/query")
+    print(
+        f"{'n_probe':>8} {'recall@' + str(args.limit):>10} {'ms/query':>10} {'speedup':>8}"
+    )
+    for n_probe in args.n_probe:
+        start = time.perf_counter()
+        hits = [index.search(q, args.limit, n_probe=n_probe) for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / args.queries
+        recall = np.mean(
+            [
+                len(truth & {int(id) for id, _ in found}) / args.limit
+                for truth, found in zip(exact, hits)
+            ]
+        )
+        print(f"{n_probe:>8} {recall:>10.3f} {ms:>10.3f} {exact_ms / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Packing time and tokens used per prompt for context packing.
+
+Compares the former first-fit truncation (word counts, stop at the first item
+that does not fit) with relevance-ordered packing, counting with the offline
+RegexTokenizer estimate and, with GEMINI_API_KEY set, with Gemini's
+countTokens. Prompts over budget are judged by the real count of each packed
+context as sent, so the estimate is checked rather than graded against
+itself; without an API key that column is not measured.
+
+Run from the repository root:
+
+    GEMINI_API_KEY=... python -m benchmarks.context_packing --items 500 --prompts 100
+"""
+
+import argparse
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from llm.context import ContextItem, pack_context
+from llm.tokenizer import MemoizedTokenizer, RegexTokenizer, Tokenizer
+
+MAX_CONTEXT_TOKENS = int(30720 * 0.8)
+
+
+def synthetic_workouts(n: int, rng: np.random.Generator) -> List[str]:
+    texts = []
+    for i in range(n):
+        km = rng.uniform(3, 42)
+        pace = rng.uniform(240, 420)
+        splits = ", ".join(
+            f"{int(p // 60)}:{int(p % 60):02d}/km"
+            for p in pace + rng.normal(0, 10, size=int(km))
+        )
+        texts.append(
+            f"Workout {i}: {km:.1f}km at {int(pace // 60)}:{int(pace % 60):02d}/km, "
+            f"avg HR {int(rng.uniform(120, 175))}bpm. Splits: {splits}"
+        )
+    return texts
+
+
+def first_fit(texts: List[str], max_tokens: int) -> List[str]:
+    packed, used = [], 0
+    for text in texts:
+        tokens = len(text.split())
+        if used + tokens > max_tokens:
+            break
+        packed.append(text)
+        used += tokens
+    return packed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--prompts", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    texts = synthetic_workouts(args.items, rng)
+    embeddings = rng.normal(size=(args.items, args.dim)).astype(np.float32)
+    estimate = RegexTokenizer()
+    real: Optional[Tokenizer] = None
+    if os.getenv("GEMINI_API_KEY"):
+        from llm.gemini import GeminiTokenizer
+
+        real = GeminiTokenizer()
+    else:
+        print("GEMINI_API_KEY is not set: prompts over budget are not measured")
+
+    # Each prompt retrieves a random, relevance-scored subset of the history
+    prompts = []
+    for _ in range(args.prompts):
+        chosen = rng.choice(args.items, size=args.items // 2, replace=False)
+        scores = rng.random(len(chosen))
+        prompts.append(
+            [ContextItem(texts[i], s, embeddings[i]) for i, s in zip(chosen, scores)]
+        )
+
+    if real is not None:
+        ratios = np.array(estimate.count_many(texts)) / real.count_many(texts)
+        print(
+            f"RegexTokenizer / countTokens per item: mean {ratios.mean():.2f}, "
+            f"min {ratios.min():.2f}"
+        )
+
+    def report(name, seconds, packed):
+        tokens = [sum(estimate.count_many(texts)) for texts in packed]
+        line = (
+            f"{name:<40} {seconds * 1000 / args.prompts:8.2f} ms/prompt "
+            f"{np.mean(tokens):9.0f} estimated tokens/prompt"
+        )
+        if real is not None:
+            # The context as the model sees it, separators included
+            sent = real.count_many(["\n".join(texts) for texts in packed])
+            over = sum(t > MAX_CONTEXT_TOKENS for t in sent)
+            line += f" {np.mean(sent):9.0f} real tokens/prompt {over:4d} over budget"
+        print(line)
+
+    start = time.perf_counter()
+    packed = [
+        first_fit([item.text for item in items], MAX_CONTEXT_TOKENS)
+        for items in prompts
+    ]
+    report("first-fit (word count)", time.perf_counter() - start, packed)
+
+    tokenizers = [("estimate", estimate)]
+    if real is not None:
+        tokenizers.append(("countTokens", real))
+    for counter, base in tokenizers:
+        for name, mmr_lambda in (("relevance", None), ("relevance + MMR 0.7", 0.7)):
+            tokenizer = MemoizedTokenizer(base)
+            for label in ("cold", "warm"):
+                start = time.perf_counter()
+                packed = [
+                    [
+                        item.text
+                        for item in pack_context(
+                            items, MAX_CONTEXT_TOKENS, tokenizer, mmr_lambda
+                        )[0]
+                    ]
+                    for items in prompts
+                ]
+                report(
+                    f"{name}, {counter} ({label})",
+                    time.perf_counter() - start,
+                    packed,
+                )
+
+
+if __name__ == "__main__":
+    main()
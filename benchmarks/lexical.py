@@ -0,0 +1,115 @@
+"""Latency of BM25 lexical search and hybrid retrieval over workout notes.
+
+Indexes synthetic workout notes in a ``HybridStore`` over a ``NumpyStore``
+and reports per-query latency of the bare BM25 index, of ``search_text``
+(index plus fetching the records) and of ``hybrid_search`` with a
+precomputed query embedding, as well as incremental write cost.
+
+Run from the repository root:
+
+    python -m benchmarks.lexical --n 50000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+import numpy as np
+
+from data.vector_store.hybrid import HybridStore
+from data.vector_store.memory import NumpyStore
+
+from . import synthetic
+
+NOTES = (
+    "legs heavy",
+    "left achilles tight",
+    "felt strong",
+    "windy on the river path",
+    "calf cramp late",
+    "negative split",
+    "skipped the cooldown",
+    "new shoes",
+)
+
+QUERIES = (
+    "achilles",
+    "tempo strong",
+    "river path windy",
+    "calf cramp intervals",
+    "negative split long run",
+    "new shoes recovery",
+)
+
+
+async def per_query(call: Callable[[str], Awaitable], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            await call(query)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES))
+
+
+async def bench(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    workouts = synthetic.workouts(args.n, rng)
+    notes = rng.choice(len(NOTES), size=args.n)
+    texts: List[str] = [
+        f"{synthetic.workout_text(w)}. {NOTES[i]}" for w, i in zip(workouts, notes)
+    ]
+    ids = [str(i) for i in range(args.n)]
+    vectors = synthetic.embeddings(args.n, args.dim, args.seed)
+    query = synthetic.embeddings(1, args.dim, args.seed)[0]
+
+    store = HybridStore(NumpyStore())
+    start = time.perf_counter()
+    await store.add_many(
+        list(vectors), [dict(w, text=t) for w, t in zip(workouts, texts)], ids
+    )
+    build = time.perf_counter() - start
+    for q in QUERIES:  # Warm the posting arrays
+        store.lexical.search(q, args.limit)
+
+    async def index_only(q: str) -> None:
+        store.lexical.search(q, args.limit)
+
+    async def text(q: str) -> None:
+        await store.search_text(q, args.limit)
+
+    async def hybrid(q: str) -> None:
+        await store.hybrid_search(q, query, args.limit)
+
+    print(f"{args.n:,} notes, {args.dim}-dimensional embeddings")
+    print(f"  add_many with indexing   {build:8.2f} s")
+    for name, call in (
+        ("BM25 index", index_only),
+        ("search_text", text),
+        ("hybrid_search", hybrid),
+    ):
+        latency = await per_query(call, args.rounds)
+        print(f"  {name:<24} {latency * 1000:8.3f} ms/query")
+
+    start = time.perf_counter()
+    for i in range(args.rounds * 10):
+        store.lexical.add(ids[i], texts[-1 - i])
+    print(
+        f"  replace one note         "
+        f"{(time.perf_counter() - start) / (args.rounds * 10) * 1e6:8.1f} us"
+    )
+    latency = await per_query(index_only, args.rounds)
+    print(f"  BM25 index after writes  {latency * 1000:8.3f} ms/query")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
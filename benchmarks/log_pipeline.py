@@ -0,0 +1,127 @@
+"""Slowdown of a log-heavy async workload, with and without the log queue.
+
+Runs concurrent fake requests that log on every step and measures total
+time and event-loop lag (how late a 1ms ticker wakes up) in three setups:
+logging disabled, the former synchronous FileHandler + StreamHandler, and
+the queue pipeline from ``setup_logging``. Console output goes to
+/dev/null in both logging setups. ``--disk-latency-us`` adds a delay to
+every file write, standing in for a slow or busy disk.
+
+Run from the repository root:
+
+    python -m benchmarks.log_pipeline --requests 200 --steps 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from utils.logging import log_context, setup_logging, shutdown_logging
+
+logger = logging.getLogger("running_coach.bench")
+
+
+def slow_writes(handler: logging.Handler, latency: float) -> None:
+    """Delay every record the handler writes by ``latency`` seconds"""
+    if not latency:
+        return
+    emit = handler.emit
+
+    def delayed(record: logging.LogRecord) -> None:
+        time.sleep(latency)
+        emit(record)
+
+    handler.emit = delayed
+
+
+async def request(request_id: int, steps: int) -> None:
+    with log_context(request_id=request_id, athlete_id=request_id % 10):
+        for step in range(steps):
+            logger.info("step %d of request %d", step, request_id, extra={"ms": 1.5})
+            sum(range(100))  # A little work between log calls
+            await asyncio.sleep(0)
+
+
+async def workload(requests: int, steps: int) -> Tuple[float, List[float]]:
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    tick = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i, steps) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return elapsed, lags
+
+
+def reset_root() -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--disk-latency-us", type=float, default=0)
+    args = parser.parse_args()
+    latency = args.disk_latency_us / 1e6
+    records = args.requests * args.steps
+
+    def report(name: str, elapsed: float, lags: List[float], base: float) -> None:
+        lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+        p99 = lags_ms[int(len(lags_ms) * 0.99) - 1]
+        print(
+            f"{name:<24} {elapsed:7.2f}s {elapsed / base:6.2f}x "
+            f"{records / elapsed:10,.0f} records/s  loop lag "
+            f"median {statistics.median(lags_ms):6.2f}ms p99 {p99:7.2f}ms "
+            f"max {lags_ms[-1]:7.2f}ms"
+        )
+
+    with tempfile.TemporaryDirectory() as path, open(os.devnull, "w") as devnull:
+        reset_root()
+        logging.getLogger().setLevel(logging.WARNING)
+        base, lags = asyncio.run(workload(args.requests, args.steps))
+        report("logging disabled", base, lags, base)
+
+        file_handler = logging.FileHandler(Path(path) / "sync.log")
+        slow_writes(file_handler, latency)
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            handlers=[file_handler, logging.StreamHandler(devnull)],
+            force=True,
+        )
+        elapsed, lags = asyncio.run(workload(args.requests, args.steps))
+        report("sync file + console", elapsed, lags, base)
+        reset_root()
+
+        listener = setup_logging(log_dir=Path(path) / "queue", console=False)
+        console = logging.StreamHandler(devnull)
+        listener.handlers = listener.handlers + (console,)
+        slow_writes(listener.handlers[0], latency)
+        start = time.perf_counter()
+        elapsed, lags = asyncio.run(workload(args.requests, args.steps))
+        report("queue (JSON, rotating)", elapsed, lags, base)
+        shutdown_logging()
+        print(f"{'':<24} {time.perf_counter() - start:7.2f}s until the queue drained")
+        reset_root()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Render cost and prefix reuse of prompt templates.
+
+Renders a workout analysis prompt for every workout of a synthetic roster,
+once with the former layout through ``str.format`` and once with the compiled
+WORKOUT_ANALYSIS template. Prefix reuse is the share of each prompt's
+characters that an earlier prompt already started with, which is what a
+prefix cache on the provider side can skip.
+
+Run from the repository root:
+
+    python -m benchmarks.prompt_render --athletes 50 --workouts 20
+"""
+
+import argparse
+import bisect
+import os
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from llm.prompts.templates import WORKOUT_ANALYSIS
+
+OLD_WORKOUT_ANALYSIS = """Workout data: {workout_data}
+User's goal: {user_goal}{context}
+
+Analyze this workout and provide actionable insights."""
+
+
+def synthetic_calls(athletes: int, workouts: int, seed: int) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    calls = []
+    for athlete in range(athletes):
+        goal = f"Athlete {athlete} wants a marathon under {rng.integers(3, 5)} hours"
+        for _ in range(workouts):
+            calls.append(
+                {
+                    "workout_data": {
+                        "distance": f"{rng.uniform(5, 30):.1f}km",
+                        "avg_pace": f"{rng.integers(4, 7)}:{rng.integers(60):02d}/km",
+                        "heart_rate": f"{rng.integers(120, 175)}bpm",
+                    },
+                    "user_goal": goal,
+                    "context": "\n".join(
+                        f"Previous run: {rng.uniform(5, 30):.1f}km" for _ in range(5)
+                    ),
+                }
+            )
+    return calls
+
+
+def prefix_reuse(prompts: List[str]) -> float:
+    """Mean share of each prompt covered by a prefix seen in an earlier prompt"""
+    seen: List[str] = []
+    reused = 0.0
+    for prompt in prompts:
+        i = bisect.bisect_left(seen, prompt)
+        neighbours = seen[max(i - 1, 0) : i + 1]
+        common = max(
+            (len(os.path.commonprefix([prompt, other])) for other in neighbours),
+            default=0,
+        )
+        reused += common / len(prompt)
+        bisect.insort(seen, prompt)
+    return reused / len(prompts)
+
+
+def bench(render: Callable[[Dict], str], calls: List[Dict], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kwargs in calls:
+            render(kwargs)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(calls))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--athletes", type=int, default=50)
+    parser.add_argument("--workouts", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    calls = synthetic_calls(args.athletes, args.workouts, args.seed)
+    layouts = {
+        "str.format, data first": lambda kw: OLD_WORKOUT_ANALYSIS.format(**kw),
+        "PromptTemplate, prefix first": lambda kw: WORKOUT_ANALYSIS.format(**kw),
+    }
+    for name, render in layouts.items():
+        us = bench(render, calls, args.repeat)
+        reuse = prefix_reuse([render(kwargs) for kwargs in calls])
+        print(f"{name:<30} {us:6.2f} us/render  {reuse:6.1%} prefix reuse")
+
+
+if __name__ == "__main__":
+    main()
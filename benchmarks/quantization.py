@@ -0,0 +1,114 @@
+"""Memory and recall of the IVF index for each storage mode.
+
+Builds an ``IVFIndex`` over synthetic embeddings with float32 lists,
+float16, int8 and product quantization, and reports the memory the index
+holds per vector, recall@k against exact search from the index alone, and
+recall@k and latency after ``IndexedStore`` re-ranks ``rerank * k``
+candidates by exact distance.
+
+Run from the repository root:
+
+    python -m benchmarks.quantization --n 50000 --dim 768
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Optional, Sequence, Set
+
+import numpy as np
+
+from data.vector_store.ann import IVFIndex
+from data.vector_store.indexed import IndexedStore
+from data.vector_store.memory import NumpyStore
+from data.vector_store.quantization import (
+    Float16Quantizer,
+    Int8Quantizer,
+    ProductQuantizer,
+    Quantizer,
+)
+
+from . import synthetic
+
+
+def make_quantizer(mode: str, seed: int) -> Optional[Quantizer]:
+    if mode == "float32":
+        return None
+    if mode == "float16":
+        return Float16Quantizer()
+    if mode == "int8":
+        return Int8Quantizer()
+    if mode.startswith("pq"):
+        return ProductQuantizer(int(mode[2:]), seed=seed)
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def recall(found: Sequence[Sequence[str]], truth: Sequence[Set[str]]) -> float:
+    return float(np.mean([len(set(f) & t) / len(t) for f, t in zip(found, truth)]))
+
+
+async def bench(
+    mode: str,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: List[Set[str]],
+    args: argparse.Namespace,
+) -> None:
+    ids = [str(i) for i in range(len(vectors))]
+    index = IVFIndex(
+        n_lists=args.lists,
+        n_probe=args.probe,
+        seed=args.seed,
+        quantizer=make_quantizer(mode, args.seed),
+    )
+    store = IndexedStore(NumpyStore(), index, rerank=args.rerank)
+    start = time.perf_counter()
+    await store.add_many(list(vectors), ids=ids)
+    build = time.perf_counter() - start
+
+    approximate = [[id for id, _ in index.search(q, args.k)] for q in queries]
+    start = time.perf_counter()
+    results = [await store.search(q, args.k, include=[]) for q in queries]
+    latency = (time.perf_counter() - start) / len(queries)
+    reranked = [[r.id for r in hits] for hits in results]
+
+    print(
+        f"{mode:<9} {index.nbytes / len(ids):9.1f} B/vector "
+        f"{index.nbytes / 2**20:8.1f} MB  recall@{args.k} "
+        f"{recall(approximate, truth):.3f} index, "
+        f"{recall(reranked, truth) if index.is_quantized else float('nan'):.3f} "
+        f"re-ranked  {latency * 1000:6.2f} ms/query  build {build:5.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=256)
+    parser.add_argument("--probe", type=int, default=16)
+    parser.add_argument("--rerank", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", default="float32,float16,int8,pq96,pq48")
+    args = parser.parse_args()
+
+    vectors = synthetic.embeddings(args.n, args.dim, args.seed)
+    queries = synthetic.embeddings(args.queries, args.dim, args.seed)
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    truth = [
+        {str(i) for i in np.argsort(norms - 2.0 * (vectors @ q))[: args.k].tolist()}
+        for q in queries
+    ]
+    print(
+        f"{args.n:,} vectors of {args.dim} dimensions, float32 "
+        f"{vectors.nbytes / len(vectors):.0f} B/vector, "
+        f"{args.lists} lists, {args.probe} probed"
+    )
+    for mode in args.modes.split(","):
+        asyncio.run(bench(mode, vectors, queries, truth, args))
+
+
+if __name__ == "__main__":
+    main()
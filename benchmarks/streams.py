@@ -0,0 +1,97 @@
+"""Load time and memory of activity streams in StreamStore.
+
+Writes synthetic one-hour activities at one sample per second, then loads
+the heart-rate column of all of them with ``read_many`` and compares time
+and memory against the same samples held as a list of per-sample dicts.
+
+Run from the repository root:
+
+    python -m benchmarks.streams --activities 1000
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from data.streams import StreamStore
+
+
+def synthetic_activity(samples: int, rng: np.random.Generator):
+    hr = np.clip(140 + np.cumsum(rng.normal(0, 0.5, samples)), 90, 200)
+    return {
+        "time": np.arange(samples),
+        "heartrate": hr.round(),
+        "velocity_smooth": rng.uniform(2.5, 4.5, samples),
+        "cadence": rng.integers(80, 95, samples),
+        "altitude": 100 + np.cumsum(rng.normal(0, 0.1, samples)),
+        "latlng": 52 + np.cumsum(rng.normal(0, 1e-5, (samples, 2)), axis=0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--activities", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=3600)
+    parser.add_argument("--codec", choices=["zlib", "raw"], default="zlib")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ids = list(range(args.activities))
+    with tempfile.TemporaryDirectory() as path:
+        store = StreamStore(path, codec=args.codec)
+        start = time.perf_counter()
+        hr_lists = []
+        for activity in ids:
+            streams = synthetic_activity(args.samples, rng)
+            store.write(1, activity, streams)
+            hr_lists.append(streams["heartrate"].astype(int).tolist())
+        write_s = time.perf_counter() - start
+        store.close()
+
+        store = StreamStore(path)
+        start = time.perf_counter()
+        values, offsets = store.read_many(1, ids, "heartrate")
+        cold_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        store.read_many(1, ids, "heartrate")
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        # Memory is traced in a separate run, tracing slows allocations down
+        tracemalloc.start()
+        store.read_many(1, ids, "heartrate")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for activity in ids[:100]:
+            store.read(1, activity, ["heartrate"], start=1200, end=1500)
+        range_ms = (time.perf_counter() - start) * 1000 / 100
+
+        tracemalloc.start()
+        records = [
+            [{"time": t, "heartrate": hr} for t, hr in enumerate(activity)]
+            for activity in hr_lists
+        ]
+        _, dict_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del records
+
+        disk_mb = sum(p.stat().st_size for p in store.path.rglob("*.col")) / 2**20
+        raw_mb = args.activities * args.samples * (4 + 1 + 4 + 1 + 4 + 16) / 2**20
+
+    print(f"activities:            {args.activities} x {args.samples} samples")
+    print(f"write:                 {write_s:.2f} s")
+    print(f"column files:          {disk_mb:.1f} MiB ({raw_mb:.1f} MiB uncompressed)")
+    print(f"load heartrate (all):  {cold_ms:.1f} ms cold, {warm_ms:.1f} ms warm")
+    print(f"                       peak {peak / 2**20:.1f} MiB")
+    print(f"list of dicts:         peak {dict_peak / 2**20:.1f} MiB")
+    print(f"range read 5 min:      {range_ms:.3f} ms per activity")
+    assert len(values) == offsets[-1] == args.activities * args.samples
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Latency of retrieval and prompt assembly at 1k, 100k and 1M workouts.
+
+Measures ``add_many``, ``search`` and filtered ``search`` (by workout type,
+and by type within a six-week window) on each vector store,
+``ContextInjector.inject`` over the retrieved history and template
+rendering, all on synthetic workouts from ``benchmarks.synthetic``. Results
+are written as JSON; given a baseline file from an earlier run, the suite
+exits with status 1 when any median latency grew past the threshold (50%
+by default). On shared machines, ``--rounds`` repeats the suite and keeps
+each operation's fastest round, which filters out slow spells.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --scales 1k,100k --output results.json
+    python -m benchmarks.suite --scales 1k,10k --rounds 3 \
+        --baseline benchmarks/baseline.json
+
+``benchmarks/baseline.json`` holds 1k and 10k results from a development
+machine; regenerate it with ``--output`` on the machine that runs the gate,
+since absolute latencies don't carry over between machines.
+
+1M runs need several GB of memory; Chroma is skipped above 100k because
+its inserts alone take tens of minutes there.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.vector_store.base import VectorStore
+from llm.context import ContextItem
+from llm.prompts import ContextInjector
+from llm.prompts.templates import WORKOUT_ANALYSIS
+
+from . import synthetic
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+STORES = ("numpy", "indexed", "segments", "chroma")
+CHROMA_MAX_SCALE = 100_000
+ADD_BATCH = 5_000  # Below Chroma's maximum batch size
+RENDER_BATCH = 100
+FILTER = {"type": "tempo"}
+# Six weeks of synthetic workouts; Chroma only compares numbers, so it's skipped
+WINDOW_FILTER = {"type": "tempo", "date": {"$gte": "2023-03-01", "$lt": "2023-04-12"}}
+
+
+@dataclass
+class Result:
+    """Latencies of one operation at one scale, in milliseconds"""
+
+    name: str
+    scale: int
+    unit: str
+    p50: float
+    p95: float
+    mean: float
+    samples: int
+
+    @classmethod
+    def from_seconds(
+        cls, name: str, scale: int, seconds: Sequence[float], unit: str = "ms"
+    ) -> "Result":
+        ms = np.asarray(seconds) * 1000
+        return cls(
+            name=name,
+            scale=scale,
+            unit=unit,
+            p50=float(np.percentile(ms, 50)),
+            p95=float(np.percentile(ms, 95)),
+            mean=float(ms.mean()),
+            samples=len(ms),
+        )
+
+
+async def timed(calls: Sequence[Callable[[], Awaitable[Any]]]) -> List[float]:
+    times = []
+    for call in calls:
+        start = time.perf_counter()
+        await call()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_store(kind: str, path: Path) -> VectorStore:
+    if kind == "numpy":
+        from data.vector_store.memory import NumpyStore
+
+        return NumpyStore()
+    if kind == "indexed":
+        from data.vector_store.indexed import IndexedStore
+        from data.vector_store.memory import NumpyStore
+
+        return IndexedStore(NumpyStore())
+    if kind == "segments":
+        from data.vector_store.segments import SegmentStore
+
+        return SegmentStore(path / "segments")
+    if kind == "chroma":
+        from data.vector_store.local import ChromaStore
+
+        return ChromaStore(collection_name=f"bench_{time.monotonic_ns()}")
+    raise ValueError(f"Unknown store: {kind}. Expected one of {STORES}")
+
+
+async def bench_store(
+    kind: str,
+    vectors: np.ndarray,
+    metadata: List[Dict[str, Any]],
+    queries: np.ndarray,
+    path: Path,
+    limit: int,
+) -> List[Result]:
+    n = len(vectors)
+    store = make_store(kind, path)
+    ids = [f"workout-{i}" for i in range(n)]
+
+    adds = await timed(
+        [
+            lambda s=s: store.add_many(
+                list(vectors[s : s + ADD_BATCH]),
+                metadata[s : s + ADD_BATCH],
+                ids[s : s + ADD_BATCH],
+            )
+            for s in range(0, n, ADD_BATCH)
+        ]
+    )
+    sizes = [min(ADD_BATCH, n - s) for s in range(0, n, ADD_BATCH)]
+    # Per 1k vectors, so batches of different sizes compare
+    per_1k = [t * 1000 / size for t, size in zip(adds, sizes)]
+
+    # The first searches build indexes and map segments; keep them out
+    window = kind != "chroma"
+    for query in queries[:3]:
+        await store.search(query, limit)
+        await store.search(query, limit, FILTER)
+        if window:
+            await store.search(query, limit, WINDOW_FILTER)
+    searches = await timed([lambda q=q: store.search(q, limit) for q in queries])
+    filtered = await timed(
+        [lambda q=q: store.search(q, limit, FILTER) for q in queries]
+    )
+    windowed = await timed(
+        [lambda q=q: store.search(q, limit, WINDOW_FILTER) for q in queries]
+        if window
+        else []
+    )
+
+    close = getattr(store, "close", None)
+    if close is not None:
+        result = close()
+        if asyncio.iscoroutine(result):
+            await result
+
+    results = [
+        Result.from_seconds(f"{kind}.add_many", n, per_1k, "ms/1k vectors"),
+        Result.from_seconds(f"{kind}.search", n, searches),
+        Result.from_seconds(f"{kind}.search_filtered", n, filtered),
+    ]
+    if window:
+        results.append(Result.from_seconds(f"{kind}.search_window", n, windowed))
+    return results
+
+
+def bench_inject(texts: List[str], repeat: int) -> List[Result]:
+    """Pack the whole scored history into a workout analysis prompt"""
+    rng = np.random.default_rng(len(texts))
+    items = [
+        ContextItem(text, score) for text, score in zip(texts, rng.random(len(texts)))
+    ]
+    variables = {"user_goal": "Sub-3:30 marathon", "workout_data": texts[0]}
+    injector = ContextInjector(WORKOUT_ANALYSIS)
+
+    start = time.perf_counter()
+    injector.inject(items, variables)
+    cold = [time.perf_counter() - start]
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        injector.inject(items, variables)
+        warm.append(time.perf_counter() - start)
+    return [
+        Result.from_seconds("inject.cold", len(texts), cold),
+        Result.from_seconds("inject", len(texts), warm),
+    ]
+
+
+def bench_render(metadata: List[Dict[str, Any]], texts: List[str]) -> Result:
+    """Render one analysis prompt per workout"""
+    context = "\n".join(texts[:20])
+    batches = []
+    for s in range(0, len(metadata), RENDER_BATCH):
+        start = time.perf_counter()
+        for workout in metadata[s : s + RENDER_BATCH]:
+            WORKOUT_ANALYSIS.format(
+                user_goal="Sub-3:30 marathon", context=context, workout_data=workout
+            )
+        elapsed = time.perf_counter() - start
+        batches.append(elapsed * 1000 / len(metadata[s : s + RENDER_BATCH]))
+    return Result.from_seconds("render", len(metadata), batches, "ms/1k prompts")
+
+
+async def run(
+    scales: Sequence[int],
+    stores: Sequence[str],
+    dim: int,
+    queries: int,
+    limit: int,
+    repeat: int,
+    seed: int,
+) -> List[Result]:
+    results = []
+    for n in scales:
+        metadata = synthetic.workouts(n, np.random.default_rng(seed))
+        texts = [synthetic.workout_text(workout) for workout in metadata]
+        vectors = synthetic.embeddings(n, dim, seed)
+        query_vectors = synthetic.embeddings(queries, dim, seed)
+
+        for kind in stores:
+            if kind == "chroma" and n > CHROMA_MAX_SCALE:
+                continue
+            with tempfile.TemporaryDirectory() as path:
+                store_results = await bench_store(
+                    kind, vectors, metadata, query_vectors, Path(path), limit
+                )
+            report(store_results)
+            results += store_results
+        results += bench_inject(texts, repeat)
+        results.append(bench_render(metadata, texts))
+        report(results[-3:])
+    return results
+
+
+def report(results: Sequence[Result]) -> None:
+    for r in results:
+        print(
+            f"{r.name:<26} {r.scale:>9,} {r.p50:10.3f} p50 {r.p95:10.3f} p95 "
+            f"{r.unit}"
+        )
+
+
+def compare(
+    results: Sequence[Result],
+    baseline: Sequence[Result],
+    threshold: float,
+    min_delta: float = 0.05,
+) -> List[str]:
+    """Regressions of median latency against the baseline.
+
+    A result regresses when its p50 exceeds the baseline's by more than
+    ``threshold`` (a fraction) and by more than ``min_delta`` milliseconds,
+    so that sub-millisecond jitter doesn't fail the gate. Results without a
+    baseline entry are ignored.
+    """
+    previous = {(r.name, r.scale): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = previous.get((r.name, r.scale))
+        if base is None:
+            continue
+        if r.p50 > base.p50 * (1 + threshold) and r.p50 - base.p50 > min_delta:
+            regressions.append(
+                f"{r.name} at {r.scale:,}: p50 {base.p50:.3f} -> {r.p50:.3f} {r.unit} "
+                f"(+{(r.p50 / base.p50 - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def load_results(path: Path) -> List[Result]:
+    return [Result(**r) for r in json.loads(path.read_text())["results"]]
+
+
+def write_results(path: Path, results: Sequence[Result], args: Dict[str, Any]) -> None:
+    path.write_text(
+        json.dumps(
+            {
+                "environment": {
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "system": platform.system(),
+                },
+                "parameters": args,
+                "results": [asdict(r) for r in results],
+            },
+            indent=2,
+        )
+    )
+
+
+def parse_scale(value: str) -> int:
+    return SCALES.get(value.lower()) or int(value)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1k,100k", help="e.g. 1k,100k,1m")
+    parser.add_argument("--stores", default=",".join(STORES))
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=1,
+        help="Repeat the suite and keep each operation's fastest round",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Results JSON to compare to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Allowed p50 growth over the baseline, as a fraction",
+    )
+    args = parser.parse_args(argv)
+
+    scales = [parse_scale(s) for s in args.scales.split(",")]
+    stores = args.stores.split(",")
+    fastest: Dict[Tuple[str, int], Result] = {}
+    for _ in range(args.rounds):
+        for r in asyncio.run(
+            run(
+                scales,
+                stores,
+                args.dim,
+                args.queries,
+                args.limit,
+                args.repeat,
+                args.seed,
+            )
+        ):
+            key = (r.name, r.scale)
+            if key not in fastest or r.p50 < fastest[key].p50:
+                fastest[key] = r
+    results = list(fastest.values())
+
+    if args.output:
+        parameters = {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline", "threshold", "rounds")
+        }
+        write_results(args.output, results, parameters)
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Synthetic workouts and embeddings for benchmarks.
+
+Embeddings are drawn around a fixed number of cluster centres, so that
+nearest-neighbour structure resembles real text embeddings rather than
+uniform noise, which no index can exploit.
+"""
+
+from datetime import date
+from typing import Any, Dict, List
+
+import numpy as np
+
+WORKOUT_TYPES = ("easy", "long", "tempo", "intervals", "recovery", "race")
+
+# Share of synthetic workouts per type, tempo being the filtered-search target
+WORKOUT_WEIGHTS = (0.4, 0.15, 0.1, 0.1, 0.2, 0.05)
+
+
+def workouts(n: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    """Metadata of ``n`` workouts spread over 1000-workout athletes"""
+    types = rng.choice(len(WORKOUT_TYPES), size=n, p=WORKOUT_WEIGHTS)
+    distance = rng.uniform(3, 42, size=n).round(1)
+    pace = rng.uniform(240, 420, size=n).astype(int)
+    hr = rng.integers(120, 175, size=n)
+    start = date(2020, 1, 1).toordinal()
+    days = rng.integers(0, 5 * 365, size=n) + start
+    return [
+        {
+            "athlete": i // 1000,
+            "type": WORKOUT_TYPES[types[i]],
+            "distance_km": float(distance[i]),
+            "pace_s": int(pace[i]),
+            "avg_hr": int(hr[i]),
+            "date": date.fromordinal(int(days[i])).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+def workout_text(workout: Dict[str, Any]) -> str:
+    pace = workout["pace_s"]
+    return (
+        f"{workout['date']} {workout['type']} run: {workout['distance_km']}km "
+        f"at {pace // 60}:{pace % 60:02d}/km, avg HR {workout['avg_hr']}bpm"
+    )
+
+
+def embeddings(n: int, dim: int, seed: int, clusters: int = 64) -> np.ndarray:
+    """``n`` float32 embeddings around ``clusters`` centres fixed by ``seed``.
+
+    Calls with the same seed share centres, so a second, smaller call makes
+    queries that land near the stored embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    rng = np.random.default_rng((seed, n))
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.normal(scale=0.3, size=(n, dim)).astype(np.float32)
+    return centres[labels] + noise
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+from utils.logging import log_context
+from utils.metrics import metrics
+
+from .service import CoachError, CoachService
+
+logger = logging.getLogger("running_coach.daemon")
+
+
+def socket_path(home: Optional[Union[str, Path]] = None) -> Path:
+    return Path(home or Path.home() / ".running_coach") / "coach.sock"
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket"""
+
+
+async def _send(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+class CoachDaemon:
+    """Serve CoachService commands over a Unix socket.
+
+    The protocol is newline-delimited JSON. A client sends one request,
+    ``{"command": ..., "params": {...}}``, and receives ``{"chunk": ...}``
+    messages as output is produced, then ``{"done": true}`` or
+    ``{"error": ...}``. Connections are served concurrently by one service,
+    so they share its provider, caches, stores and HTTP connections.
+    """
+
+    def __init__(self, service: CoachService, path: Optional[Union[str, Path]] = None):
+        """Initialize CoachDaemon.
+
+        Args:
+            service: Service that runs the commands
+            path: Socket path. Defaults to coach.sock in the service's home
+        """
+        self.service = service
+        self.path = Path(path or socket_path(service.home))
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Listen on the socket, replacing one left behind by a dead daemon"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            try:
+                _, writer = await asyncio.open_unix_connection(str(self.path))
+            except ConnectionRefusedError:
+                self.path.unlink()
+            else:
+                writer.close()
+                raise CoachError(f"A daemon is already listening on {self.path}")
+        # Bound under a private umask and only listening once it is 0600, so
+        # other local users can never connect and run commands as the athlete
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            umask = os.umask(0o077)
+            try:
+                sock.bind(str(self.path))
+            finally:
+                os.umask(umask)
+            os.chmod(self.path, 0o600)
+            sock.listen()
+            self._server = await asyncio.start_unix_server(self._handle, sock=sock)
+        except BaseException:
+            sock.close()
+            raise
+        logger.info("Listening on %s", self.path)
+
+    async def serve_forever(self) -> None:
+        """Serve until SIGINT or SIGTERM, then clean up"""
+        if self._server is None:
+            await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            with suppress(FileNotFoundError):
+                self.path.unlink()
+        await self.service.aclose()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        started = time.perf_counter()
+        with log_context(request_id=uuid.uuid4().hex[:12]):
+            try:
+                request = json.loads(await reader.readline())
+                command = request["command"]
+                params = request.get("params", {})
+                fields = {"command": command}
+                if params.get("athlete_id") is not None:
+                    fields["athlete_id"] = params["athlete_id"]
+                with log_context(**fields):
+                    logger.info("Running %s", command)
+                    output = self.service.run(command, params)
+                    try:
+                        async for chunk in output:
+                            await _send(writer, {"chunk": chunk})
+                    finally:
+                        await output.aclose()
+                    await _send(writer, {"done": True})
+                    logger.info(
+                        "Finished %s in %.0fms",
+                        command,
+                        (time.perf_counter() - started) * 1000,
+                    )
+            except ConnectionError:
+                # The client went away; closing the output stops its generation
+                logger.info("Client disconnected")
+            except CoachError as e:
+                logger.warning("Request failed: %s", e)
+                await _send(writer, {"error": str(e)})
+            except Exception as e:
+                logger.exception("Request failed")
+                with suppress(ConnectionError):
+                    await _send(writer, {"error": f"{type(e).__name__}: {e}"})
+            finally:
+                writer.close()
+                with suppress(ConnectionError):
+                    await writer.wait_closed()
+                # Scrapers read the file, so refresh it after every request
+                metrics.export()
+
+
+async def request(
+    command: str, params: Dict[str, Any], path: Optional[Union[str, Path]] = None
+) -> AsyncIterator[str]:
+    """Run a command on the daemon, yielding its output chunk by chunk.
+
+    Raises:
+        DaemonUnavailable: Before any output, if no daemon is listening
+        CoachError: If the command fails
+    """
+    path = Path(path or socket_path())
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        raise DaemonUnavailable(str(path)) from e
+
+    try:
+        await _send(writer, {"command": command, "params": params})
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise CoachError("The daemon closed the connection")
+            message = json.loads(line)
+            if "chunk" in message:
+                yield message["chunk"]
+            elif "error" in message:
+                raise CoachError(message["error"])
+            else:
+                return
+    finally:
+        writer.close()
+
+
+async def run_command(
+    command: str,
+    params: Dict[str, Any],
+    home: Optional[Union[str, Path]] = None,
+) -> AsyncIterator[str]:
+    """Run a command on the daemon if one is running, otherwise in this process"""
+    if hasattr(asyncio, "open_unix_connection"):
+        output = request(command, params, socket_path(home))
+        try:
+            async for chunk in output:
+                yield chunk
+            return
+        except DaemonUnavailable:
+            pass
+        finally:
+            await output.aclose()
+
+    service = CoachService(home)
+    output = service.run(command, params)
+    try:
+        async for chunk in output:
+            yield chunk
+    finally:
+        await output.aclose()
+        await service.aclose()
@@ -1,19 +1,85 @@
+from typing import Any, Optional
+
 import typer
-from rich import print
+
+# Commands import what they need when they run, so that --help and light
+# commands don't pay for NumPy, the LLM SDKs or the vector stores.
+# tests/test_cli/test_import_time.py keeps this module's imports in budget.
 
 app = typer.Typer()
 
 
+def _run(command: str, **params: Any) -> None:
+    """Run a command on the daemon if it is running, otherwise in this process"""
+    import asyncio
+
+    from utils.metrics import metrics
+
+    from .daemon import run_command
+    from .service import CoachError
+
+    async def stream() -> None:
+        async for chunk in run_command(command, params):
+            typer.echo(chunk, nl=False)
+
+    metrics.configure_from_env()
+    try:
+        asyncio.run(stream())
+    except CoachError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(1)
+    finally:
+        metrics.export()
+
+
 @app.command()
-def analyze(workout_id: str):
+def analyze(
+    workout_id: str,
+    goal: Optional[str] = typer.Option(None, help="Goal to analyze the workout for"),
+):
     """Analyze a specific workout."""
-    print(f"Analyzing workout: {workout_id}")
+    params = {"workout_id": workout_id}
+    if goal:
+        params["goal"] = goal
+    _run("analyze", **params)
 
 
 @app.command()
-def plan(race: str, date: str):
+def plan(
+    race: str,
+    date: str,
+    athlete_id: Optional[int] = typer.Option(
+        None, help="Strava athlete whose training load to plan from"
+    ),
+):
     """Generate a training plan."""
-    print(f"Generating plan for {race} on {date}")
+    _run("plan", race=race, date=date, athlete_id=athlete_id)
+
+
+@app.command()
+def sync():
+    """Fetch new Strava activities and update the training load."""
+    _run("sync")
+
+
+@app.command()
+def daemon():
+    """Keep the coach running in the background to serve commands quickly."""
+    import asyncio
+
+    from utils.logging import setup_logging
+    from utils.metrics import metrics
+
+    from .daemon import CoachDaemon
+    from .service import CoachError, CoachService
+
+    setup_logging()
+    metrics.configure_from_env()
+    try:
+        asyncio.run(CoachDaemon(CoachService()).serve_forever())
+    except CoachError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+import datetime
+import json
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Optional,
+    Union,
+)
+
+if TYPE_CHECKING:
+    from auth.credentials import CredentialStore
+    from auth.strava import StravaClient
+    from data.streams import StreamStore
+    from data.sync import ActivitySync
+    from data.training_load import TrainingLoadStore
+    from llm.base import LLMProvider
+
+# Goal used in workout analyses when the user doesn't give one
+DEFAULT_GOAL = "Improve overall running fitness"
+
+
+class CoachError(Exception):
+    """Error shown to the user as a message rather than a traceback"""
+
+
+def default_provider() -> "LLMProvider":
+    """Gemini behind the response and embedding caches"""
+    from llm.cache import CachedProvider
+    from llm.embeddings import EmbeddingCache
+    from llm.gemini import GeminiProvider
+
+    try:
+        provider = GeminiProvider(embedding_cache=EmbeddingCache())
+    except ValueError as e:
+        raise CoachError(str(e)) from e
+    return CachedProvider(provider)
+
+
+class CoachService:
+    """What the CLI commands do, with their resources created once and reused.
+
+    Each resource is created on first use, so a command only pays for what it
+    needs. A one-off CLI run uses a fresh service; the daemon keeps one alive
+    so later commands find the LLM provider, caches, stores and Strava
+    connections already warm.
+    """
+
+    def __init__(
+        self,
+        home: Optional[Union[str, Path]] = None,
+        provider_factory: Optional[Callable[[], "LLMProvider"]] = None,
+    ):
+        """Initialize CoachService.
+
+        Args:
+            home: Data directory. Defaults to ~/.running_coach
+            provider_factory: Creates the LLM provider. Defaults to default_provider
+        """
+        self.home = Path(home or Path.home() / ".running_coach")
+        self.provider_factory = provider_factory or default_provider
+        self._provider: Optional["LLMProvider"] = None
+        self._credentials: Optional["CredentialStore"] = None
+        self._strava: Optional["StravaClient"] = None
+        self._streams: Optional["StreamStore"] = None
+        self._training_load: Optional["TrainingLoadStore"] = None
+
+    @property
+    def provider(self) -> "LLMProvider":
+        if self._provider is None:
+            self._provider = self.provider_factory()
+        return self._provider
+
+    @property
+    def credentials(self) -> "CredentialStore":
+        if self._credentials is None:
+            from auth.credentials import CredentialStore
+
+            try:
+                self._credentials = CredentialStore(self.home)
+            except ValueError as e:
+                raise CoachError(str(e)) from e
+        return self._credentials
+
+    @property
+    def streams(self) -> "StreamStore":
+        if self._streams is None:
+            from data.streams import StreamStore
+
+            self._streams = StreamStore(self.home / "streams")
+        return self._streams
+
+    @property
+    def training_load(self) -> "TrainingLoadStore":
+        if self._training_load is None:
+            from data.training_load import TrainingLoadStore
+
+            self._training_load = TrainingLoadStore(self.home / "training_load.sqlite")
+        return self._training_load
+
+    async def strava(self) -> "StravaClient":
+        """Strava client with a valid token, reusing its connection pool"""
+        from auth.strava import StravaClient
+
+        token, error = await self.credentials.aget_valid_token()
+        if token is None:
+            raise CoachError(error or "No Strava credentials found")
+        if self._strava is not None and self._strava.access_token != token:
+            # The token was refreshed: reconnect with the new one
+            await self._strava.aclose()
+            self._strava = None
+        if self._strava is None:
+            self._strava = StravaClient(token)
+        return self._strava
+
+    async def run(self, command: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Run a command by name, yielding its output as it is produced"""
+        from utils.metrics import metrics
+
+        handlers = {"analyze": self.analyze, "plan": self.plan, "sync": self.sync}
+        if command not in handlers:
+            raise CoachError(f"Unknown command: {command}")
+        with metrics.span("cli.command", command=command):
+            async for chunk in handlers[command](**params):
+                yield chunk
+
+    async def analyze(
+        self, workout_id: str, goal: str = DEFAULT_GOAL
+    ) -> AsyncIterator[str]:
+        """Analyze a stored or freshly fetched Strava activity"""
+        from llm.prompts.templates import WORKOUT_ANALYSIS
+
+        yield f"Analyzing workout: {workout_id}\n"
+        workout_data = await self._workout_data(workout_id)
+        prompt = WORKOUT_ANALYSIS.format(user_goal=goal, workout_data=workout_data)
+        async for chunk in self.provider.stream(prompt):
+            yield chunk
+        yield "\n"
+
+    async def plan(
+        self, race: str, date: str, athlete_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """Generate a training plan from the athlete's current training load"""
+        from data.training_load import training_load_context
+        from llm.prompts.templates import TRAINING_PLAN
+
+        yield f"Generating plan for {race} on {date}\n"
+        training_load = ""
+        if athlete_id is not None:
+            training_load = training_load_context(
+                self.training_load, athlete_id, datetime.date.today()
+            )
+        prompt = TRAINING_PLAN.format(
+            user_goal=f"Race {race} on {date}", training_load=training_load
+        )
+        async for chunk in self.provider.stream(prompt):
+            yield chunk
+        yield "\n"
+
+    async def sync(self) -> AsyncIterator[str]:
+        """Fetch new Strava activities with their streams and training load"""
+        from auth.strava import StravaError
+
+        yield "Syncing Strava activities\n"
+        try:
+            result = await (await self._activity_sync()).run()
+        except StravaError as e:
+            raise CoachError(f"Could not sync activities: {e}") from e
+        yield f"Synced {len(result.activity_ids)} new activities\n"
+
+    async def _activity_sync(self) -> "ActivitySync":
+        from data.sync import ActivitySync
+
+        return ActivitySync(
+            await self.strava(),
+            self.home / "strava",
+            stream_store=self.streams,
+            training_load=self.training_load,
+        )
+
+    async def _workout_data(self, workout_id: str) -> str:
+        """Summary of an activity's streams, or its Strava details without them"""
+        from auth.strava import StravaError
+
+        try:
+            activity_id = int(workout_id)
+        except ValueError:
+            raise CoachError(f"Not a Strava activity ID: {workout_id}") from None
+
+        path = self.home / "strava" / "activities" / f"{activity_id}.json"
+        if path.exists():
+            detail = json.loads(path.read_text())
+        else:
+            try:
+                detail = await (await self._activity_sync()).fetch(activity_id)
+            except StravaError as e:
+                raise CoachError(f"Could not fetch activity {activity_id}: {e}") from e
+
+        athlete_id = detail.get("athlete", {}).get("id")
+        if athlete_id is not None and (athlete_id, activity_id) in self.streams:
+            from data.analytics import ActivityBatch, summarize
+
+            batch = ActivityBatch.from_store(self.streams, athlete_id, [activity_id])
+            return json.dumps(summarize(batch)[0])
+        fields = ("name", "type", "distance", "moving_time", "average_heartrate")
+        return json.dumps({key: detail[key] for key in fields if key in detail})
+
+    async def aclose(self) -> None:
+        if self._strava is not None:
+            await self._strava.aclose()
+            self._strava = None
+        if self._streams is not None:
+            self._streams.close()
+            self._streams = None
+        if self._training_load is not None:
+            self._training_load.close()
+            self._training_load = None
@@ -0,0 +1,475 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .streams import StreamStore
+
+# Standard windows for best efforts, in seconds and meters
+BEST_EFFORT_DURATIONS = {
+    "1min": 60,
+    "5min": 300,
+    "10min": 600,
+    "20min": 1200,
+    "60min": 3600,
+}
+BEST_EFFORT_DISTANCES = {
+    "1km": 1000,
+    "5km": 5000,
+    "10km": 10000,
+    "half marathon": 21097.5,
+    "marathon": 42195,
+}
+
+# Samples further apart than this are treated as a pause
+MAX_GAP = 30.0
+
+
+@dataclass
+class AthleteProfile:
+    """Physiological thresholds the analytics are computed against"""
+
+    max_hr: float = 190
+    resting_hr: float = 60
+    threshold_hr: float = 170
+    threshold_speed: float = 1000 / 270  # m/s, 4:30/km
+    # Upper bounds of zones 1-4 as fractions of threshold HR; zone 5 is above
+    zone_bounds: Tuple[float, ...] = (0.85, 0.90, 0.95, 1.00)
+    # Banister TRIMP weighting: 1.92 for men, 1.67 for women
+    trimp_factor: float = 1.92
+
+
+@dataclass
+class ActivityBatch:
+    """Streams of many activities concatenated back to back.
+
+    Activity ``i`` owns samples ``offsets[i]:offsets[i + 1]`` of every array.
+    ``time`` is seconds since the activity started and ``distance`` is
+    cumulative meters, both non-decreasing within an activity. Activities
+    without a distance stream, e.g. treadmill or indoor ones, get zeros.
+    """
+
+    offsets: np.ndarray
+    time: np.ndarray
+    distance: np.ndarray
+    heartrate: Optional[np.ndarray] = None
+    velocity: Optional[np.ndarray] = None
+    grade: Optional[np.ndarray] = None
+    _cache: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.offsets = np.asarray(self.offsets, dtype=np.int64)
+        self.time = np.asarray(self.time, dtype=np.float64)
+        self.distance = np.asarray(self.distance, dtype=np.float64)
+        if self.heartrate is not None:
+            self.heartrate = np.asarray(self.heartrate, dtype=np.float64)
+        if self.grade is not None:
+            self.grade = np.asarray(self.grade, dtype=np.float64)
+        if self.velocity is None:
+            # Speed over the following interval, from distance and time
+            dt = np.diff(self.time, append=self.time[-1:])
+            dd = np.diff(self.distance, append=self.distance[-1:])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                velocity = np.where(dt > 0, dd / dt, 0.0)
+            velocity[self.ends[self.ends >= 0]] = 0.0
+            self.velocity = velocity
+        else:
+            self.velocity = np.asarray(self.velocity, dtype=np.float64)
+
+    @classmethod
+    def from_streams(cls, streams: Sequence[Dict[str, Any]]) -> "ActivityBatch":
+        """Build a batch from one ``{column: values}`` dict per activity"""
+        streams = [
+            s if "distance" in s else {**s, "distance": np.zeros(len(s["time"]))}
+            for s in streams
+        ]
+        lengths = [len(s["time"]) for s in streams]
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+        def column(name: str) -> Optional[np.ndarray]:
+            if not all(name in s for s in streams):
+                return None
+            if not streams:
+                return np.empty(0)
+            return np.concatenate([np.asarray(s[name], np.float64) for s in streams])
+
+        return cls(
+            offsets=offsets,
+            time=column("time"),
+            distance=column("distance"),
+            heartrate=column("heartrate"),
+            velocity=column("velocity_smooth"),
+            grade=column("grade_smooth"),
+        )
+
+    @classmethod
+    def from_store(
+        cls, store: StreamStore, athlete_id: int, activity_ids: Sequence[int]
+    ) -> "ActivityBatch":
+        """Load a batch with one ``read_many`` per column"""
+        columns = {}
+        offsets = None
+        for name in (
+            "time",
+            "distance",
+            "heartrate",
+            "velocity_smooth",
+            "grade_smooth",
+        ):
+            values, column_offsets = store.read_many(athlete_id, activity_ids, name)
+            if offsets is None:
+                offsets = column_offsets
+            # Optional columns are only used when every activity has them
+            if np.array_equal(column_offsets, offsets):
+                columns[name] = values
+            elif name == "distance":
+                columns[name] = _zero_filled(values, column_offsets, offsets)
+        return cls(
+            offsets=offsets,
+            time=columns["time"],
+            distance=columns["distance"],
+            heartrate=columns.get("heartrate"),
+            velocity=columns.get("velocity_smooth"),
+            grade=columns.get("grade_smooth"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Index of each activity's last sample, -1 for empty activities"""
+        return np.where(self.offsets[1:] > self.offsets[:-1], self.offsets[1:] - 1, -1)
+
+    @property
+    def activity(self) -> np.ndarray:
+        """Activity number of every sample"""
+        if "activity" not in self._cache:
+            self._cache["activity"] = np.repeat(
+                np.arange(len(self)), np.diff(self.offsets)
+            )
+        return self._cache["activity"]
+
+    @property
+    def dt(self) -> np.ndarray:
+        """Seconds each sample stands for, with pauses and activity ends as 0"""
+        if "dt" not in self._cache:
+            dt = np.diff(self.time, append=self.time[-1:])
+            dt[self.ends[self.ends >= 0]] = 0.0
+            dt[(dt < 0) | (dt > MAX_GAP)] = 0.0
+            self._cache["dt"] = dt
+        return self._cache["dt"]
+
+    @property
+    def graded_velocity(self) -> np.ndarray:
+        """Velocity adjusted for the energy cost of the grade at every sample"""
+        if "graded_velocity" not in self._cache:
+            self._cache["graded_velocity"] = (
+                self.velocity
+                if self.grade is None
+                else self.velocity * grade_factor(self.grade)
+            )
+        return self._cache["graded_velocity"]
+
+    def total(self, values: np.ndarray) -> np.ndarray:
+        """Per-activity sum of per-sample values"""
+        return np.bincount(self.activity, weights=values, minlength=len(self))
+
+    def span(self, values: np.ndarray) -> np.ndarray:
+        """Per-activity last minus first value, 0 for empty activities"""
+        nonempty = self.offsets[1:] > self.offsets[:-1]
+        result = np.zeros(len(self))
+        result[nonempty] = (
+            values[self.offsets[1:][nonempty] - 1] - values[self.offsets[:-1][nonempty]]
+        )
+        return result
+
+
+def _zero_filled(
+    values: np.ndarray, offsets: np.ndarray, expected: np.ndarray
+) -> np.ndarray:
+    """``values`` laid out by ``expected`` offsets, zeros where samples differ"""
+    lengths = np.diff(offsets)
+    expected_lengths = np.diff(expected)
+    matches = lengths == expected_lengths
+    result = np.zeros(expected[-1])
+    result[np.repeat(matches, expected_lengths)] = values[np.repeat(matches, lengths)]
+    return result
+
+
+def _segment_reduce(
+    batch: ActivityBatch, values: np.ndarray, ufunc: np.ufunc, empty: float
+) -> np.ndarray:
+    """Per-activity ``ufunc.reduce`` of per-sample values"""
+    nonempty = batch.offsets[1:] > batch.offsets[:-1]
+    result = np.full(len(batch), empty)
+    if nonempty.any():
+        result[nonempty] = ufunc.reduceat(values, batch.offsets[:-1][nonempty])
+    return result
+
+
+def _window_ends(batch: ActivityBatch, name: str, width: float) -> np.ndarray:
+    """For every sample, the first sample of its activity ``width`` further on.
+
+    ``name`` is a batch column that is non-decreasing within each activity
+    (time or distance). Activities are shifted apart so one global search
+    never crosses into the next activity; windows that run past their
+    activity's end get index -1.
+    """
+    values = getattr(batch, name)
+    extent = np.max(values) - np.min(values) if len(values) else 0.0
+    if width > extent:
+        return np.full(len(values), -1)
+    key = f"shifted_{name}"
+    if key not in batch._cache:
+        # Apart by more than twice the extent, so a window never reaches the next
+        batch._cache[key] = values + batch.activity * (2 * extent + 1)
+    shifted = batch._cache[key]
+    ends = np.searchsorted(shifted, shifted + width, side="left")
+    ends[ends >= batch.offsets[1:][batch.activity]] = -1
+    return ends
+
+
+def moving_time(batch: ActivityBatch) -> np.ndarray:
+    return batch.total(batch.dt)
+
+
+def average_hr(batch: ActivityBatch) -> np.ndarray:
+    """Time-weighted average heart rate per activity"""
+    duration = moving_time(batch)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return batch.total(batch.heartrate * batch.dt) / duration
+
+
+def hr_zone_time(batch: ActivityBatch, profile: AthleteProfile) -> np.ndarray:
+    """Seconds in each HR zone, shape (activities, zones)"""
+    bounds = profile.threshold_hr * np.asarray(profile.zone_bounds)
+    zones = len(bounds) + 1
+    zone = np.searchsorted(bounds, batch.heartrate, side="right")
+    seconds = np.bincount(
+        batch.activity * zones + zone, weights=batch.dt, minlength=len(batch) * zones
+    )
+    return seconds.reshape(len(batch), zones)
+
+
+def trimp(batch: ActivityBatch, profile: AthleteProfile) -> np.ndarray:
+    """Banister training impulse per activity"""
+    reserve = np.clip(
+        (batch.heartrate - profile.resting_hr) / (profile.max_hr - profile.resting_hr),
+        0,
+        1,
+    )
+    weight = 0.64 * np.exp(profile.trimp_factor * reserve)
+    return batch.total(batch.dt / 60 * reserve * weight)
+
+
+def hr_tss(batch: ActivityBatch, profile: AthleteProfile) -> np.ndarray:
+    """Heart-rate TSS: TRIMP relative to one hour at threshold heart rate"""
+    reserve = (profile.threshold_hr - profile.resting_hr) / (
+        profile.max_hr - profile.resting_hr
+    )
+    hour_at_threshold = 60 * reserve * 0.64 * np.exp(profile.trimp_factor * reserve)
+    return trimp(batch, profile) / hour_at_threshold * 100
+
+
+def grade_factor(grade_percent: np.ndarray) -> np.ndarray:
+    """Relative energy cost of running at a grade (Minetti et al., 2002)"""
+    i = np.clip(grade_percent / 100, -0.45, 0.45)
+    # 155.4i^5 - 30.4i^4 - 43.3i^3 + 46.3i^2 + 19.5i + 3.6 in Horner form
+    cost = ((((155.4 * i - 30.4) * i - 43.3) * i + 46.3) * i + 19.5) * i + 3.6
+    return cost / 3.6
+
+
+def grade_adjusted_speed(batch: ActivityBatch) -> np.ndarray:
+    """Average grade-adjusted speed per activity in m/s"""
+    speed = batch.graded_velocity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return batch.total(speed * batch.dt) / moving_time(batch)
+
+
+def running_tss(batch: ActivityBatch, profile: AthleteProfile) -> np.ndarray:
+    """Pace-based TSS from grade-adjusted speed relative to threshold speed"""
+    intensity = grade_adjusted_speed(batch) / profile.threshold_speed
+    return moving_time(batch) / 3600 * intensity**2 * 100
+
+
+def training_stress(
+    batch: ActivityBatch, profile: AthleteProfile, runs: np.ndarray
+) -> np.ndarray:
+    """TSS for the training load: pace-based for runs, heart-rate based otherwise.
+
+    ``runs`` flags the activities that are runs. Other activities without
+    heart rate, and activities without moving time, score 0.
+    """
+    tss = np.where(runs, running_tss(batch, profile), 0.0)
+    if batch.heartrate is not None:
+        tss = np.where(runs, tss, hr_tss(batch, profile))
+    return np.nan_to_num(tss, nan=0.0, posinf=0.0)
+
+
+def decoupling(batch: ActivityBatch) -> np.ndarray:
+    """Pace:HR decoupling in percent, second half of each activity vs first half.
+
+    Positive values mean speed per heartbeat dropped as the activity went on.
+    """
+    start = batch.time[np.minimum(batch.offsets[:-1], len(batch.time) - 1)]
+    halfway = start + batch.span(batch.time) / 2
+    half = (batch.time >= halfway[batch.activity]).astype(np.int64)
+    key = batch.activity * 2 + half
+    size = len(batch) * 2
+    meters = np.bincount(key, weights=batch.velocity * batch.dt, minlength=size)
+    beats = np.bincount(key, weights=batch.heartrate * batch.dt, minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Efficiency factor: meters per heartbeat in each half
+        efficiency = (meters / beats).reshape(len(batch), 2)
+        return (efficiency[:, 0] - efficiency[:, 1]) / efficiency[:, 0] * 100
+
+
+def splits(
+    batch: ActivityBatch, split: float = 1000.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Elapsed seconds of every full ``split`` meters of each activity.
+
+    Returns:
+        Split times back to back and per-activity offsets into them
+    """
+    counts = np.maximum(np.floor(batch.span(batch.distance) / split), 0)
+    counts = counts.astype(np.int64)
+    split_offsets = np.concatenate([[0], np.cumsum(counts)])
+    if not len(batch.distance):
+        return np.empty(0), split_offsets
+
+    # Marks at 0, split, 2 * split, ... meters into each activity, located in
+    # one interpolation over distances shifted apart per activity
+    mark_offsets = np.concatenate([[0], np.cumsum(counts + 1)])
+    owner = np.repeat(np.arange(len(batch)), counts + 1)
+    number = np.arange(mark_offsets[-1]) - mark_offsets[:-1][owner]
+    start = batch.distance[np.minimum(batch.offsets[:-1], len(batch.distance) - 1)]
+    spread = counts.max(initial=0) * split + split + 1
+    shifted = batch.distance - start[batch.activity] + batch.activity * spread
+    marks = np.interp(owner * spread + number * split, shifted, batch.time)
+    # Differences between the last mark of one activity and the next are dropped
+    return np.delete(np.diff(marks), mark_offsets[1:-1] - 1), split_offsets
+
+
+def best_speed(batch: ActivityBatch, duration: float) -> np.ndarray:
+    """Fastest average speed in m/s over ``duration`` seconds, NaN if shorter"""
+    ends = _window_ends(batch, "time", duration)
+    valid = ends >= 0
+    starts = np.flatnonzero(valid)
+    speed = np.full(len(batch.time), -np.inf)
+    speed[starts] = (batch.distance[ends[valid]] - batch.distance[starts]) / (
+        batch.time[ends[valid]] - batch.time[starts]
+    )
+    best = _segment_reduce(batch, speed, np.maximum, -np.inf)
+    return np.where(np.isinf(best), np.nan, best)
+
+
+def best_time(batch: ActivityBatch, distance: float) -> np.ndarray:
+    """Fastest elapsed seconds to cover ``distance`` meters, NaN if shorter"""
+    ends = _window_ends(batch, "distance", distance)
+    valid = ends >= 0
+    starts = np.flatnonzero(valid)
+    seconds = np.full(len(batch.time), np.inf)
+    seconds[starts] = batch.time[ends[valid]] - batch.time[starts]
+    best = _segment_reduce(batch, seconds, np.minimum, np.inf)
+    return np.where(np.isinf(best), np.nan, best)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_pace(speed: float) -> Optional[str]:
+    """Pace in min/km for a speed in m/s"""
+    if not np.isfinite(speed) or speed <= 0:
+        return None
+    return f"{format_duration(1000 / speed)}/km"
+
+
+def summarize(
+    batch: ActivityBatch, profile: Optional[AthleteProfile] = None
+) -> List[Dict[str, Any]]:
+    """Compact per-activity summaries, e.g. for the ``workout_data`` prompt field.
+
+    Heart-rate metrics are left out for activities recorded without HR.
+    """
+    profile = profile or AthleteProfile()
+    duration = moving_time(batch)
+    distance = batch.span(batch.distance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = distance / duration
+    gap = grade_adjusted_speed(batch)
+    tss = running_tss(batch, profile)
+    split_times, split_offsets = splits(batch)
+    efforts_by_time = {
+        name: best_speed(batch, d) for name, d in BEST_EFFORT_DURATIONS.items()
+    }
+    efforts_by_distance = {
+        name: best_time(batch, d) for name, d in BEST_EFFORT_DISTANCES.items()
+    }
+
+    has_hr = batch.heartrate is not None
+    if has_hr:
+        hr = average_hr(batch)
+        zones = hr_zone_time(batch, profile)
+        load = trimp(batch, profile)
+        hrtss = hr_tss(batch, profile)
+        drift = decoupling(batch)
+
+    summaries = []
+    for i in range(len(batch)):
+        summary: Dict[str, Any] = {
+            "distance_km": round(float(distance[i]) / 1000, 2),
+            "moving_time": format_duration(duration[i]),
+            "avg_pace": format_pace(speed[i]),
+            "grade_adjusted_pace": format_pace(gap[i]),
+            "splits": [
+                format_duration(s)
+                for s in split_times[split_offsets[i] : split_offsets[i + 1]]
+            ],
+            "tss": round(float(tss[i]), 1),
+            "best_efforts": {
+                **{
+                    name: format_pace(v[i])
+                    for name, v in efforts_by_time.items()
+                    if np.isfinite(v[i])
+                },
+                **{
+                    name: format_duration(v[i])
+                    for name, v in efforts_by_distance.items()
+                    if np.isfinite(v[i])
+                },
+            },
+        }
+        if has_hr:
+            summary.update(
+                avg_hr=None if np.isnan(hr[i]) else int(round(hr[i])),
+                hr_zone_minutes=[round(float(s) / 60, 1) for s in zones[i]],
+                trimp=round(float(load[i]), 1),
+                hr_tss=round(float(hrtss[i]), 1),
+                decoupling_pct=(
+                    None if not np.isfinite(drift[i]) else round(float(drift[i]), 1)
+                ),
+            )
+        summaries.append(summary)
+    return summaries
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """One line per metric, compact enough to inline in a prompt"""
+    lines = []
+    for key, value in summary.items():
+        if value is None or (isinstance(value, (list, dict)) and not value):
+            continue
+        if isinstance(value, dict):
+            value = ", ".join(f"{k} {v}" for k, v in value.items())
+        elif isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
@@ -0,0 +1,4 @@
+from .format import COLUMN_DTYPES, from_strava
+from .store import StreamStore
+
+__all__ = ["COLUMN_DTYPES", "StreamStore", "from_strava"]
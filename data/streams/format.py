@@ -0,0 +1,102 @@
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Compact dtypes for Strava stream types. Values that do not fit fall back
+# to the dtype NumPy infers, so nothing is ever truncated.
+COLUMN_DTYPES: Dict[str, np.dtype] = {
+    "time": np.dtype(np.int32),
+    "distance": np.dtype(np.float32),
+    "latlng": np.dtype(np.float64),
+    "altitude": np.dtype(np.float32),
+    "velocity_smooth": np.dtype(np.float32),
+    "heartrate": np.dtype(np.uint8),
+    "cadence": np.dtype(np.uint8),
+    "watts": np.dtype(np.uint16),
+    "temp": np.dtype(np.int8),
+    "moving": np.dtype(np.bool_),
+    "grade_smooth": np.dtype(np.float32),
+}
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODECS = {"raw": CODEC_RAW, "zlib": CODEC_ZLIB}
+
+
+def column_array(name: str, values: Any) -> np.ndarray:
+    """Convert stream values to the column's compact dtype when they fit"""
+    array = np.asarray(values)
+    dtype = COLUMN_DTYPES.get(name)
+    if dtype is None or array.dtype == dtype:
+        return np.ascontiguousarray(array)
+    if array.size and dtype.kind in "iu":
+        if not np.issubdtype(array.dtype, np.integer) and not np.array_equal(
+            array, np.round(array)
+        ):
+            return np.ascontiguousarray(array)
+        info = np.iinfo(dtype)
+        if array.min() < info.min or array.max() > info.max:
+            return np.ascontiguousarray(array)
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+def encode_chunks(
+    array: np.ndarray, chunk_size: int, codec: int, level: int = 1
+) -> Tuple[List[bytes], List[int]]:
+    """Split an array into chunks of ``chunk_size`` samples and encode each.
+
+    Compressed chunks that would not be smaller than the raw bytes are stored
+    raw, so incompressible columns such as coordinates cost nothing to read.
+
+    Returns:
+        Encoded chunks and the codec used for each
+    """
+    chunks, codecs = [], []
+    for start in range(0, len(array), chunk_size):
+        raw = array[start : start + chunk_size].tobytes()
+        if codec == CODEC_ZLIB:
+            compressed = zlib.compress(raw, level)
+            if len(compressed) < len(raw):
+                chunks.append(compressed)
+                codecs.append(CODEC_ZLIB)
+                continue
+        chunks.append(raw)
+        codecs.append(CODEC_RAW)
+    return chunks, codecs
+
+
+def decode_chunk(buffer: Any, offset: int, nbytes: int, codec: int) -> memoryview:
+    """Bytes of one chunk, zero-copy for raw chunks in a memory map"""
+    view = memoryview(buffer)[offset : offset + nbytes]
+    if codec == CODEC_ZLIB:
+        return memoryview(zlib.decompress(view))
+    return view
+
+
+def chunk_span(
+    chunk_starts: Sequence[int], start: Optional[float], end: Optional[float]
+) -> Tuple[int, int]:
+    """Chunks that may hold samples with ``start <= time < end``.
+
+    ``chunk_starts`` is the time of the first sample of each chunk.
+    """
+    starts = np.asarray(chunk_starts)
+    first = (
+        0 if start is None else max(int(np.searchsorted(starts, start, "left")) - 1, 0)
+    )
+    last = len(starts) if end is None else int(np.searchsorted(starts, end, "left"))
+    return first, max(first, last)
+
+
+def from_strava(streams: Any) -> Dict[str, np.ndarray]:
+    """Convert a Strava streams response to column arrays.
+
+    Accepts both the ``key_by_type=true`` mapping and the default list of
+    ``{"type", "data"}`` objects.
+    """
+    if isinstance(streams, dict):
+        items = [(name, stream["data"]) for name, stream in streams.items()]
+    else:
+        items = [(stream["type"], stream["data"]) for stream in streams]
+    return {name: column_array(name, data) for name, data in items}
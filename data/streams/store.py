@@ -0,0 +1,356 @@
+import mmap
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .format import (
+    CODECS,
+    chunk_span,
+    column_array,
+    decode_chunk,
+    encode_chunks,
+)
+
+INDEX = "index.sqlite"
+
+
+class StreamStore:
+    """Columnar store for per-second activity streams.
+
+    Each stream type of an athlete lives in one append-only column file,
+    ``<athlete>/<column>.col``, holding the activity's values in chunks of
+    ``chunk_size`` samples. Chunks are zlib-compressed unless that does not
+    make them smaller, and raw chunks are read zero-copy from a memory map.
+    A SQLite index keyed by athlete and activity records each column's dtype,
+    chunk offsets and codecs, plus the start time of every chunk so that
+    time-range reads only decode the chunks they overlap.
+
+    Column data is written before the index is committed, so readers never
+    see partial activities. Rewritten and deleted activities leave dead bytes
+    behind in the column files.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        chunk_size: int = 4096,
+        codec: str = "zlib",
+        level: int = 1,
+    ):
+        """Initialize StreamStore.
+
+        Args:
+            path: Directory for the index and column files
+            chunk_size: Samples per chunk, the unit of decoding for range reads
+            codec: "zlib" or "raw"
+            level: zlib compression level
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}. Expected one of {list(CODECS)}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.codec = CODECS[codec]
+        self.level = level
+        self._lock = threading.Lock()
+        self._maps: Dict[Path, mmap.mmap] = {}
+        self._conn = sqlite3.connect(str(self.path / INDEX), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS activities (
+                athlete INTEGER NOT NULL,
+                activity INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                chunk_starts BLOB,
+                PRIMARY KEY (athlete, activity)
+            )""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS columns (
+                athlete INTEGER NOT NULL,
+                activity INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                dtype TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                offsets BLOB NOT NULL,
+                codecs BLOB NOT NULL,
+                PRIMARY KEY (athlete, activity, name)
+            )""")
+        self._conn.commit()
+
+    def _column_path(self, athlete_id: int, name: str) -> Path:
+        return self.path / str(athlete_id) / f"{name}.col"
+
+    def _buffer(self, path: Path, end: int) -> mmap.mmap:
+        """Read-only memory map of a column file covering at least ``end`` bytes"""
+        buffer = self._maps.get(path)
+        if buffer is None or len(buffer) < end:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Arrays still viewing an older map keep it alive until released
+            self._maps[path] = buffer
+        return buffer
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM activities WHERE athlete = ? AND activity = ?", key
+            ).fetchone()
+        return row is not None
+
+    def activities(self, athlete_id: int) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT activity FROM activities WHERE athlete = ? ORDER BY activity",
+                (athlete_id,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def columns(self, athlete_id: int, activity_id: int) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM columns WHERE athlete = ? AND activity = ? "
+                "ORDER BY name",
+                (athlete_id, activity_id),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def write(self, athlete_id: int, activity_id: int, streams: Dict[str, Any]) -> None:
+        """Store an activity's streams, replacing any earlier version.
+
+        Args:
+            athlete_id: Owner of the activity
+            activity_id: Activity the streams belong to
+            streams: Column name to values, all with one entry per sample.
+                Multi-valued samples such as ``latlng`` pairs are 2-D
+        """
+        arrays = {name: column_array(name, values) for name, values in streams.items()}
+        lengths = {len(array) for array in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Streams have different lengths: {sorted(lengths)}")
+        samples = lengths.pop() if lengths else 0
+
+        chunk_starts = None
+        if "time" in arrays:
+            times = arrays["time"].astype(np.int64)
+            if np.any(np.diff(times) < 0):
+                raise ValueError("time stream must be non-decreasing")
+            chunk_starts = times[:: self.chunk_size].tobytes()
+
+        with self._lock:
+            column_rows = []
+            for name, array in arrays.items():
+                chunks, codecs = encode_chunks(
+                    array, self.chunk_size, self.codec, self.level
+                )
+                path = self._column_path(athlete_id, name)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "ab") as f:
+                    position = f.seek(0, 2)
+                    for chunk in chunks:
+                        f.write(chunk)
+                sizes = np.fromiter((len(c) for c in chunks), np.int64, len(chunks))
+                offsets = np.concatenate([[0], np.cumsum(sizes)]) + position
+                column_rows.append(
+                    (
+                        athlete_id,
+                        activity_id,
+                        name,
+                        array.dtype.str,
+                        int(np.prod(array.shape[1:], dtype=np.int64)),
+                        offsets.astype(np.int64).tobytes(),
+                        np.asarray(codecs, np.uint8).tobytes(),
+                    )
+                )
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO activities VALUES (?, ?, ?, ?, ?)",
+                (athlete_id, activity_id, samples, self.chunk_size, chunk_starts),
+            )
+            self._conn.execute(
+                "DELETE FROM columns WHERE athlete = ? AND activity = ?",
+                (athlete_id, activity_id),
+            )
+            self._conn.executemany(
+                "INSERT INTO columns VALUES (?, ?, ?, ?, ?, ?, ?)", column_rows
+            )
+            self._conn.commit()
+
+    def delete(self, athlete_id: int, activity_id: int) -> None:
+        with self._lock:
+            for table in ("activities", "columns"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE athlete = ? AND activity = ?",
+                    (athlete_id, activity_id),
+                )
+            self._conn.commit()
+
+    def _decode(
+        self,
+        path: Path,
+        dtype: str,
+        width: int,
+        offsets: bytes,
+        codecs: bytes,
+        first: int = 0,
+        last: Optional[int] = None,
+    ) -> np.ndarray:
+        """Values of chunks ``first`` to ``last`` (exclusive) of one column"""
+        offsets = np.frombuffer(offsets, np.int64)
+        codecs = np.frombuffer(codecs, np.uint8)
+        last = len(codecs) if last is None else last
+        shape = (-1, width) if width > 1 else (-1,)
+        if first >= last:
+            return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+
+        buffer = self._buffer(path, int(offsets[last]))
+        if not codecs[first:last].any():
+            # All raw: a zero-copy view of the memory map
+            count = (offsets[last] - offsets[first]) // np.dtype(dtype).itemsize
+            array = np.frombuffer(
+                buffer, dtype, count=int(count), offset=int(offsets[first])
+            )
+            return array.reshape(shape)
+        parts = [
+            decode_chunk(
+                buffer, int(offsets[i]), int(offsets[i + 1] - offsets[i]), codecs[i]
+            )
+            for i in range(first, last)
+        ]
+        data = parts[0] if len(parts) == 1 else b"".join(parts)
+        return np.frombuffer(data, dtype).reshape(shape)
+
+    def read(
+        self,
+        athlete_id: int,
+        activity_id: int,
+        columns: Optional[Iterable[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Read streams of one activity, optionally limited to a time range.
+
+        Args:
+            athlete_id: Owner of the activity
+            activity_id: Activity to read
+            columns: Columns to read. Defaults to all stored columns
+            start: Optional time offset in seconds; samples before it are skipped
+            end: Optional time offset in seconds; samples from it on are skipped
+
+        Returns:
+            Column name to array. Raw columns may be read-only memory-map views
+
+        Raises:
+            KeyError: If the activity or a requested column is not stored
+        """
+        with self._lock:
+            activity = self._conn.execute(
+                "SELECT samples, chunk_starts FROM activities "
+                "WHERE athlete = ? AND activity = ?",
+                (athlete_id, activity_id),
+            ).fetchone()
+            if activity is None:
+                raise KeyError(f"No streams for activity {activity_id}")
+            rows = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    "SELECT name, dtype, width, offsets, codecs FROM columns "
+                    "WHERE athlete = ? AND activity = ?",
+                    (athlete_id, activity_id),
+                )
+            }
+        names = list(rows) if columns is None else list(columns)
+        missing = [name for name in names if name not in rows]
+        if missing:
+            raise KeyError(f"Activity {activity_id} has no streams {missing}")
+
+        if start is None and end is None:
+            return {
+                name: self._decode(self._column_path(athlete_id, name), *rows[name])
+                for name in names
+            }
+
+        if activity[1] is None or "time" not in rows:
+            raise ValueError("Range reads need a time stream")
+        first, last = chunk_span(np.frombuffer(activity[1], np.int64), start, end)
+        times = self._decode(
+            self._column_path(athlete_id, "time"), *rows["time"], first, last
+        )
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "left"))
+        return {
+            name: (
+                times
+                if name == "time"
+                else self._decode(
+                    self._column_path(athlete_id, name), *rows[name], first, last
+                )
+            )[lo:hi]
+            for name in names
+        }
+
+    def read_many(
+        self, athlete_id: int, activity_ids: Sequence[int], column: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """One column of many activities, concatenated for batch processing.
+
+        Returns:
+            Values of all activities back to back, and ``len(activity_ids) + 1``
+            offsets so that activity ``i`` is ``values[offsets[i]:offsets[i + 1]]``.
+            Activities without the column contribute no values
+
+        Raises:
+            KeyError: If an activity is not stored
+        """
+        activity_ids = list(activity_ids)
+        found: Dict[int, Tuple[int, Optional[tuple]]] = {}
+        with self._lock:
+            for start in range(0, len(activity_ids), 500):
+                chunk = activity_ids[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for (
+                    activity,
+                    samples,
+                    dtype,
+                    width,
+                    offsets,
+                    codecs,
+                ) in self._conn.execute(
+                    "SELECT a.activity, a.samples, c.dtype, c.width, c.offsets, c.codecs "
+                    "FROM activities a LEFT JOIN columns c ON c.athlete = a.athlete "
+                    "AND c.activity = a.activity AND c.name = ? "
+                    f"WHERE a.athlete = ? AND a.activity IN ({placeholders})",
+                    [column, athlete_id, *chunk],
+                ):
+                    found[activity] = (
+                        samples,
+                        None if dtype is None else (dtype, width, offsets, codecs),
+                    )
+        missing = [a for a in activity_ids if a not in found]
+        if missing:
+            raise KeyError(f"No streams for activities {missing[:10]}")
+
+        counts = np.array(
+            [found[a][0] if found[a][1] is not None else 0 for a in activity_ids],
+            dtype=np.int64,
+        )
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        described = [found[a][1] for a in activity_ids if found[a][1] is not None]
+        if not described:
+            return np.empty(0), offsets
+        dtype = np.result_type(*(np.dtype(d[0]) for d in described))
+        width = described[0][1]
+        values = np.empty((offsets[-1], width) if width > 1 else offsets[-1], dtype)
+        path = self._column_path(athlete_id, column)
+        for i, activity in enumerate(activity_ids):
+            if found[activity][1] is not None:
+                values[offsets[i] : offsets[i + 1]] = self._decode(
+                    path, *found[activity][1]
+                )
+        return values, offsets
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+            self._maps.clear()
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from auth.strava import StravaClient
+
+from .analytics import ActivityBatch, AthleteProfile, training_stress
+from .streams import StreamStore, from_strava
+from .training_load import TrainingLoadStore
+
+# Strava activity types whose TSS comes from pace rather than heart rate
+RUN_TYPES = ("Run", "TrailRun", "VirtualRun")
+
+# (athlete id, activity id, day, TSS) of a fetched activity
+Load = Tuple[int, int, date, float]
+
+
+@dataclass
+class SyncResult:
+    """Outcome of one ActivitySync run"""
+
+    activity_ids: List[int] = field(default_factory=list)
+    requests: int = 0
+    cursor: Optional[int] = None
+
+
+def start_timestamp(activity: Dict[str, Any]) -> int:
+    """Epoch seconds of an activity's ``start_date`` (ISO 8601, UTC)"""
+    return int(
+        datetime.fromisoformat(
+            activity["start_date"].replace("Z", "+00:00")
+        ).timestamp()
+    )
+
+
+def _write_json(path: Path, data: Any) -> None:
+    """Write JSON atomically so an interrupted sync never leaves partial files"""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+class ActivitySync:
+    """Incremental sync of an athlete's Strava activities to disk.
+
+    Only activities that started after the stored cursor are requested, so
+    re-running on an up-to-date athlete costs one request. Listing pages and
+    per-activity details are fetched concurrently over the client's pool.
+    The cursor only advances once every new activity is stored, so a failed
+    run is simply repeated by the next one.
+
+    Layout under ``path``: ``cursor.json`` with the ``after`` timestamp, and
+    one ``activities/<id>.json`` file per activity with its detailed data.
+    With a ``stream_store``, each activity's time-series streams are fetched
+    as well and stored there under the activity's athlete. With a
+    ``training_load`` store, the TSS of every new activity is computed from
+    its streams and recorded there, once per athlete at the end of a run.
+    """
+
+    def __init__(
+        self,
+        client: StravaClient,
+        path: Optional[Union[str, Path]] = None,
+        per_page: int = 200,
+        page_concurrency: int = 4,
+        detail_concurrency: int = 8,
+        stream_store: Optional[StreamStore] = None,
+        training_load: Optional[TrainingLoadStore] = None,
+        profile: Optional[AthleteProfile] = None,
+    ):
+        """Initialize ActivitySync.
+
+        Args:
+            client: Strava client of the athlete to sync
+            path: Directory for the cursor and activities. Defaults to ~/.running_coach
+            per_page: Activities per listing page (Strava allows up to 200)
+            page_concurrency: Listing pages requested at once past the first page
+            detail_concurrency: Activity details requested at once
+            stream_store: Optional store for the activities' streams
+            training_load: Optional store to record the activities' TSS in
+            profile: Thresholds the TSS is computed against
+        """
+        self.client = client
+        self.path = Path(path or Path.home() / ".running_coach" / "strava")
+        self.activities_dir = self.path / "activities"
+        self.activities_dir.mkdir(parents=True, exist_ok=True)
+        self.cursor_path = self.path / "cursor.json"
+        self.per_page = per_page
+        self.page_concurrency = page_concurrency
+        self.detail_concurrency = detail_concurrency
+        self.stream_store = stream_store
+        self.training_load = training_load
+        self.profile = profile or AthleteProfile()
+
+    @property
+    def cursor(self) -> Optional[int]:
+        """Start time of the newest synced activity, or None before the first sync"""
+        if not self.cursor_path.exists():
+            return None
+        return json.loads(self.cursor_path.read_text())["after"]
+
+    def load_activity(self, activity_id: int) -> Optional[Dict[str, Any]]:
+        path = self.activities_dir / f"{activity_id}.json"
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def activity_ids(self) -> List[int]:
+        return sorted(int(path.stem) for path in self.activities_dir.glob("*.json"))
+
+    async def run(self) -> SyncResult:
+        """Fetch and store every activity newer than the cursor"""
+        after = self.cursor
+        requests_before = self.client.requests_made
+        semaphore = asyncio.Semaphore(self.detail_concurrency)
+        details: List["asyncio.Task[Tuple[int, int, Optional[Load]]]"] = []
+
+        def schedule(summaries: List[Dict[str, Any]]) -> None:
+            for summary in summaries:
+                details.append(
+                    asyncio.ensure_future(self._store_detail(summary, semaphore))
+                )
+
+        try:
+            first = await self.client.list_activities(after, 1, self.per_page)
+            schedule(first)
+            if len(first) == self.per_page:
+                await self._list_pages(after, schedule)
+            stored = await asyncio.gather(*details)
+        except BaseException:
+            for task in details:
+                task.cancel()
+            await asyncio.gather(*details, return_exceptions=True)
+            raise
+
+        # Recorded before the cursor moves, so a failure is retried next run
+        await self._record_load([load for _, _, load in stored if load is not None])
+        cursor = max([after or 0, *(started for _, started, _ in stored)]) or None
+        if cursor != after:
+            _write_json(self.cursor_path, {"after": cursor})
+        return SyncResult(
+            activity_ids=[activity_id for activity_id, _, _ in stored],
+            requests=self.client.requests_made - requests_before,
+            cursor=cursor,
+        )
+
+    async def _list_pages(
+        self, after: Optional[int], schedule: Callable[[List[Dict[str, Any]]], None]
+    ) -> None:
+        """List pages from 2 on, ``page_concurrency`` at a time, until a short page.
+
+        A short page ends the listing, so requests for later pages are
+        cancelled, before they spend the rate limit where they still wait on
+        it, and no further pages are requested.
+        """
+        pending: Dict["asyncio.Task[List[Dict[str, Any]]]", int] = {}
+        cancelled: List["asyncio.Task[List[Dict[str, Any]]]"] = []
+        next_page = 2
+        last_page: Optional[int] = None
+        try:
+            while True:
+                while last_page is None and len(pending) < self.page_concurrency:
+                    task = asyncio.ensure_future(
+                        self.client.list_activities(after, next_page, self.per_page)
+                    )
+                    pending[task] = next_page
+                    next_page += 1
+                if not pending:
+                    return
+
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    page = pending.pop(task)
+                    summaries = task.result()
+                    schedule(summaries)
+                    if len(summaries) < self.per_page:
+                        last_page = page if last_page is None else min(last_page, page)
+                if last_page is not None:
+                    for task, page in list(pending.items()):
+                        if page > last_page:
+                            task.cancel()
+                            del pending[task]
+                            cancelled.append(task)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, *cancelled, return_exceptions=True)
+
+    async def fetch(self, activity_id: int) -> Dict[str, Any]:
+        """Fetch and store one activity, with its streams if there is a stream_store.
+
+        With a training_load store, the activity's TSS is recorded as well.
+        """
+        detail, load = await self._fetch(activity_id)
+        if load is not None:
+            await self._record_load([load])
+        return detail
+
+    async def _fetch(self, activity_id: int) -> Tuple[Dict[str, Any], Optional[Load]]:
+        detail = await self.client.get_activity(activity_id)
+        load = None
+        if self.stream_store is not None or self.training_load is not None:
+            streams = from_strava(await self.client.get_streams(activity_id))
+            if self.stream_store is not None:
+                self.stream_store.write(detail["athlete"]["id"], activity_id, streams)
+            if self.training_load is not None:
+                load = self._load(detail, streams)
+        _write_json(self.activities_dir / f"{activity_id}.json", detail)
+        return detail, load
+
+    def _load(
+        self, detail: Dict[str, Any], streams: Dict[str, np.ndarray]
+    ) -> Optional[Load]:
+        """Training load entry of an activity, None without a time stream"""
+        if "time" not in streams:
+            return None
+        # Scored one activity at a time so a long first sync never holds
+        # every activity's streams in memory
+        batch = ActivityBatch.from_streams([streams])
+        is_run = detail.get("sport_type", detail.get("type")) in RUN_TYPES
+        tss = training_stress(batch, self.profile, np.array([is_run]))[0]
+        day = date.fromisoformat(
+            (detail.get("start_date_local") or detail["start_date"])[:10]
+        )
+        return detail["athlete"]["id"], detail["id"], day, float(tss)
+
+    async def _record_load(self, loads: List[Load]) -> None:
+        """Record activities' TSS with one record_many per athlete"""
+        if self.training_load is None or not loads:
+            return
+        by_athlete: Dict[int, List[Tuple[int, date, float]]] = {}
+        for athlete_id, activity_id, day, tss in loads:
+            by_athlete.setdefault(athlete_id, []).append((activity_id, day, tss))
+        loop = asyncio.get_running_loop()
+        for athlete_id, activities in by_athlete.items():
+            await loop.run_in_executor(
+                None, self.training_load.record_many, athlete_id, activities
+            )
+
+    async def _store_detail(
+        self, summary: Dict[str, Any], semaphore: asyncio.Semaphore
+    ) -> Tuple[int, int, Optional[Load]]:
+        async with semaphore:
+            _, load = await self._fetch(summary["id"])
+        return summary["id"], start_timestamp(summary), load
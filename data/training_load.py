@@ -0,0 +1,220 @@
+import math
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+
+@dataclass
+class LoadState:
+    """Training load at the end of a day"""
+
+    day: date
+    tss: float  # Stress of the day's activities
+    ctl: float  # Chronic training load, "fitness"
+    atl: float  # Acute training load, "fatigue"
+
+    @property
+    def tsb(self) -> float:
+        """Training stress balance, "form" """
+        return self.ctl - self.atl
+
+
+class TrainingLoadStore:
+    """Materialized daily CTL/ATL/TSB per athlete, kept in SQLite.
+
+    Per-activity TSS is stored alongside one state row per day from the
+    athlete's first activity to their latest. Recording activities after the
+    latest day only extends the rows (O(new days)); changing or deleting a
+    past activity recomputes from that day on, reusing the day before it.
+    Days after the last row decay without new stress.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ctl_days: float = 42,
+        atl_days: float = 7,
+    ):
+        """Initialize TrainingLoadStore.
+
+        Args:
+            path: SQLite file. Defaults to ~/.running_coach/training_load.sqlite
+            ctl_days: Time constant of chronic training load
+            atl_days: Time constant of acute training load
+        """
+        self.path = Path(
+            path or Path.home() / ".running_coach" / "training_load.sqlite"
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ctl_decay = math.exp(-1 / ctl_days)
+        self.atl_decay = math.exp(-1 / atl_days)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS activity_load (
+                athlete INTEGER NOT NULL,
+                activity INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                tss REAL NOT NULL,
+                PRIMARY KEY (athlete, activity)
+            )""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS daily_load (
+                athlete INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                tss REAL NOT NULL,
+                ctl REAL NOT NULL,
+                atl REAL NOT NULL,
+                PRIMARY KEY (athlete, day)
+            )""")
+        self._conn.commit()
+
+    def record(
+        self, athlete_id: int, activity_id: int, day: date, tss: float
+    ) -> Optional[date]:
+        return self.record_many(athlete_id, [(activity_id, day, tss)])
+
+    def record_many(
+        self, athlete_id: int, activities: Iterable[Tuple[int, date, float]]
+    ) -> Optional[date]:
+        """Add or update activities' TSS and bring the daily states up to date.
+
+        Returns:
+            The first day that was recomputed, or None if nothing changed
+        """
+        rows = [(athlete_id, a, d.toordinal(), float(t)) for a, d, t in activities]
+        if not rows:
+            return None
+        with self._lock:
+            changed = [day for _, _, day, _ in rows]
+            changed += self._days_of(athlete_id, [a for _, a, _, _ in rows])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO activity_load VALUES (?, ?, ?, ?)", rows
+            )
+            first = min(changed)
+            self._materialize(athlete_id, first)
+            self._conn.commit()
+        return date.fromordinal(first)
+
+    def delete(self, athlete_id: int, activity_id: int) -> Optional[date]:
+        """Remove an activity and recompute the days after it"""
+        with self._lock:
+            days = self._days_of(athlete_id, [activity_id])
+            if not days:
+                return None
+            self._conn.execute(
+                "DELETE FROM activity_load WHERE athlete = ? AND activity = ?",
+                (athlete_id, activity_id),
+            )
+            self._materialize(athlete_id, days[0])
+            self._conn.commit()
+        return date.fromordinal(days[0])
+
+    def _days_of(self, athlete_id: int, activity_ids: List[int]) -> List[int]:
+        """Days currently recorded for activities, so moves recompute both days"""
+        days = []
+        for start in range(0, len(activity_ids), 500):
+            chunk = activity_ids[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            days += [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT day FROM activity_load "
+                    f"WHERE athlete = ? AND activity IN ({placeholders})",
+                    [athlete_id, *chunk],
+                )
+            ]
+        return days
+
+    def _materialize(self, athlete_id: int, first: int) -> None:
+        """Rewrite the daily rows from day ``first`` on"""
+        previous = self._conn.execute(
+            "SELECT day, ctl, atl FROM daily_load WHERE athlete = ? AND day < ? "
+            "ORDER BY day DESC LIMIT 1",
+            (athlete_id, first),
+        ).fetchone()
+        daily = dict(
+            self._conn.execute(
+                "SELECT day, SUM(tss) FROM activity_load WHERE athlete = ? AND day >= ? "
+                "GROUP BY day",
+                (athlete_id, first),
+            ).fetchall()
+        )
+        self._conn.execute(
+            "DELETE FROM daily_load WHERE athlete = ? AND day >= ?", (athlete_id, first)
+        )
+        if not daily:
+            return
+
+        if previous is None:
+            # No history before this day: start from the athlete's first activity
+            day, ctl, atl = min(daily) - 1, 0.0, 0.0
+        else:
+            day, ctl, atl = previous
+            # Bridge any empty days between the last row and ``first``
+            ctl *= self.ctl_decay ** (first - 1 - day)
+            atl *= self.atl_decay ** (first - 1 - day)
+            day = first - 1
+
+        rows = []
+        for day in range(day + 1, max(daily) + 1):
+            tss = daily.get(day, 0.0)
+            ctl = ctl * self.ctl_decay + tss * (1 - self.ctl_decay)
+            atl = atl * self.atl_decay + tss * (1 - self.atl_decay)
+            rows.append((athlete_id, day, tss, ctl, atl))
+        self._conn.executemany("INSERT INTO daily_load VALUES (?, ?, ?, ?, ?)", rows)
+
+    def state(self, athlete_id: int, day: Optional[date] = None) -> Optional[LoadState]:
+        """Training load at the end of ``day`` (default today), None without history"""
+        day = day or date.today()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT day, tss, ctl, atl FROM daily_load WHERE athlete = ? AND day <= ? "
+                "ORDER BY day DESC LIMIT 1",
+                (athlete_id, day.toordinal()),
+            ).fetchone()
+        if row is None:
+            return None
+        last, tss, ctl, atl = row
+        gap = day.toordinal() - last
+        if gap == 0:
+            return LoadState(day, tss, ctl, atl)
+        return LoadState(day, 0.0, ctl * self.ctl_decay**gap, atl * self.atl_decay**gap)
+
+    def history(self, athlete_id: int, start: date, end: date) -> List[LoadState]:
+        """Materialized daily states from ``start`` to ``end``, both included"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, tss, ctl, atl FROM daily_load "
+                "WHERE athlete = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (athlete_id, start.toordinal(), end.toordinal()),
+            ).fetchall()
+        return [LoadState(date.fromordinal(d), t, c, a) for d, t, c, a in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def training_load_context(
+    store: TrainingLoadStore, athlete_id: int, day: Optional[date] = None
+) -> str:
+    """Current load and its trend over the past four weeks, for prompts"""
+    day = day or date.today()
+    state = store.state(athlete_id, day)
+    if state is None:
+        return "Training load: no recorded activities"
+    lines = [
+        f"Training load on {state.day.isoformat()}: fitness (CTL) {state.ctl:.0f}, "
+        f"fatigue (ATL) {state.atl:.0f}, form (TSB) {state.tsb:+.0f}"
+    ]
+    weeks = []
+    for weeks_ago in (4, 3, 2, 1):
+        past = store.state(athlete_id, day - timedelta(weeks=weeks_ago))
+        if past is not None:
+            weeks.append(f"{weeks_ago}w ago CTL {past.ctl:.0f}")
+    if weeks:
+        lines.append("Trend: " + ", ".join(weeks))
+    return "\n".join(lines)
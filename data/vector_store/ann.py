@@ -0,0 +1,322 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .utils import as_matrix, as_vector, squared_l2, top_k
+
+if TYPE_CHECKING:
+    from .quantization import Quantizer
+
+
+def kmeans(
+    data: np.ndarray, k: int, iterations: int = 20, seed: Optional[int] = None
+) -> np.ndarray:
+    """Lloyd's k-means on a float32 matrix. Returns the ``k`` centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, data.shape[0])
+    centroids = data[rng.choice(data.shape[0], size=k, replace=False)].copy()
+    data_norms = np.einsum("ij,ij->i", data, data)
+
+    for _ in range(iterations):
+        centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+        distances = (
+            data_norms[:, None] - 2.0 * (data @ centroids.T) + centroid_norms[None, :]
+        )
+        assignment = distances.argmin(axis=1)
+
+        # Sum each cluster's rows as one contiguous run of the sorted data
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        starts = np.cumsum(counts) - counts
+        ordered = data[np.argsort(assignment, kind="stable")]
+        sums = np.add.reduceat(ordered, starts[~empty], axis=0)
+        centroids[~empty] = sums / counts[~empty, None]
+        # Re-seed empty clusters with random points so every list stays usable
+        if empty.any():
+            centroids[empty] = data[rng.choice(data.shape[0], size=int(empty.sum()))]
+
+    return centroids
+
+
+class _InvertedList:
+    """Contiguous storage for the vectors assigned to one centroid.
+
+    Rows are float32 vectors, or codes of ``quantizer`` when one is given.
+    """
+
+    def __init__(self, dim: int, quantizer: Optional["Quantizer"] = None):
+        self.size = 0
+        self.quantizer = quantizer
+        if quantizer is None:
+            self.vectors = np.empty((0, dim), dtype=np.float32)
+        else:
+            self.vectors = np.empty((0, quantizer.code_size), dtype=quantizer.dtype)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.ids: List[str] = []
+
+    def extend(self, ids: List[str], matrix: np.ndarray) -> int:
+        if self.quantizer is None:
+            row_norms = np.einsum("ij,ij->i", matrix, matrix)
+        else:
+            matrix = self.quantizer.encode(matrix)
+            row_norms = self.quantizer.norms(matrix)
+        start = self.size
+        needed = start + len(ids)
+        if needed > self.vectors.shape[0]:
+            capacity = max(needed, 2 * self.vectors.shape[0], 16)
+            vectors = np.empty((capacity, matrix.shape[1]), dtype=matrix.dtype)
+            norms = np.empty(capacity, dtype=np.float32)
+            vectors[:start] = self.vectors[:start]
+            norms[:start] = self.norms[:start]
+            self.vectors, self.norms = vectors, norms
+        self.vectors[start:needed] = matrix
+        self.norms[start:needed] = row_norms
+        self.ids.extend(ids)
+        self.size = needed
+        return start
+
+    def decoded(self) -> np.ndarray:
+        vectors = self.vectors[: self.size]
+        return vectors if self.quantizer is None else self.quantizer.decode(vectors)
+
+    def distances(self, query: np.ndarray) -> np.ndarray:
+        vectors, norms = self.vectors[: self.size], self.norms[: self.size]
+        if self.quantizer is None:
+            return squared_l2(vectors, norms, query)
+        return self.quantizer.distances(query, vectors, norms)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.norms.nbytes
+
+    def remove(self, pos: int) -> Optional[str]:
+        """Swap-remove the row at ``pos``. Returns the id moved into ``pos``."""
+        last = self.size - 1
+        moved = None
+        if pos != last:
+            self.vectors[pos] = self.vectors[last]
+            self.norms[pos] = self.norms[last]
+            self.ids[pos] = self.ids[last]
+            moved = self.ids[pos]
+        self.ids.pop()
+        self.size = last
+        return moved
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index.
+
+    Vectors are assigned to the nearest of ``n_lists`` k-means centroids and a
+    query only scans the ``n_probe`` closest lists. Until ``train_size``
+    vectors have been added the index has a single list, so search is exact.
+    Distances are squared L2, the same space as the vector store backends.
+
+    With a ``quantizer``, trained along with the centroids, lists store each
+    vector's residual from its centroid in compressed form, and distances
+    to it are approximate.
+    """
+
+    def __init__(
+        self,
+        n_lists: int = 256,
+        n_probe: int = 8,
+        train_size: Optional[int] = None,
+        iterations: int = 20,
+        seed: Optional[int] = None,
+        quantizer: Optional["Quantizer"] = None,
+    ):
+        """Initialize IVFIndex.
+
+        Args:
+            n_lists: Number of k-means centroids (inverted lists)
+            n_probe: Default number of lists scanned per query
+            train_size: Vectors to collect before training. Defaults to 39 * n_lists
+            iterations: k-means iterations when training
+            seed: Optional random seed for reproducible training
+            quantizer: Optional compressed encoding for stored vectors
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size or 39 * n_lists
+        self.iterations = iterations
+        self.seed = seed
+        self.quantizer = quantizer
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[_InvertedList] = []
+        self._locations: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._locations
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def is_quantized(self) -> bool:
+        """Whether stored vectors are compressed, making distances approximate"""
+        return self.quantizer is not None and self.centroids is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by centroids and inverted lists"""
+        centroids = 0 if self.centroids is None else self.centroids.nbytes
+        return centroids + sum(inverted.nbytes for inverted in self._lists)
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.zeros(matrix.shape[0], dtype=np.intp)
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        distances = centroid_norms[None, :] - 2.0 * (matrix @ self.centroids.T)
+        return distances.argmin(axis=1)
+
+    def _insert(self, ids: List[str], matrix: np.ndarray) -> None:
+        if not self._lists:
+            n = 1 if self.centroids is None else len(self.centroids)
+            quantizer = self.quantizer if self.is_quantized else None
+            self._lists = [_InvertedList(matrix.shape[1], quantizer) for _ in range(n)]
+
+        assignment = self._assign(matrix)
+        order = np.argsort(assignment, kind="stable")
+        boundaries = np.flatnonzero(np.diff(assignment[order])) + 1
+        for group in np.split(order, boundaries):
+            if not len(group):
+                continue
+            list_no = int(assignment[group[0]])
+            group_ids = [ids[i] for i in group.tolist()]
+            vectors = matrix[group]
+            if self.is_quantized:
+                vectors = vectors - self.centroids[list_no]
+            start = self._lists[list_no].extend(group_ids, vectors)
+            for offset, id in enumerate(group_ids):
+                self._locations[id] = (list_no, start + offset)
+
+    def _all(self) -> Tuple[List[str], np.ndarray]:
+        ids = [id for inverted in self._lists for id in inverted.ids]
+        matrix = np.concatenate(
+            [
+                (
+                    inverted.decoded() + self.centroids[list_no]
+                    if self.is_quantized
+                    else inverted.decoded()
+                )
+                for list_no, inverted in enumerate(self._lists)
+            ]
+        )
+        return ids, matrix
+
+    def train(self, matrix: Optional[np.ndarray] = None) -> None:
+        """Train centroids and redistribute all stored vectors.
+
+        Retraining a quantized index re-encodes the decoded, approximate
+        vectors, so pass the original vectors as ``matrix`` where possible.
+
+        Args:
+            matrix: Optional training sample. Defaults to the stored vectors
+        """
+        ids, stored = self._all() if self._locations else ([], None)
+        sample = matrix if matrix is not None else stored
+        if sample is None or len(sample) == 0:
+            raise ValueError("No vectors available to train the index")
+
+        sample = as_matrix(sample)
+        rng = np.random.default_rng(self.seed)
+        if len(sample) > 256 * self.n_lists:
+            sample = sample[rng.choice(len(sample), 256 * self.n_lists, replace=False)]
+        self.centroids = kmeans(sample, self.n_lists, self.iterations, self.seed)
+        if self.quantizer is not None:
+            residuals = sample - self.centroids[self._assign(sample)]
+            self.quantizer.train(residuals)
+
+        self._lists = []
+        self._locations = {}
+        if stored is not None:
+            self._insert(ids, stored)
+
+    def add(self, id: str, embedding: Union[np.ndarray, List[float]]) -> None:
+        """Add or replace a single vector."""
+        self.add_many([id], [embedding])
+
+    def add_many(
+        self,
+        ids: List[str],
+        embeddings: List[Union[np.ndarray, List[float]]],
+    ) -> None:
+        """Add or replace vectors. Trains the index once ``train_size`` is reached."""
+        if len(ids) != len(embeddings):
+            raise ValueError("ids and embeddings must have the same length")
+        if not ids:
+            return
+        for id in ids:
+            if id in self._locations:
+                self.remove(id)
+
+        self._insert(list(ids), as_matrix(embeddings))
+        if self.centroids is None and len(self._locations) >= self.train_size:
+            self.train()
+
+    def remove(self, id: str) -> None:
+        """Remove a vector.
+
+        Raises:
+            KeyError: If ID not found
+        """
+        list_no, pos = self._locations.pop(id)
+        moved = self._lists[list_no].remove(pos)
+        if moved is not None:
+            self._locations[moved] = (list_no, pos)
+
+    def clear(self) -> None:
+        """Remove all vectors, keeping trained centroids."""
+        self._lists = []
+        self._locations = {}
+
+    def search(
+        self,
+        query_embedding: Union[np.ndarray, List[float]],
+        limit: int = 10,
+        n_probe: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Approximate nearest neighbours of a query.
+
+        Args:
+            query_embedding: Query vector
+            limit: Maximum number of results to return
+            n_probe: Lists to scan. Higher values trade latency for recall
+
+        Returns:
+            List of (id, squared L2 distance) tuples, closest first
+        """
+        if not self._locations:
+            return []
+        query = as_vector(query_embedding)
+
+        if self.centroids is None:
+            probes = [0]
+        else:
+            centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+            coarse = centroid_norms - 2.0 * (self.centroids @ query)
+            probes = top_k(coarse, n_probe or self.n_probe).tolist()
+
+        ids: List[str] = []
+        distances = []
+        for list_no in probes:
+            inverted = self._lists[list_no]
+            if inverted.size == 0:
+                continue
+            if self.is_quantized:
+                d = inverted.distances(query - self.centroids[list_no])
+            else:
+                d = inverted.distances(query)
+            best = top_k(d, limit)
+            ids.extend(inverted.ids[i] for i in best.tolist())
+            distances.append(d[best])
+
+        if not ids:
+            return []
+        merged = np.concatenate(distances)
+        best = top_k(merged, limit)
+        return [(ids[i], float(merged[i])) for i in best.tolist()]
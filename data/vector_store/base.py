@@ -1,11 +1,161 @@
+import functools
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
 import numpy as np
 
+from utils.metrics import metrics
+
+FIELDS = ("embedding", "metadata", "distance")
+SEARCH_INCLUDE = ("metadata", "distance")
+GET_INCLUDE = ("embedding", "metadata")
+MISSING_POLICIES = ("raise", "ignore")
+
+# Operations timed as ``vector_store.<name>`` spans in every implementation
+INSTRUMENTED_OPERATIONS = (
+    "add",
+    "add_many",
+    "get",
+    "get_many",
+    "update",
+    "delete",
+    "upsert_many",
+    "update_many",
+    "delete_many",
+    "search",
+    "search_many",
+    "clear",
+)
+
+
+def resolve_include(
+    include: Optional[Sequence[str]], default: Sequence[str]
+) -> FrozenSet[str]:
+    """Validate an ``include=`` projection, falling back to ``default``."""
+    fields = frozenset(default if include is None else include)
+    unknown = fields.difference(FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown include fields: {sorted(unknown)}. Expected any of {FIELDS}"
+        )
+    return fields
+
+
+def check_missing(missing: Sequence[str], on_missing: str, action: str) -> None:
+    """Apply a bulk operation's missing-ids policy before anything is written.
+
+    Raises:
+        ValueError: If the policy is unknown
+        KeyError: If ids are missing and the policy is "raise"
+    """
+    if on_missing not in MISSING_POLICIES:
+        raise ValueError(
+            f"Unknown missing-ids policy: {on_missing!r}. "
+            f"Expected one of {MISSING_POLICIES}"
+        )
+    if missing and on_missing == "raise":
+        raise KeyError(
+            f"Cannot {action}: no embeddings found with ids: {', '.join(missing)}"
+        )
+
+
+class VectorRecord:
+    """Compact result of ``VectorStore.get`` and ``search``.
+
+    Fields that were not requested through ``include=`` are None. Supports
+    ``record["metadata"]`` style access for code written against result dicts.
+    """
+
+    __slots__ = ("id", "embedding", "metadata", "distance")
+
+    def __init__(
+        self,
+        id: str,
+        embedding: Optional[Union[np.ndarray, List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        distance: Optional[float] = None,
+    ):
+        self.id = id
+        self.embedding = embedding
+        self.metadata = metadata
+        self.distance = distance
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self) -> Iterable[str]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, VectorRecord):
+            return NotImplemented
+        if (self.embedding is None) != (other.embedding is None):
+            return False
+        return (
+            self.id == other.id
+            and self.metadata == other.metadata
+            and self.distance == other.distance
+            and (
+                self.embedding is None
+                or np.array_equal(
+                    np.asarray(self.embedding, dtype=float),
+                    np.asarray(other.embedding, dtype=float),
+                )
+            )
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"VectorRecord(id={self.id!r}, metadata={self.metadata!r}, "
+            f"distance={self.distance!r}, "
+            f"embedding={'None' if self.embedding is None else '...'})"
+        )
+
+
+def _instrumented(store: str, name: str, method: Callable) -> Callable:
+    span = f"vector_store.{name}"
+
+    @functools.wraps(method)
+    async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        with metrics.span(span, store=store):
+            return await method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class VectorStore(ABC):
-    """Abstract base class for vector store implementations."""
+    """Abstract base class for vector store implementations.
+
+    Subclasses' implementations of INSTRUMENTED_OPERATIONS are wrapped in
+    metrics spans when the class is defined.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in INSTRUMENTED_OPERATIONS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(
+                method, "__isabstractmethod__", False
+            ):
+                setattr(cls, name, _instrumented(cls.__name__, name, method))
 
     @abstractmethod
     async def add(
@@ -46,20 +196,58 @@ class VectorStore(ABC):
         pass
 
     @abstractmethod
-    async def get(self, id: str) -> Dict[str, Any]:
+    async def get(
+        self, id: str, include: Optional[Sequence[str]] = None
+    ) -> VectorRecord:
         """Retrieve a single embedding by ID.
 
         Args:
             id: Unique identifier of the embedding
+            include: Fields to fetch, any of "embedding" and "metadata".
+                Defaults to both
 
         Returns:
-            Dict containing embedding vector and metadata
+            VectorRecord with the requested fields
 
         Raises:
             KeyError: If ID not found
         """
         pass
 
+    async def get_many(
+        self,
+        ids: Sequence[str],
+        include: Optional[Sequence[str]] = None,
+        on_missing: str = "raise",
+    ) -> List[VectorRecord]:
+        """Retrieve several embeddings by ID.
+
+        Backends should override this with a single batched lookup; the default
+        calls ``get`` once per id.
+
+        Args:
+            ids: Unique identifiers of the embeddings
+            include: Fields to fetch, as for ``get``
+            on_missing: "raise" to fail if an id is missing, or "ignore" to
+                skip missing ids
+
+        Returns:
+            VectorRecords of the ids that were found, in ``ids`` order
+
+        Raises:
+            KeyError: If ids are missing and on_missing is "raise"
+        """
+        check_missing([], on_missing, "get")
+        records = []
+        missing = []
+        for id in ids:
+            try:
+                records.append(await self.get(id, include))
+            except KeyError:
+                missing.append(id)
+        check_missing(missing, on_missing, "get")
+        return records
+
     @abstractmethod
     async def update(
         self,
@@ -91,26 +279,161 @@ class VectorStore(ABC):
         """
         pass
 
+    async def upsert_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Insert new embeddings and replace existing ones in one batch.
+
+        Backends should override this with a single batched call; the default
+        checks each id with ``get`` and then calls ``update`` or ``add_many``.
+
+        Args:
+            embeddings: List of vector embeddings
+            metadata: Optional list of metadata dicts. Existing metadata is
+                kept for entries where this is None
+            ids: Unique identifiers, required to match existing entries
+
+        Returns:
+            List[str]: Identifiers of the stored embeddings
+        """
+        if not ids:
+            raise ValueError("upsert_many requires ids")
+        metadata = metadata or [None] * len(ids)
+        new = []
+        for i, id in enumerate(ids):
+            if await self._exists(id):
+                await self.update(id, embeddings[i], metadata[i])
+            else:
+                new.append(i)
+        if new:
+            await self.add_many(
+                [embeddings[i] for i in new],
+                [metadata[i] for i in new] if any(metadata) else None,
+                [ids[i] for i in new],
+            )
+        return list(ids)
+
+    async def update_many(
+        self,
+        ids: List[str],
+        embeddings: Optional[List[Union[np.ndarray, List[float]]]] = None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        on_missing: str = "raise",
+    ) -> List[str]:
+        """Update several existing embeddings or their metadata.
+
+        Args:
+            ids: Unique identifiers of the embeddings to update
+            embeddings: Optional new embeddings, one per id
+            metadata: Optional new metadata, one per id
+            on_missing: "raise" to fail before writing anything if an id is
+                missing, or "ignore" to skip missing ids
+
+        Returns:
+            List[str]: Identifiers that were updated
+
+        Raises:
+            KeyError: If ids are missing and on_missing is "raise"
+        """
+        missing = [id for id in ids if not await self._exists(id)]
+        check_missing(missing, on_missing, "update")
+        skip = set(missing)
+        updated = []
+        for i, id in enumerate(ids):
+            if id in skip:
+                continue
+            await self.update(
+                id,
+                embeddings[i] if embeddings is not None else None,
+                metadata[i] if metadata is not None else None,
+            )
+            updated.append(id)
+        return updated
+
+    async def delete_many(self, ids: List[str], on_missing: str = "raise") -> List[str]:
+        """Delete several embeddings by ID.
+
+        Args:
+            ids: Unique identifiers of the embeddings to delete
+            on_missing: "raise" to fail before deleting anything if an id is
+                missing, or "ignore" to skip missing ids
+
+        Returns:
+            List[str]: Identifiers that were deleted
+
+        Raises:
+            KeyError: If ids are missing and on_missing is "raise"
+        """
+        missing = [id for id in ids if not await self._exists(id)]
+        check_missing(missing, on_missing, "delete")
+        skip = set(missing)
+        deleted = []
+        for id in ids:
+            if id not in skip:
+                await self.delete(id)
+                deleted.append(id)
+        return deleted
+
+    async def _exists(self, id: str) -> bool:
+        try:
+            await self.get(id, include=[])
+        except KeyError:
+            return False
+        return True
+
     @abstractmethod
     async def search(
         self,
         query_embedding: Union[np.ndarray, List[float]],
         limit: int = 10,
         metadata_filter: Optional[Dict[str, Any]] = None,
-    ) -> List[Dict[str, Any]]:
+        include: Optional[Sequence[str]] = None,
+    ) -> List[VectorRecord]:
         """Search for similar embeddings.
 
         Args:
             query_embedding: Query vector to search for
             limit: Maximum number of results to return
             metadata_filter: Optional filter to apply on metadata
+            include: Fields to return, any of "embedding", "metadata" and
+                "distance". Defaults to metadata and distance; embeddings
+                are only fetched when requested
 
         Returns:
-            List of dicts containing matched embeddings and their metadata,
-            sorted by similarity score (descending)
+            List of VectorRecords sorted by similarity score (descending)
         """
         pass
 
+    async def search_many(
+        self,
+        query_matrix: Union[np.ndarray, List[List[float]]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[List[VectorRecord]]:
+        """Search for similar embeddings for a batch of queries.
+
+        Backends should override this with a single batched call; the default
+        runs ``search`` once per query.
+
+        Args:
+            query_matrix: 2-D array with one query vector per row
+            limit: Maximum number of results to return per query
+            metadata_filter: Optional filter to apply on metadata
+            include: Fields to return, as for ``search``
+
+        Returns:
+            One list of results per query, in query order, each shaped like
+            the results of ``search``
+        """
+        return [
+            await self.search(query, limit, metadata_filter, include)
+            for query in query_matrix
+        ]
+
     @abstractmethod
     async def clear(self) -> None:
         """Remove all embeddings from the store."""
@@ -0,0 +1,267 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .base import SEARCH_INCLUDE, VectorRecord, VectorStore, resolve_include
+from .lexical import BM25Index
+from .utils import matches_filter
+
+
+class HybridStore(VectorStore):
+    """Wrap any VectorStore with a BM25 index over a text metadata field.
+
+    Writes go to both the backend and the lexical index, which indexes
+    ``metadata[text_field]`` of every entry that has one, so exact words
+    that embeddings blur (paces, race names, injuries) stay searchable.
+    ``search_text`` answers from the index alone without an embedding call;
+    ``hybrid_search`` fuses it with vector search by reciprocal rank.
+
+    The index lives in memory only. After reopening a persisted backend,
+    rebuild it with ``reindex``.
+
+    Lexical and fused results carry the negated score as ``distance``, so
+    lower is still better and ``ContextItem.from_record`` ranks them as is.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        text_field: str = "text",
+        lexical: Optional[BM25Index] = None,
+        rrf_k: int = 60,
+    ):
+        """Initialize HybridStore.
+
+        Args:
+            store: Backend holding embeddings and metadata
+            text_field: Metadata field holding the text to index
+            lexical: Lexical index to keep in sync. Defaults to a BM25Index
+            rrf_k: Reciprocal rank fusion constant. Higher values flatten the
+                difference between top and lower ranks
+        """
+        self.store = store
+        self.text_field = text_field
+        self.lexical = lexical if lexical is not None else BM25Index()
+        self.rrf_k = rrf_k
+
+    def _index(self, id: str, metadata: Optional[Dict[str, Any]]) -> None:
+        if metadata is None:
+            return
+        text = metadata.get(self.text_field)
+        if isinstance(text, str):
+            self.lexical.add(id, text)
+        elif id in self.lexical:
+            self.lexical.remove(id)
+
+    def _index_many(
+        self, ids: List[str], metadata: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        for id, meta in zip(ids, metadata or ()):
+            self._index(id, meta)
+
+    async def reindex(self, ids: Sequence[str]) -> None:
+        """Rebuild the lexical index from the backend's metadata of ``ids``"""
+        self.lexical.clear()
+        for record in await self.store.get_many(ids, include=["metadata"]):
+            self._index(record.id, record.metadata)
+
+    async def add(
+        self,
+        embeddings: Union[np.ndarray, List[float]],
+        metadata: Optional[Dict[str, Any]] = None,
+        id: Optional[str] = None,
+    ) -> str:
+        doc_id = await self.store.add(embeddings, metadata, id)
+        self._index(doc_id, metadata)
+        return doc_id
+
+    async def add_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = await self.store.add_many(embeddings, metadata, ids)
+        self._index_many(ids, metadata)
+        return ids
+
+    async def get(
+        self, id: str, include: Optional[Sequence[str]] = None
+    ) -> VectorRecord:
+        return await self.store.get(id, include)
+
+    async def update(
+        self,
+        id: str,
+        embedding: Optional[Union[np.ndarray, List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        await self.store.update(id, embedding, metadata)
+        self._index(id, metadata)
+
+    async def delete(self, id: str) -> None:
+        await self.store.delete(id)
+        if id in self.lexical:
+            self.lexical.remove(id)
+
+    async def upsert_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = await self.store.upsert_many(embeddings, metadata, ids)
+        self._index_many(ids, metadata)
+        return ids
+
+    async def update_many(
+        self,
+        ids: List[str],
+        embeddings: Optional[List[Union[np.ndarray, List[float]]]] = None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        on_missing: str = "raise",
+    ) -> List[str]:
+        updated = await self.store.update_many(ids, embeddings, metadata, on_missing)
+        if metadata is not None and updated:
+            positions = {id: i for i, id in enumerate(ids)}
+            for id in updated:
+                self._index(id, metadata[positions[id]])
+        return updated
+
+    async def delete_many(self, ids: List[str], on_missing: str = "raise") -> List[str]:
+        deleted = await self.store.delete_many(ids, on_missing)
+        for id in deleted:
+            if id in self.lexical:
+                self.lexical.remove(id)
+        return deleted
+
+    async def search(
+        self,
+        query_embedding: Union[np.ndarray, List[float]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[VectorRecord]:
+        return await self.store.search(query_embedding, limit, metadata_filter, include)
+
+    async def search_many(
+        self,
+        query_matrix: Union[np.ndarray, List[List[float]]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[List[VectorRecord]]:
+        return await self.store.search_many(
+            query_matrix, limit, metadata_filter, include
+        )
+
+    async def _records(
+        self,
+        ranked: List[Tuple[str, float]],
+        limit: int,
+        metadata_filter: Optional[Dict[str, Any]],
+        include: Optional[Sequence[str]],
+    ) -> List[VectorRecord]:
+        """Fetch (id, score) hits best first, keeping ``limit`` that pass the filter"""
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        fetch = fields - {"distance"}
+        if metadata_filter:
+            fetch = fetch | {"metadata"}
+
+        # Without a filter the first ``limit`` hits are the results. With one,
+        # hits are fetched a few times ``limit`` at a time until enough pass
+        batch = max(1, 4 * limit if metadata_filter else limit)
+        results: List[VectorRecord] = []
+        for start in range(0, len(ranked), batch):
+            hits = ranked[start : start + batch]
+            records = await self.store.get_many([id for id, _ in hits], include=fetch)
+            for record, (_, score) in zip(records, hits):
+                if metadata_filter and not matches_filter(
+                    record.metadata, metadata_filter
+                ):
+                    continue
+                if "metadata" not in fields:
+                    record.metadata = None
+                if "distance" in fields:
+                    record.distance = -score
+                results.append(record)
+                if len(results) == limit:
+                    return results
+        return results
+
+    async def search_text(
+        self,
+        query: str,
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[VectorRecord]:
+        """Search the indexed text by BM25, without embedding the query.
+
+        Args:
+            query: Words to look for
+            limit: Maximum number of results to return
+            metadata_filter: Optional filter, applied to the BM25 hits
+            include: Fields to return, as for ``search``
+
+        Returns:
+            List of VectorRecords, best match first, with the negated BM25
+            score as distance
+        """
+        if metadata_filter:
+            # Every hit may be filtered out, so rank them all
+            ranked = self.lexical.search(query, len(self.lexical))
+        else:
+            ranked = self.lexical.search(query, limit)
+        return await self._records(ranked, limit, metadata_filter, include)
+
+    async def hybrid_search(
+        self,
+        query: str,
+        query_embedding: Optional[Union[np.ndarray, List[float]]] = None,
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+        candidates: Optional[int] = None,
+    ) -> List[VectorRecord]:
+        """Fuse lexical and vector search by reciprocal rank.
+
+        Each list contributes ``1 / (rrf_k + rank)`` to an entry's score, so
+        entries ranked well by both come first and the scales of BM25 scores
+        and distances never need comparing. Without ``query_embedding`` this
+        is ``search_text``.
+
+        Args:
+            query: Words to look for
+            query_embedding: Embedding of the same query, or None
+            limit: Maximum number of results to return
+            metadata_filter: Optional filter, applied to both searches
+            include: Fields to return, as for ``search``
+            candidates: Entries taken from each search before fusing.
+                Defaults to 4 * limit
+
+        Returns:
+            List of VectorRecords, best first, with the negated fused score
+            as distance
+        """
+        if query_embedding is None:
+            return await self.search_text(query, limit, metadata_filter, include)
+        candidates = candidates or 4 * limit
+
+        lexical = await self.search_text(query, candidates, metadata_filter, include=[])
+        vector = await self.store.search(
+            query_embedding, candidates, metadata_filter, include=[]
+        )
+        scores: Dict[str, float] = {}
+        for hits in (lexical, vector):
+            for rank, record in enumerate(hits, 1):
+                scores[record.id] = scores.get(record.id, 0.0) + 1.0 / (
+                    self.rrf_k + rank
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return await self._records(ranked, limit, None, include)
+
+    async def clear(self) -> None:
+        await self.store.clear()
+        self.lexical.clear()
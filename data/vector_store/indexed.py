@@ -0,0 +1,215 @@
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .ann import IVFIndex
+from .base import SEARCH_INCLUDE, VectorRecord, VectorStore, resolve_include
+from .utils import as_matrix, as_vector, top_k
+
+
+class IndexedStore(VectorStore):
+    """Wrap any VectorStore with an approximate nearest-neighbour index.
+
+    Writes go to both the backend and the index, so build parameters and
+    incremental inserts follow ``add``/``add_many``. Unfiltered searches are
+    answered by the index and only the hits are fetched from the backend;
+    filtered searches fall back to the backend's exact search.
+
+    With a quantized index, the index only shortlists candidates: they are
+    re-ranked by exact distance to the backend's full-precision vectors,
+    which can stay on disk in a ``SegmentStore``.
+
+    The index lives in memory only. After wrapping a backend that already
+    holds entries, e.g. a reopened ``SegmentStore``, build it with
+    ``reindex``; until it covers every backend entry, searches fall back to
+    the backend's exact search.
+    """
+
+    def __init__(
+        self, store: VectorStore, index: Optional[IVFIndex] = None, rerank: int = 4
+    ):
+        """Initialize IndexedStore.
+
+        Args:
+            store: Backend holding embeddings and metadata
+            index: ANN index to keep in sync. Defaults to an IVFIndex
+            rerank: With a quantized index, re-rank ``rerank * limit``
+                candidates by exact distance. 0 returns the index's
+                approximate distances instead
+        """
+        self.store = store
+        self.index = index if index is not None else IVFIndex()
+        self.rerank = rerank
+
+    def _covers_store(self) -> bool:
+        """Whether the index holds every entry of a backend that reports its size"""
+        try:
+            return len(self.index) >= len(self.store)
+        except TypeError:
+            # Backends without a size, e.g. Chroma, are taken to be in sync
+            return True
+
+    async def reindex(self, ids: Sequence[str]) -> None:
+        """Rebuild the index from the backend's embeddings of ``ids``"""
+        records = await self.store.get_many(ids, include=["embedding"])
+        self.index.clear()
+        self.index.add_many(
+            [record.id for record in records], [record.embedding for record in records]
+        )
+
+    async def add(
+        self,
+        embeddings: Union[np.ndarray, List[float]],
+        metadata: Optional[Dict[str, Any]] = None,
+        id: Optional[str] = None,
+    ) -> str:
+        doc_id = await self.store.add(embeddings, metadata, id)
+        self.index.add(doc_id, embeddings)
+        return doc_id
+
+    async def add_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = await self.store.add_many(embeddings, metadata, ids)
+        self.index.add_many(ids, embeddings)
+        return ids
+
+    async def get(
+        self, id: str, include: Optional[Sequence[str]] = None
+    ) -> VectorRecord:
+        return await self.store.get(id, include)
+
+    async def update(
+        self,
+        id: str,
+        embedding: Optional[Union[np.ndarray, List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        await self.store.update(id, embedding, metadata)
+        if embedding is not None:
+            self.index.add(id, embedding)
+
+    async def delete(self, id: str) -> None:
+        await self.store.delete(id)
+        if id in self.index:
+            self.index.remove(id)
+
+    async def upsert_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        ids = await self.store.upsert_many(embeddings, metadata, ids)
+        self.index.add_many(ids, embeddings)
+        return ids
+
+    async def update_many(
+        self,
+        ids: List[str],
+        embeddings: Optional[List[Union[np.ndarray, List[float]]]] = None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        on_missing: str = "raise",
+    ) -> List[str]:
+        updated = await self.store.update_many(ids, embeddings, metadata, on_missing)
+        if embeddings is not None and updated:
+            positions = {id: i for i, id in enumerate(ids)}
+            self.index.add_many(updated, [embeddings[positions[id]] for id in updated])
+        return updated
+
+    async def delete_many(self, ids: List[str], on_missing: str = "raise") -> List[str]:
+        deleted = await self.store.delete_many(ids, on_missing)
+        for id in deleted:
+            if id in self.index:
+                self.index.remove(id)
+        return deleted
+
+    async def search(
+        self,
+        query_embedding: Union[np.ndarray, List[float]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+        n_probe: Optional[int] = None,
+    ) -> List[VectorRecord]:
+        if metadata_filter or not self._covers_store():
+            return await self.store.search(
+                query_embedding, limit, metadata_filter, include
+            )
+        results = await self._search_index(
+            [as_vector(query_embedding)], limit, include, n_probe
+        )
+        return results[0]
+
+    async def search_many(
+        self,
+        query_matrix: Union[np.ndarray, List[List[float]]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+        n_probe: Optional[int] = None,
+    ) -> List[List[VectorRecord]]:
+        if metadata_filter or not self._covers_store():
+            return await self.store.search_many(
+                query_matrix, limit, metadata_filter, include
+            )
+        return await self._search_index(
+            as_matrix(query_matrix), limit, include, n_probe
+        )
+
+    async def _search_index(
+        self,
+        queries: Sequence[np.ndarray],
+        limit: int,
+        include: Optional[Sequence[str]],
+        n_probe: Optional[int],
+    ) -> List[List[VectorRecord]]:
+        """Answer queries from the index, fetching all hits in one backend call"""
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        fetch = fields - {"distance"}
+        rerank = self.index.is_quantized and self.rerank > 0
+        if rerank:
+            fetch = fetch | {"embedding"}
+        k = limit * self.rerank if rerank else limit
+        hits = [self.index.search(query, k, n_probe) for query in queries]
+
+        ids = list(dict.fromkeys(id for query_hits in hits for id, _ in query_hits))
+        records = await self.store.get_many(ids, include=fetch)
+        positions = {id: i for i, id in enumerate(ids)}
+        if rerank and records:
+            vectors = as_matrix([record.embedding for record in records])
+
+        results = []
+        for query, query_hits in zip(queries, hits):
+            rows = np.array([positions[id] for id, _ in query_hits], dtype=np.intp)
+            if rerank and len(rows):
+                # Exact distances to the full-precision candidates at once
+                difference = vectors[rows] - query
+                distances = np.einsum("ij,ij->i", difference, difference)
+                best = top_k(distances, limit)
+                ranked = zip(rows[best].tolist(), distances[best].tolist())
+            else:
+                ranked = zip(rows.tolist(), (distance for _, distance in query_hits))
+            results.append(
+                [self._hit(records[row], distance, fields) for row, distance in ranked]
+            )
+        return results
+
+    @staticmethod
+    def _hit(
+        record: VectorRecord, distance: float, fields: FrozenSet[str]
+    ) -> VectorRecord:
+        """Per-query copy of a fetched record, projected to ``fields``"""
+        return VectorRecord(
+            record.id,
+            record.embedding if "embedding" in fields else None,
+            record.metadata,
+            distance if "distance" in fields else None,
+        )
+
+    async def clear(self) -> None:
+        await self.store.clear()
+        self.index.clear()
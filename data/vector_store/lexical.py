@@ -0,0 +1,140 @@
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .utils import top_k
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words too common in workout notes to tell them apart
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have i in is it my of on or so "
+    "the to was were with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of ``text``, without stopwords"""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """In-process BM25 inverted index over short texts.
+
+    Each term maps to the documents containing it and their term counts, so
+    ``add`` and ``remove`` only touch the terms of one document, and a query
+    only scores documents sharing a term with it. Scoring uses Okapi BM25
+    with the non-negative ``log(1 + ...)`` idf.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """Initialize BM25Index.
+
+        Args:
+            k1: Term frequency saturation. Higher values reward repeated terms
+            b: Document length normalization, from 0 (none) to 1 (full)
+        """
+        self.k1 = k1
+        self.b = b
+        self.clear()
+
+    def clear(self) -> None:
+        """Remove all documents."""
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._terms: List[Optional[Dict[str, int]]] = []  # Term counts per slot
+        self._ids: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._total_length = 0
+        # Posting arrays, rebuilt on first use after a term's postings change
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._slots
+
+    def add(self, id: str, text: str) -> None:
+        """Index a document, replacing any previous text of ``id``"""
+        if id in self._slots:
+            self.remove(id)
+        counts: Dict[str, int] = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._ids)
+            self._ids.append(None)
+            self._terms.append(None)
+            if slot >= len(self._lengths):
+                lengths = np.zeros(max(16, 2 * len(self._lengths)), dtype=np.float32)
+                lengths[: len(self._lengths)] = self._lengths
+                self._lengths = lengths
+        self._ids[slot] = id
+        self._terms[slot] = counts
+        self._slots[id] = slot
+        length = sum(counts.values())
+        self._lengths[slot] = length
+        self._total_length += length
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[slot] = count
+            self._arrays.pop(term, None)
+
+    def remove(self, id: str) -> None:
+        """Remove a document.
+
+        Raises:
+            KeyError: If ID not found
+        """
+        slot = self._slots.pop(id)
+        for term in self._terms[slot] or ():
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+            self._arrays.pop(term, None)
+        self._total_length -= int(self._lengths[slot])
+        self._lengths[slot] = 0
+        self._ids[slot] = None
+        self._terms[slot] = None
+        self._free.append(slot)
+
+    def _posting(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            slots = np.fromiter(postings.keys(), dtype=np.intp, count=len(postings))
+            counts = np.fromiter(
+                postings.values(), dtype=np.float32, count=len(postings)
+            )
+            arrays = self._arrays[term] = (slots, counts)
+        return arrays
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Documents matching any query term, best BM25 score first.
+
+        Returns:
+            List of (id, score) tuples
+        """
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._postings]
+        if not terms or not self._slots:
+            return []
+
+        n = len(self._slots)
+        average = self._total_length / n
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in terms:
+            slots, counts = self._posting(term)
+            idf = math.log(1.0 + (n - len(slots) + 0.5) / (len(slots) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self._lengths[slots] / average)
+            scores[slots] += idf * counts * (self.k1 + 1.0) / (counts + norm)
+
+        matched = np.flatnonzero(scores)
+        best = matched[top_k(-scores[matched], limit)]
+        return [(self._ids[slot], float(scores[slot])) for slot in best.tolist()]
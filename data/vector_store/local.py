@@ -1,25 +1,101 @@
+import asyncio
+import functools
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+    Union,
+)
 
 import chromadb
 import numpy as np
 from chromadb.config import Settings
 
-from .base import VectorStore
+from .base import (
+    GET_INCLUDE,
+    SEARCH_INCLUDE,
+    VectorRecord,
+    VectorStore,
+    check_missing,
+    resolve_include,
+)
+from .utils import filter_operators
+
+T = TypeVar("T")
+
+# Our include= field names mapped to Chroma's include names
+CHROMA_INCLUDE = {
+    "embedding": "embeddings",
+    "metadata": "metadatas",
+    "distance": "distances",
+}
+
+
+def _column(results: Dict[str, Any], key: str, i: Optional[int], n: int) -> List[Any]:
+    """Column of a Chroma response, or Nones if it was not requested.
+
+    Chroma returns embeddings as float64; they are narrowed to float32 like
+    every other store's.
+    """
+    column = results.get(key)
+    if column is None:
+        return [None] * n
+    if i is not None:
+        column = column[i]
+    if column is None:
+        return [None] * n
+    if key == "embeddings":
+        return [None if e is None else np.asarray(e, dtype=np.float32) for e in column]
+    return list(column)
+
+
+def _where(metadata_filter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Rewrite a filter into Chroma's one-condition-per-dict form.
+
+    Several keys, or several operators on one key, become an ``$and``.
+    """
+    if not metadata_filter:
+        return None
+    conditions = []
+    for key, condition in metadata_filter.items():
+        if key in ("$and", "$or"):
+            conditions.append({key: [_where(f) for f in condition]})
+        else:
+            conditions += [
+                {key: {op: operand}} for op, operand in filter_operators(key, condition)
+            ]
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
 
 
 class ChromaStore(VectorStore):
-    """Chroma-based vector store implementation."""
+    """Chroma-based vector store implementation.
+
+    The Chroma client is synchronous, so every call runs on a bounded thread
+    pool to keep the event loop responsive. Chroma only compares numbers, so
+    range filters on ISO date strings raise ``ValueError`` here.
+    """
 
     def __init__(
-        self, collection_name: str = "running_coach", persist_dir: Optional[str] = None
+        self,
+        collection_name: str = "running_coach",
+        persist_dir: Optional[str] = None,
+        max_concurrency: int = 4,
     ):
         """Initialize ChromaStore.
 
         Args:
             collection_name: Name of the Chroma collection
             persist_dir: Optional directory for persistent storage. If None, uses in-memory
+            max_concurrency: Maximum number of Chroma calls running at once
         """
         settings = Settings()
         if persist_dir:
@@ -27,6 +103,30 @@ class ChromaStore(VectorStore):
 
         self._client = chromadb.Client(settings)
         self._collection = self._client.get_or_create_collection(name=collection_name)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="chroma"
+        )
+
+    async def _run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking Chroma call on the store's executor.
+
+        Cancelling the awaiting task cancels the call if it has not started
+        yet. A call that is already running finishes in the background.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def close(self, wait: bool = True) -> None:
+        """Shut down the executor. Pending calls that have not started are dropped."""
+        self._executor.shutdown(wait=wait)
+
+    async def __aenter__(self) -> "ChromaStore":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
 
     async def add(
         self,
@@ -38,7 +138,8 @@ class ChromaStore(VectorStore):
             embeddings = embeddings.tolist()
 
         doc_id = id or str(uuid.uuid4())
-        self._collection.add(
+        await self._run(
+            self._collection.add,
             embeddings=[embeddings],
             metadatas=[metadata] if metadata else None,
             ids=[doc_id],
@@ -57,19 +158,62 @@ class ChromaStore(VectorStore):
         if not ids:
             ids = [str(uuid.uuid4()) for _ in embeddings]
 
-        self._collection.add(embeddings=embeddings, metadatas=metadata, ids=ids)
+        await self._run(
+            self._collection.add, embeddings=embeddings, metadatas=metadata, ids=ids
+        )
         return ids
 
-    async def get(self, id: str) -> Dict[str, Any]:
-        result = self._collection.get(ids=[id])
+    async def get(
+        self, id: str, include: Optional[Sequence[str]] = None
+    ) -> VectorRecord:
+        fields = resolve_include(include, GET_INCLUDE) - {"distance"}
+        result = await self._run(
+            self._collection.get,
+            ids=[id],
+            include=[CHROMA_INCLUDE[field] for field in fields],
+        )
         if not result or not result["ids"]:
             raise KeyError(f"No embedding found with id: {id}")
 
-        return {
-            "id": result["ids"][0],
-            "embedding": result["embeddings"][0],
-            "metadata": result["metadatas"][0] if result["metadatas"] else None,
+        return VectorRecord(
+            result["ids"][0],
+            _column(result, "embeddings", None, 1)[0],
+            _column(result, "metadatas", None, 1)[0] or None,
+        )
+
+    async def get_many(
+        self,
+        ids: Sequence[str],
+        include: Optional[Sequence[str]] = None,
+        on_missing: str = "raise",
+    ) -> List[VectorRecord]:
+        fields = resolve_include(include, GET_INCLUDE) - {"distance"}
+        check_missing([], on_missing, "get")
+        if not ids:
+            return []
+        result = await self._run(
+            self._collection.get,
+            ids=list(dict.fromkeys(ids)),
+            include=[CHROMA_INCLUDE[field] for field in fields],
+        )
+        found = result["ids"] if result else []
+        n = len(found)
+        records = {
+            id: VectorRecord(id, embedding, metadata or None)
+            for id, embedding, metadata in zip(
+                found,
+                _column(result, "embeddings", None, n),
+                _column(result, "metadatas", None, n),
+            )
         }
+        check_missing([id for id in ids if id not in records], on_missing, "get")
+        # Chroma returns ids in its own order
+        return [records[id] for id in ids if id in records]
+
+    async def _existing(self, ids: List[str]) -> Set[str]:
+        """Ids that exist in the collection, checked in a single call."""
+        result = await self._run(self._collection.get, ids=ids, include=[])
+        return set(result["ids"]) if result else set()
 
     async def update(
         self,
@@ -77,59 +221,147 @@ class ChromaStore(VectorStore):
         embedding: Optional[Union[np.ndarray, List[float]]] = None,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
-        try:
-            current = await self.get(id)
-        except KeyError:
+        if not await self._existing([id]):
             raise KeyError(f"Cannot update: no embedding found with id: {id}")
 
         if isinstance(embedding, np.ndarray):
             embedding = embedding.tolist()
 
-        self._collection.update(
+        # Chroma keeps the current embedding/metadata for fields passed as None
+        await self._run(
+            self._collection.update,
             ids=[id],
-            embeddings=[embedding] if embedding else [current["embedding"]],
-            metadatas=[metadata] if metadata else [current["metadata"]],
+            embeddings=[embedding] if embedding is not None else None,
+            metadatas=[metadata] if metadata else None,
         )
 
     async def delete(self, id: str) -> None:
-        try:
-            await self.get(id)  # Check existence
-            self._collection.delete(ids=[id])
-        except KeyError:
+        if not await self._existing([id]):
             raise KeyError(f"Cannot delete: no embedding found with id: {id}")
+        await self._run(self._collection.delete, ids=[id])
+
+    async def upsert_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        if not ids:
+            raise ValueError("upsert_many requires ids")
+        embeddings = [
+            e.tolist() if isinstance(e, np.ndarray) else e for e in embeddings
+        ]
+
+        await self._run(
+            self._collection.upsert,
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=metadata if metadata and any(metadata) else None,
+        )
+        return list(ids)
+
+    async def update_many(
+        self,
+        ids: List[str],
+        embeddings: Optional[List[Union[np.ndarray, List[float]]]] = None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        on_missing: str = "raise",
+    ) -> List[str]:
+        existing = await self._existing(ids)
+        check_missing([id for id in ids if id not in existing], on_missing, "update")
+        present = [i for i, id in enumerate(ids) if id in existing]
+        if not present:
+            return []
+
+        await self._run(
+            self._collection.update,
+            ids=[ids[i] for i in present],
+            embeddings=(
+                [
+                    e.tolist() if isinstance(e, np.ndarray) else e
+                    for e in (embeddings[i] for i in present)
+                ]
+                if embeddings is not None
+                else None
+            ),
+            metadatas=[metadata[i] for i in present] if metadata is not None else None,
+        )
+        return [ids[i] for i in present]
+
+    async def delete_many(self, ids: List[str], on_missing: str = "raise") -> List[str]:
+        existing = await self._existing(ids)
+        check_missing([id for id in ids if id not in existing], on_missing, "delete")
+        present = list(dict.fromkeys(id for id in ids if id in existing))
+        if present:
+            await self._run(self._collection.delete, ids=present)
+        return present
+
+    def _query_results(self, results: Dict[str, Any], i: int) -> List[VectorRecord]:
+        """Convert the ``i``-th query of a Chroma query response to records."""
+        ids = results["ids"][i]
+        n = len(ids)
+        return [
+            VectorRecord(id, embedding, metadata or None, distance)
+            for id, embedding, metadata, distance in zip(
+                ids,
+                _column(results, "embeddings", i, n),
+                _column(results, "metadatas", i, n),
+                _column(results, "distances", i, n),
+            )
+        ]
+
+    def _query_include(self, fields: FrozenSet[str]) -> List[str]:
+        return [CHROMA_INCLUDE[field] for field in fields]
 
     async def search(
         self,
         query_embedding: Union[np.ndarray, List[float]],
         limit: int = 10,
         metadata_filter: Optional[Dict[str, Any]] = None,
-    ) -> List[Dict[str, Any]]:
+        include: Optional[Sequence[str]] = None,
+    ) -> List[VectorRecord]:
+        fields = resolve_include(include, SEARCH_INCLUDE)
         if isinstance(query_embedding, np.ndarray):
             query_embedding = query_embedding.tolist()
 
-        results = self._collection.query(
-            query_embeddings=[query_embedding], n_results=limit, where=metadata_filter
+        results = await self._run(
+            self._collection.query,
+            query_embeddings=[query_embedding],
+            n_results=limit,
+            where=_where(metadata_filter),
+            include=self._query_include(fields),
         )
+        return self._query_results(results, 0)
 
-        return [
-            {
-                "id": id,
-                "embedding": embedding,
-                "metadata": metadata if metadata else None,
-                "distance": distance,
-            }
-            for id, embedding, metadata, distance in zip(
-                results["ids"][0],
-                results["embeddings"][0],
-                results["metadatas"][0]
-                if results["metadatas"]
-                else [None] * len(results["ids"][0]),
-                results["distances"][0],
-            )
-        ]
+    async def search_many(
+        self,
+        query_matrix: Union[np.ndarray, List[List[float]]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[List[VectorRecord]]:
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        if isinstance(query_matrix, np.ndarray):
+            query_matrix = query_matrix.tolist()
+        else:
+            query_matrix = [
+                q.tolist() if isinstance(q, np.ndarray) else q for q in query_matrix
+            ]
+        if not query_matrix:
+            return []
+
+        results = await self._run(
+            self._collection.query,
+            query_embeddings=query_matrix,
+            n_results=limit,
+            where=_where(metadata_filter),
+            include=self._query_include(fields),
+        )
+        return [self._query_results(results, i) for i in range(len(query_matrix))]
 
     async def clear(self) -> None:
-        self._collection.delete()
-        self._collection = self._client.get_or_create_collection(
-            name=self._collection.name
+        name = self._collection.name
+        await self._run(self._client.delete_collection, name=name)
+        self._collection = await self._run(
+            self._client.get_or_create_collection, name=name
         )
@@ -0,0 +1,401 @@
+import uuid
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .base import (
+    GET_INCLUDE,
+    SEARCH_INCLUDE,
+    VectorRecord,
+    VectorStore,
+    check_missing,
+    resolve_include,
+)
+from .metadata_index import MetadataIndex
+from .utils import (
+    as_matrix,
+    as_vector,
+    matches_filter,
+    query_batches,
+    squared_l2,
+    squared_l2_many,
+    top_k,
+    top_k_rows,
+)
+
+
+class NumpyStore(VectorStore):
+    """In-process vector store backed by a single contiguous float32 matrix.
+
+    Embeddings live in one preallocated matrix with parallel id and metadata
+    arrays, so ``search`` is one matrix-vector product plus an ``argpartition``
+    top-k. Distances are squared L2, matching Chroma's default space.
+
+    Filtered searches first look up matching rows in a ``MetadataIndex``,
+    built on the first filtered search and maintained by writes after that,
+    and only score those rows.
+    """
+
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        initial_capacity: int = 1024,
+        range_fields: Sequence[str] = ("date",),
+    ):
+        """Initialize NumpyStore.
+
+        Args:
+            dim: Optional embedding dimension. If None, inferred from the first add
+            initial_capacity: Number of rows to preallocate once the dimension is known
+            range_fields: Metadata fields indexed for range filters
+        """
+        self._dim = dim
+        self._initial_capacity = max(1, initial_capacity)
+        self._size = 0
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._range_fields = tuple(range_fields)
+        self._filter_index: Optional[MetadataIndex] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, extra: int, dim: int) -> None:
+        """Make room for ``extra`` more rows, growing geometrically."""
+        if self._dim is None:
+            self._dim = dim
+        elif dim != self._dim:
+            raise ValueError(
+                f"Embedding dimension mismatch: expected {self._dim}, got {dim}"
+            )
+
+        needed = self._size + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity and self._vectors.shape[1] == self._dim:
+            return
+
+        new_capacity = max(needed, capacity * 2, self._initial_capacity)
+        vectors = np.empty((new_capacity, self._dim), dtype=np.float32)
+        norms = np.empty(new_capacity, dtype=np.float32)
+        if self._size:
+            vectors[: self._size] = self._vectors[: self._size]
+            norms[: self._size] = self._norms[: self._size]
+        self._vectors, self._norms = vectors, norms
+
+    def _append(
+        self,
+        matrix: np.ndarray,
+        metadata: List[Optional[Dict[str, Any]]],
+        ids: List[str],
+    ) -> None:
+        for doc_id in ids:
+            if doc_id in self._rows:
+                raise ValueError(f"Embedding with id {doc_id} already exists")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in batch")
+
+        self._reserve(len(ids), matrix.shape[1])
+        start, end = self._size, self._size + len(ids)
+        self._vectors[start:end] = matrix
+        self._norms[start:end] = np.einsum("ij,ij->i", matrix, matrix)
+        for offset, doc_id in enumerate(ids):
+            self._rows[doc_id] = start + offset
+        self._ids.extend(ids)
+        self._metadata.extend(metadata)
+        self._size = end
+        if self._filter_index is not None:
+            self._filter_index.add_many(start, metadata)
+
+    def _row(self, id: str) -> int:
+        row = self._rows.get(id)
+        if row is None:
+            raise KeyError(f"No embedding found with id: {id}")
+        return row
+
+    def _record(
+        self, row: int, fields: FrozenSet[str], distance: Optional[float] = None
+    ) -> VectorRecord:
+        return VectorRecord(
+            self._ids[row],
+            self._vectors[row].copy() if "embedding" in fields else None,
+            self._metadata[row] if "metadata" in fields else None,
+            distance if "distance" in fields else None,
+        )
+
+    async def add(
+        self,
+        embeddings: Union[np.ndarray, List[float]],
+        metadata: Optional[Dict[str, Any]] = None,
+        id: Optional[str] = None,
+    ) -> str:
+        doc_id = id or str(uuid.uuid4())
+        self._append(as_vector(embeddings)[None, :], [metadata or None], [doc_id])
+        return doc_id
+
+    async def add_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        if not ids:
+            ids = [str(uuid.uuid4()) for _ in embeddings]
+        if metadata is None:
+            metadata = [None] * len(ids)
+        if not (len(embeddings) == len(ids) == len(metadata)):
+            raise ValueError("embeddings, metadata and ids must have the same length")
+        if not ids:
+            return []
+
+        self._append(as_matrix(embeddings), [m or None for m in metadata], list(ids))
+        return list(ids)
+
+    async def get(
+        self, id: str, include: Optional[Sequence[str]] = None
+    ) -> VectorRecord:
+        return self._record(self._row(id), resolve_include(include, GET_INCLUDE))
+
+    async def get_many(
+        self,
+        ids: Sequence[str],
+        include: Optional[Sequence[str]] = None,
+        on_missing: str = "raise",
+    ) -> List[VectorRecord]:
+        fields = resolve_include(include, GET_INCLUDE)
+        found = [self._rows.get(id) for id in ids]
+        check_missing(
+            [id for id, row in zip(ids, found) if row is None], on_missing, "get"
+        )
+        rows = [row for row in found if row is not None]
+        # One gather for all embeddings instead of a copy per row
+        vectors = self._vectors[rows] if "embedding" in fields else [None] * len(rows)
+        return [
+            VectorRecord(
+                self._ids[row],
+                vector,
+                self._metadata[row] if "metadata" in fields else None,
+            )
+            for row, vector in zip(rows, vectors)
+        ]
+
+    def _overwrite(
+        self,
+        rows: np.ndarray,
+        matrix: Optional[np.ndarray],
+        metadata: Optional[List[Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Replace vectors and/or metadata of existing rows in place."""
+        if matrix is not None:
+            if matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension mismatch: expected {self._dim}, "
+                    f"got {matrix.shape[1]}"
+                )
+            self._vectors[rows] = matrix
+            self._norms[rows] = np.einsum("ij,ij->i", matrix, matrix)
+        if metadata is not None:
+            for row, m in zip(rows.tolist(), metadata):
+                if m:
+                    if self._filter_index is not None:
+                        self._filter_index.remove(row, self._metadata[row])
+                        self._filter_index.add(row, m)
+                    self._metadata[row] = m
+
+    def _remove(self, id: str) -> None:
+        row = self._rows.pop(id)
+        last = self._size - 1
+        if self._filter_index is not None:
+            self._filter_index.remove(row, self._metadata[row])
+            if row != last:
+                self._filter_index.move(last, row, self._metadata[last])
+
+        # Move the last row into the hole so the matrix stays contiguous
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._norms[row] = self._norms[last]
+            self._ids[row] = self._ids[last]
+            self._metadata[row] = self._metadata[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._metadata.pop()
+        self._size = last
+
+    async def update(
+        self,
+        id: str,
+        embedding: Optional[Union[np.ndarray, List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        try:
+            row = self._row(id)
+        except KeyError:
+            raise KeyError(f"Cannot update: no embedding found with id: {id}")
+
+        self._overwrite(
+            np.array([row]),
+            as_vector(embedding)[None, :] if embedding is not None else None,
+            [metadata],
+        )
+
+    async def delete(self, id: str) -> None:
+        if id not in self._rows:
+            raise KeyError(f"Cannot delete: no embedding found with id: {id}")
+        self._remove(id)
+
+    async def upsert_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        if not ids:
+            raise ValueError("upsert_many requires ids")
+        if metadata is None:
+            metadata = [None] * len(ids)
+        if not (len(embeddings) == len(ids) == len(metadata)):
+            raise ValueError("embeddings, metadata and ids must have the same length")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in batch")
+
+        matrix = as_matrix(embeddings)
+        existing = [i for i, id in enumerate(ids) if id in self._rows]
+        new = [i for i, id in enumerate(ids) if id not in self._rows]
+        if existing:
+            self._overwrite(
+                np.array([self._rows[ids[i]] for i in existing]),
+                matrix[existing],
+                [metadata[i] for i in existing],
+            )
+        if new:
+            self._append(
+                matrix[new], [metadata[i] or None for i in new], [ids[i] for i in new]
+            )
+        return list(ids)
+
+    async def update_many(
+        self,
+        ids: List[str],
+        embeddings: Optional[List[Union[np.ndarray, List[float]]]] = None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        on_missing: str = "raise",
+    ) -> List[str]:
+        check_missing([id for id in ids if id not in self._rows], on_missing, "update")
+        present = [i for i, id in enumerate(ids) if id in self._rows]
+        if present:
+            self._overwrite(
+                np.array([self._rows[ids[i]] for i in present]),
+                as_matrix(embeddings)[present] if embeddings is not None else None,
+                [metadata[i] for i in present] if metadata is not None else None,
+            )
+        return [ids[i] for i in present]
+
+    async def delete_many(self, ids: List[str], on_missing: str = "raise") -> List[str]:
+        check_missing([id for id in ids if id not in self._rows], on_missing, "delete")
+        deleted = []
+        for id in ids:
+            if id in self._rows:
+                self._remove(id)
+                deleted.append(id)
+        return deleted
+
+    def _index(self) -> MetadataIndex:
+        if self._filter_index is None:
+            index = MetadataIndex(self._range_fields)
+            index.add_many(0, self._metadata)
+            self._filter_index = index
+        return self._filter_index
+
+    def _candidate_rows(
+        self, metadata_filter: Optional[Dict[str, Any]]
+    ) -> Optional[np.ndarray]:
+        """Rows matching the filter, or None when every row is a candidate."""
+        if not metadata_filter:
+            return None
+        rows, exact = self._index().lookup(metadata_filter)
+        if exact:
+            return rows
+        return np.fromiter(
+            (
+                row
+                for row in (range(self._size) if rows is None else rows.tolist())
+                if matches_filter(self._metadata[row], metadata_filter)
+            ),
+            dtype=np.intp,
+        )
+
+    def _results(
+        self, rows: np.ndarray, distances: np.ndarray, fields: FrozenSet[str]
+    ) -> List[VectorRecord]:
+        return [
+            self._record(row, fields, distance)
+            for row, distance in zip(rows.tolist(), distances.tolist())
+        ]
+
+    async def search(
+        self,
+        query_embedding: Union[np.ndarray, List[float]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[VectorRecord]:
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        if self._size == 0:
+            return []
+
+        query = as_vector(query_embedding)
+        vectors = self._vectors[: self._size]
+        norms = self._norms[: self._size]
+        rows = self._candidate_rows(metadata_filter)
+        if rows is not None:
+            vectors, norms = vectors[rows], norms[rows]
+
+        distances = squared_l2(vectors, norms, query)
+        best = top_k(distances, limit)
+        return self._results(
+            rows[best] if rows is not None else best, distances[best], fields
+        )
+
+    async def search_many(
+        self,
+        query_matrix: Union[np.ndarray, List[List[float]]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[List[VectorRecord]]:
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        queries = as_matrix(query_matrix)
+        if self._size == 0:
+            return [[] for _ in range(len(queries))]
+
+        vectors = self._vectors[: self._size]
+        norms = self._norms[: self._size]
+        rows = self._candidate_rows(metadata_filter)
+        if rows is not None:
+            vectors, norms = vectors[rows], norms[rows]
+
+        results = []
+        for batch in query_batches(queries, len(norms)):
+            distances = squared_l2_many(vectors, norms, batch)
+            best = top_k_rows(distances, limit)
+            best_distances = np.take_along_axis(distances, best, axis=1)
+            for hits, hit_distances in zip(best, best_distances):
+                results.append(
+                    self._results(
+                        rows[hits] if rows is not None else hits,
+                        hit_distances,
+                        fields,
+                    )
+                )
+        return results
+
+    async def clear(self) -> None:
+        self._size = 0
+        self._vectors = np.empty((0, self._dim or 0), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids = []
+        self._metadata = []
+        self._rows = {}
+        self._filter_index = None
@@ -0,0 +1,261 @@
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .utils import COMPARISONS, RANGE_OPERATORS, filter_operators
+
+
+def _scalar(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _rows(rows: Set[int]) -> np.ndarray:
+    return np.sort(np.fromiter(rows, dtype=np.intp, count=len(rows)))
+
+
+def _union(arrays: List[np.ndarray]) -> np.ndarray:
+    """Sorted union of sorted row arrays"""
+    if not arrays:
+        return np.empty(0, dtype=np.intp)
+    if len(arrays) == 1:
+        return arrays[0]
+    rows = np.sort(np.concatenate(arrays))
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = rows[1:] != rows[:-1]
+    return rows[keep]
+
+
+def _intersect(small: np.ndarray, large: np.ndarray) -> np.ndarray:
+    """Rows of sorted ``small`` also in sorted ``large``, in O(small * log(large))"""
+    if not len(large):
+        return large
+    positions = np.searchsorted(large, small)
+    positions[positions == len(large)] = 0
+    return small[large[positions] == small]
+
+
+class MetadataIndex:
+    """Secondary indexes mapping metadata conditions to row numbers.
+
+    Categorical fields get an inverted index from each value to the rows
+    holding it; fields in ``range_fields`` also get a sorted array of
+    values, so that ``$gt``/``$gte``/``$lt``/``$lte`` bounds become two
+    binary searches. ``lookup`` answers a filter from these before any
+    distance is computed, so a filtered search touches only matching rows.
+
+    A field stops being indexed by value once it has more than
+    ``max_categories`` distinct values (e.g. distances or timestamps);
+    conditions on it are then checked row by row over the candidates the
+    other conditions leave. Row numbers are the owning store's, which reports
+    every insert, removal and move.
+    """
+
+    def __init__(
+        self, range_fields: Sequence[str] = ("date",), max_categories: int = 1024
+    ):
+        """Initialize MetadataIndex.
+
+        Args:
+            range_fields: Fields to keep sorted for range conditions
+            max_categories: Distinct values above which a field's inverted
+                index is dropped
+        """
+        self.range_fields = frozenset(range_fields)
+        self.max_categories = max_categories
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {}
+        self._unindexed: Set[str] = set()
+        self._values: Dict[str, Dict[int, Any]] = {f: {} for f in self.range_fields}
+        # Caches rebuilt on first use after a write
+        self._arrays: Dict[Tuple[str, Any], np.ndarray] = {}
+        self._sorted: Dict[str, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._unindexed.clear()
+        for values in self._values.values():
+            values.clear()
+        self._arrays.clear()
+        self._sorted.clear()
+
+    # Maintenance
+
+    def add(self, row: int, metadata: Optional[Dict[str, Any]]) -> None:
+        for key, value in (metadata or {}).items():
+            if key in self._values:
+                self._values[key][row] = value
+                self._sorted.pop(key, None)
+            if key in self._unindexed:
+                continue
+            postings = self._postings.setdefault(key, {})
+            rows = postings.get(value) if _scalar(value) else None
+            if rows is None:
+                if not _scalar(value) or len(postings) >= self.max_categories:
+                    self._drop(key)
+                    continue
+                rows = postings[value] = set()
+            rows.add(row)
+            self._arrays.pop((key, value), None)
+
+    def add_many(
+        self, start: int, metadata: Sequence[Optional[Dict[str, Any]]]
+    ) -> None:
+        for row, m in enumerate(metadata, start):
+            self.add(row, m)
+
+    def remove(self, row: int, metadata: Optional[Dict[str, Any]]) -> None:
+        for key, value in (metadata or {}).items():
+            if key in self._values:
+                self._values[key].pop(row, None)
+                self._sorted.pop(key, None)
+            postings = self._postings.get(key)
+            rows = postings.get(value) if postings and _scalar(value) else None
+            if rows is None:
+                continue
+            rows.discard(row)
+            if not rows:
+                del postings[value]
+            self._arrays.pop((key, value), None)
+
+    def move(self, source: int, dest: int, metadata: Optional[Dict[str, Any]]) -> None:
+        """Record that the row at ``source`` now lives at ``dest``"""
+        self.remove(source, metadata)
+        self.add(dest, metadata)
+
+    def _drop(self, key: str) -> None:
+        self._unindexed.add(key)
+        for value in self._postings.pop(key, {}):
+            self._arrays.pop((key, value), None)
+
+    # Lookups
+
+    def _posting(self, key: str, value: Any) -> np.ndarray:
+        array = self._arrays.get((key, value))
+        if array is None:
+            rows = self._postings[key].get(value) if _scalar(value) else None
+            array = self._arrays[(key, value)] = _rows(rows or set())
+        return array
+
+    def _sorted_values(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Values of a range field in ascending order, with their rows.
+
+        None when the values mix types that don't compare, e.g. strings and
+        numbers.
+        """
+        if key not in self._sorted:
+            values = self._values[key]
+            if all(isinstance(v, str) for v in values.values()):
+                dtype: Any = str
+            elif all(
+                isinstance(v, (int, float)) and not isinstance(v, bool)
+                for v in values.values()
+            ):
+                dtype = np.float64
+            else:
+                self._sorted[key] = None
+                return None
+            keys = np.array(list(values.values()), dtype=dtype)
+            rows = np.fromiter(values.keys(), dtype=np.intp, count=len(values))
+            order = np.argsort(keys, kind="stable")
+            self._sorted[key] = (keys[order], rows[order])
+        return self._sorted[key]
+
+    def _range(self, key: str, bounds: List[Tuple[str, Any]]) -> Optional[np.ndarray]:
+        """Rows of ``key`` within all range bounds, or None if not indexed"""
+        if key in self._values:
+            index = self._sorted_values(key)
+            if index is not None:
+                keys, rows = index
+                numeric = keys.dtype.kind == "f"
+                lo, hi = 0, len(keys)
+                for op, operand in bounds:
+                    number = isinstance(operand, (int, float)) and not isinstance(
+                        operand, bool
+                    )
+                    if not (number if numeric else isinstance(operand, str)):
+                        # Values of another type never compare as in range
+                        return rows[:0]
+                    if op in ("$gt", "$gte"):
+                        side = "right" if op == "$gt" else "left"
+                        lo = max(lo, int(np.searchsorted(keys, operand, side)))
+                    else:
+                        side = "left" if op == "$lt" else "right"
+                        hi = min(hi, int(np.searchsorted(keys, operand, side)))
+                return np.sort(rows[lo:hi]) if lo < hi else rows[:0]
+
+        postings = self._postings.get(key)
+        if key in self._unindexed or postings is None:
+            return None if key in self._unindexed else np.empty(0, dtype=np.intp)
+
+        def in_range(value: Any) -> bool:
+            try:
+                return all(COMPARISONS[op](value, operand) for op, operand in bounds)
+            except TypeError:
+                return False
+
+        return _union([self._posting(key, v) for v in postings if in_range(v)])
+
+    def _condition(self, key: str, op: str, operand: Any) -> Optional[np.ndarray]:
+        """Rows matching one equality or membership condition"""
+        if op not in ("$eq", "$in"):
+            return None  # Negations match most rows; checked row by row
+        values = [operand] if op == "$eq" else list(operand)
+        if key in self._unindexed:
+            if key in self._values and op == "$eq":
+                return self._range(key, [("$gte", operand), ("$lte", operand)])
+            return None
+        if key not in self._postings:
+            return np.empty(0, dtype=np.intp)
+        return _union([self._posting(key, v) for v in values])
+
+    def lookup(
+        self, metadata_filter: Dict[str, Any]
+    ) -> Tuple[Optional[np.ndarray], bool]:
+        """Candidate rows for a filter, answered from the indexes.
+
+        Returns:
+            Sorted candidate rows, or None when no condition is indexed, and
+            whether every condition was answered exactly. When it's False the
+            candidates still have to be checked with ``matches_filter``.
+        """
+        candidates: List[np.ndarray] = []
+        exact = True
+        for key, condition in metadata_filter.items():
+            if key in ("$and", "$or"):
+                parts = [self.lookup(f) for f in condition]
+                exact = exact and all(e for _, e in parts)
+                if key == "$and":
+                    candidates += [rows for rows, _ in parts if rows is not None]
+                elif all(rows is not None for rows, _ in parts):
+                    candidates.append(_union([rows for rows, _ in parts]))
+                else:
+                    exact = False
+                continue
+
+            if key.startswith("$"):
+                raise ValueError(f"Unknown filter operator {key!r}")
+            bounds = []
+            for op, operand in filter_operators(key, condition):
+                if op in RANGE_OPERATORS:
+                    bounds.append((op, operand))
+                    continue
+                rows = self._condition(key, op, operand)
+                if rows is None:
+                    exact = False
+                else:
+                    candidates.append(rows)
+            if bounds:
+                rows = self._range(key, bounds)
+                if rows is None:
+                    exact = False
+                else:
+                    candidates.append(rows)
+
+        if not candidates:
+            return None, False
+        candidates.sort(key=len)
+        rows = candidates[0]
+        for other in candidates[1:]:
+            if not len(rows):
+                break
+            rows = _intersect(rows, other)
+        return rows, exact
@@ -0,0 +1,205 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+from .ann import kmeans
+
+
+class Quantizer(ABC):
+    """Compressed encoding of float32 vectors.
+
+    Search uses asymmetric distances: the query stays float32 and only the
+    stored vectors are compressed, so no precision is lost on the query
+    side. Distances are squared L2 to the decoded vectors.
+    """
+
+    dtype: np.dtype
+
+    def __init__(self) -> None:
+        self.dim: Optional[int] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.dim is not None
+
+    @property
+    @abstractmethod
+    def code_size(self) -> int:
+        """Number of ``dtype`` elements per encoded vector"""
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self.code_size * np.dtype(self.dtype).itemsize
+
+    def train(self, sample: np.ndarray) -> None:
+        """Fit the encoding to a float32 sample of the vectors to store"""
+        self.dim = sample.shape[1]
+
+    @abstractmethod
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        """Codes of a float32 matrix, shape (rows, code_size)"""
+
+    @abstractmethod
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Approximate float32 vectors of codes"""
+
+    def norms(self, codes: np.ndarray) -> np.ndarray:
+        """Squared norms of the decoded vectors, kept alongside the codes"""
+        vectors = self.decode(codes)
+        return np.einsum("ij,ij->i", vectors, vectors)
+
+    @abstractmethod
+    def distances(
+        self, query: np.ndarray, codes: np.ndarray, norms: np.ndarray
+    ) -> np.ndarray:
+        """Squared L2 distances from a float32 query to every encoded row"""
+
+
+class Float16Quantizer(Quantizer):
+    """Half-precision storage: half the memory, about three significant digits"""
+
+    dtype = np.dtype(np.float16)
+
+    @property
+    def code_size(self) -> int:
+        return self.dim or 0
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix.astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def distances(
+        self, query: np.ndarray, codes: np.ndarray, norms: np.ndarray
+    ) -> np.ndarray:
+        distances = norms - 2.0 * (codes.astype(np.float32) @ query)
+        distances += float(query @ query)
+        np.maximum(distances, 0.0, out=distances)
+        return distances
+
+
+class Int8Quantizer(Quantizer):
+    """Scalar quantization to 256 levels per dimension.
+
+    Each dimension gets its own offset and step, fitted to the training
+    sample's range; values outside it are clipped.
+    """
+
+    dtype = np.dtype(np.int8)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def code_size(self) -> int:
+        return self.dim or 0
+
+    def train(self, sample: np.ndarray) -> None:
+        super().train(sample)
+        low, high = sample.min(axis=0), sample.max(axis=0)
+        scale = (high - low) / 255.0
+        self.scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+        self.offset = low.astype(np.float32)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        levels = np.rint((matrix - self.offset) / self.scale)
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) + 128.0) * self.scale + self.offset
+
+    def distances(
+        self, query: np.ndarray, codes: np.ndarray, norms: np.ndarray
+    ) -> np.ndarray:
+        # x.q = offset.q + (code + 128) . (scale * q)
+        scaled = self.scale * query
+        dots = codes.astype(np.float32) @ scaled
+        dots += float(self.offset @ query) + 128.0 * float(scaled.sum())
+        distances = norms - 2.0 * dots + float(query @ query)
+        np.maximum(distances, 0.0, out=distances)
+        return distances
+
+
+class ProductQuantizer(Quantizer):
+    """Product quantization: one byte per subvector.
+
+    Vectors are split into ``subvectors`` equal parts and each part is
+    replaced by the nearest of 256 k-means centroids of that subspace,
+    trained on up to 39 samples per centroid. A search computes each query
+    part's distance to the 256 centroids once, then sums ``subvectors``
+    table lookups per stored vector.
+    """
+
+    dtype = np.dtype(np.uint8)
+
+    def __init__(
+        self, subvectors: int = 8, iterations: int = 20, seed: Optional[int] = None
+    ):
+        """Initialize ProductQuantizer.
+
+        Args:
+            subvectors: Parts each vector is split into; must divide the dimension
+            iterations: k-means iterations per subspace
+            seed: Optional random seed for reproducible training
+        """
+        super().__init__()
+        self.subvectors = subvectors
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (subvectors, 256, sub_dim)
+        self._codebook_norms: Optional[np.ndarray] = None
+        self._offsets = np.arange(subvectors) * 256
+
+    @property
+    def code_size(self) -> int:
+        return self.subvectors
+
+    def train(self, sample: np.ndarray) -> None:
+        if sample.shape[1] % self.subvectors:
+            raise ValueError(
+                f"Dimension {sample.shape[1]} is not divisible into "
+                f"{self.subvectors} subvectors"
+            )
+        super().train(sample)
+        if len(sample) > 39 * 256:
+            rng = np.random.default_rng(self.seed)
+            sample = sample[rng.choice(len(sample), 39 * 256, replace=False)]
+        sub_dim = sample.shape[1] // self.subvectors
+        codebooks = np.zeros((self.subvectors, 256, sub_dim), dtype=np.float32)
+        for j in range(self.subvectors):
+            part = np.ascontiguousarray(sample[:, j * sub_dim : (j + 1) * sub_dim])
+            centroids = kmeans(part, 256, self.iterations, self.seed)
+            # Small samples give fewer centroids; unused codes repeat the first
+            codebooks[j] = centroids[0]
+            codebooks[j, : len(centroids)] = centroids
+        self.codebooks = codebooks
+        self._codebook_norms = np.einsum("jkd,jkd->jk", codebooks, codebooks)
+
+    def _parts(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix.reshape(len(matrix), self.subvectors, -1)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(matrix), self.subvectors), dtype=np.uint8)
+        parts = self._parts(matrix)
+        for j, codebook in enumerate(self.codebooks):
+            distances = self._codebook_norms[j] - 2.0 * (parts[:, j] @ codebook.T)
+            codes[:, j] = distances.argmin(axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(self.subvectors), codes]
+        return parts.reshape(len(codes), -1)
+
+    def distances(
+        self, query: np.ndarray, codes: np.ndarray, norms: np.ndarray
+    ) -> np.ndarray:
+        parts = self._parts(query[None, :])[0]
+        table = self._codebook_norms - 2.0 * np.einsum(
+            "jkd,jd->jk", self.codebooks, parts
+        )
+        table += np.einsum("jd,jd->j", parts, parts)[:, None]
+        return table.ravel()[codes + self._offsets].sum(axis=1)
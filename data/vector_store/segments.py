@@ -0,0 +1,873 @@
+import asyncio
+import contextlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from .base import (
+    GET_INCLUDE,
+    SEARCH_INCLUDE,
+    VectorRecord,
+    VectorStore,
+    check_missing,
+    resolve_include,
+)
+from .metadata_index import MetadataIndex
+from .utils import (
+    as_matrix,
+    as_vector,
+    matches_filter,
+    query_batches,
+    squared_l2,
+    squared_l2_many,
+    top_k,
+    top_k_rows,
+)
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+SUFFIXES = (".vec", ".norm", ".meta", ".off", ".del")
+
+# Sidecar lines are written as {"id": ..., "metadata": ...}
+_ID_PREFIX = '{"id": '
+_decode = json.JSONDecoder().raw_decode
+
+
+def _entry_id(line: bytes) -> str:
+    """Id of a sidecar line, decoded without parsing its metadata."""
+    text = line.decode()
+    if text.startswith(_ID_PREFIX):
+        return _decode(text, len(_ID_PREFIX))[0]
+    return json.loads(text)["id"]
+
+
+class _Segment:
+    """One append-only segment on disk.
+
+    Files sharing the segment name:
+
+    - ``.vec``: raw float32 rows (rows x dim), opened with ``np.memmap``
+    - ``.norm``: float32 squared norm per row
+    - ``.meta``: JSON lines with ``id`` and ``metadata`` per row
+    - ``.off``: uint64 byte offset of each row's line in ``.meta``
+    - ``.del``: uint32 row numbers of tombstoned rows
+
+    Only the first ``rows`` rows and ``deleted`` tombstones recorded in the
+    manifest are visible, so a reader never sees a half-written append.
+    ``truncate`` drops anything past them before a writer appends again.
+    """
+
+    def __init__(self, root: Path, name: str, rows: int, deleted: int, dim: int):
+        self.root = root
+        self.name = name
+        self.rows = rows
+        self.deleted = deleted
+        self.dim = dim
+        self._vectors: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self._entries: Optional[List[Dict[str, Any]]] = None
+        self._index: Optional[MetadataIndex] = None
+        self._locations: Optional[Dict[str, int]] = None
+
+    def path(self, suffix: str) -> Path:
+        return self.root / f"{self.name}{suffix}"
+
+    def _map(self, suffix: str, dtype: Any, shape: Tuple[int, ...]) -> np.ndarray:
+        if self.rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path(suffix), dtype=dtype, mode="r", shape=shape)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            self._vectors = self._map(".vec", np.float32, (self.rows, self.dim))
+        return self._vectors
+
+    @property
+    def norms(self) -> np.ndarray:
+        if self._norms is None:
+            self._norms = self._map(".norm", np.float32, (self.rows,))
+        return self._norms
+
+    @property
+    def offsets(self) -> np.ndarray:
+        if self._offsets is None:
+            self._offsets = self._map(".off", np.uint64, (self.rows,))
+        return self._offsets
+
+    @property
+    def alive(self) -> np.ndarray:
+        if self._alive is None:
+            alive = np.ones(self.rows, dtype=bool)
+            if self.deleted:
+                dead = np.fromfile(
+                    self.path(".del"), dtype=np.uint32, count=self.deleted
+                )
+                alive[dead] = False
+            self._alive = alive
+        return self._alive
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All sidecar entries of this segment, parsed once and cached."""
+        if self._entries is None:
+            entries = []
+            if self.rows:
+                with open(self.path(".meta"), "rb") as f:
+                    for _, line in zip(range(self.rows), f):
+                        entries.append(json.loads(line))
+            self._entries = entries
+        return self._entries
+
+    def locations(self) -> Dict[str, int]:
+        """Map of live id -> row, built on first use from the ids alone."""
+        if self._locations is None:
+            if self._entries is not None:
+                ids: Iterable[str] = (e["id"] for e in self._entries)
+            elif self.rows:
+                with open(self.path(".meta"), "rb") as f:
+                    ids = [_entry_id(line) for _, line in zip(range(self.rows), f)]
+            else:
+                ids = ()
+            alive = self.alive
+            self._locations = {id: row for row, id in enumerate(ids) if alive[row]}
+        return self._locations
+
+    def metadata_index(self, range_fields: Sequence[str]) -> MetadataIndex:
+        """Index over this segment's metadata, built on first use."""
+        if self._index is None:
+            index = MetadataIndex(range_fields)
+            index.add_many(0, [e["metadata"] for e in self.entries()])
+            self._index = index
+        return self._index
+
+    def entry(self, row: int) -> Dict[str, Any]:
+        """Read a single sidecar entry by seeking to its offset."""
+        if self._entries is not None:
+            return self._entries[row]
+        with open(self.path(".meta"), "rb") as f:
+            f.seek(int(self.offsets[row]))
+            return json.loads(f.readline())
+
+    def entries_at(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Read several sidecar entries, opening the file once."""
+        if self._entries is not None:
+            return [self._entries[row] for row in rows]
+        entries = []
+        with open(self.path(".meta"), "rb") as f:
+            for offset in self.offsets[list(rows)].tolist():
+                f.seek(offset)
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def append(self, matrix: np.ndarray, entries: List[Dict[str, Any]]) -> None:
+        """Append rows to the segment files. Visible once the manifest is saved."""
+        lines = [json.dumps(e).encode() + b"\n" for e in entries]
+        with open(self.path(".meta"), "ab") as f:
+            start = f.tell()
+            f.write(b"".join(lines))
+        offsets = start + np.cumsum([0] + [len(line) for line in lines[:-1]])
+
+        with open(self.path(".vec"), "ab") as f:
+            f.write(matrix.tobytes())
+        with open(self.path(".norm"), "ab") as f:
+            f.write(np.einsum("ij,ij->i", matrix, matrix).astype(np.float32).tobytes())
+        with open(self.path(".off"), "ab") as f:
+            f.write(offsets.astype(np.uint64).tobytes())
+
+        alive = self._alive
+        if self._index is not None:
+            self._index.add_many(self.rows, [e["metadata"] for e in entries])
+        self.rows += len(entries)
+        self._vectors = self._norms = self._offsets = None
+        if alive is not None:
+            self._alive = np.concatenate([alive, np.ones(len(entries), dtype=bool)])
+        if self._entries is not None:
+            self._entries.extend(entries)
+        if self._locations is not None:
+            first_row = self.rows - len(entries)
+            for offset, entry in enumerate(entries):
+                self._locations[entry["id"]] = first_row + offset
+
+    def truncate(self) -> None:
+        """Cut the files back to ``rows`` and ``deleted``.
+
+        Drops whatever an append or delete wrote before failing to save the
+        manifest, so the next append starts right after the visible rows.
+        """
+        meta_size = 0
+        if self.rows:
+            last = np.fromfile(
+                self.path(".off"),
+                dtype=np.uint64,
+                count=1,
+                offset=(self.rows - 1) * 8,
+            )
+            with open(self.path(".meta"), "rb") as f:
+                f.seek(int(last[0]))
+                meta_size = f.tell() + len(f.readline())
+        sizes = {
+            ".vec": self.rows * self.dim * 4,
+            ".norm": self.rows * 4,
+            ".meta": meta_size,
+            ".off": self.rows * 8,
+            ".del": self.deleted * 4,
+        }
+        for suffix, size in sizes.items():
+            path = self.path(suffix)
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    def tombstone(self, rows: Sequence[int]) -> None:
+        with open(self.path(".del"), "ab") as f:
+            f.write(np.asarray(rows, dtype=np.uint32).tobytes())
+        self.deleted += len(rows)
+        if self._alive is not None:
+            self._alive[list(rows)] = False
+
+    @property
+    def live_rows(self) -> int:
+        return self.rows - self.deleted
+
+    def remove_files(self) -> None:
+        for suffix in SUFFIXES:
+            try:
+                self.path(suffix).unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SegmentStore(VectorStore):
+    """Persistent vector store made of memory-mapped, append-only segments.
+
+    Opening the store only reads a small manifest; vectors are memory-mapped
+    lazily, so several processes can share the same pages read-only. Deletes
+    and updates write tombstones, and ``compact`` merges segments and drops
+    tombstoned rows in the background. Filtered searches only score the rows
+    a per-segment ``MetadataIndex`` returns for the filter.
+
+    A directory must have at most one writer at a time. Other processes should
+    open it with ``read_only=True`` and call ``refresh`` to pick up new writes.
+    The writer cuts segment files back to the manifest when it opens the
+    store and whenever a write fails, so bytes of an append whose manifest
+    was never saved cannot resurface.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        read_only: bool = False,
+        segment_rows: int = 65536,
+        range_fields: Sequence[str] = ("date",),
+    ):
+        """Initialize SegmentStore.
+
+        Args:
+            path: Directory holding the manifest and segment files
+            read_only: Open without write access, e.g. from a second process
+            segment_rows: Rows after which appends start a new segment
+            range_fields: Metadata fields indexed for range filters
+        """
+        self._root = Path(path).resolve()
+        self._read_only = read_only
+        self._segment_rows = segment_rows
+        self._range_fields = tuple(range_fields)
+        self._write_lock = asyncio.Lock()
+        self._manifest_mtime: Optional[int] = None
+        # Files may differ from the manifest until the next save
+        self._dirty = False
+
+        if read_only:
+            self._load_manifest()
+        else:
+            self._root.mkdir(parents=True, exist_ok=True)
+            self._recover()
+
+    # Manifest handling
+
+    def _load_manifest(self) -> None:
+        manifest_path = self._root / MANIFEST
+        if manifest_path.exists():
+            self._manifest_mtime = manifest_path.stat().st_mtime_ns
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get("version") != FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported segment format version: {manifest.get('version')}"
+                )
+        else:
+            manifest = {"dim": None, "next_segment": 0, "segments": []}
+
+        self._dim: Optional[int] = manifest["dim"]
+        self._next_segment: int = manifest["next_segment"]
+        self._segments = [
+            _Segment(self._root, s["name"], s["rows"], s["deleted"], self._dim or 0)
+            for s in manifest["segments"]
+        ]
+
+    def _save_manifest(self) -> None:
+        manifest = {
+            "version": FORMAT_VERSION,
+            "dim": self._dim,
+            "next_segment": self._next_segment,
+            "segments": [
+                {"name": s.name, "rows": s.rows, "deleted": s.deleted}
+                for s in self._segments
+            ],
+        }
+        tmp_path = self._root / f"{MANIFEST}.tmp"
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, self._root / MANIFEST)
+        self._manifest_mtime = (self._root / MANIFEST).stat().st_mtime_ns
+        self._dirty = False
+
+    def _recover(self) -> None:
+        """Reload the manifest and cut the files back to what it records.
+
+        Segment files the manifest does not list, e.g. of a compaction that
+        never finished, are removed.
+        """
+        self._load_manifest()
+        listed = {segment.name for segment in self._segments}
+        for path in self._root.glob("seg-*"):
+            if path.suffix in SUFFIXES and path.stem not in listed:
+                path.unlink()
+        for segment in self._segments:
+            segment.truncate()
+        self._dirty = False
+
+    @contextlib.asynccontextmanager
+    async def _writing(self) -> AsyncIterator[None]:
+        """Hold the write lock, rolling back to the manifest if a write fails."""
+        async with self._write_lock:
+            try:
+                yield
+            except Exception:
+                if self._dirty:
+                    self._recover()
+                raise
+
+    def refresh(self) -> bool:
+        """Reload the manifest if another process changed it.
+
+        Returns:
+            bool: True if the view of the store changed
+        """
+        try:
+            mtime = (self._root / MANIFEST).stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return False
+        self._load_manifest()
+        return True
+
+    def _check_writable(self) -> None:
+        if self._read_only:
+            raise PermissionError(f"SegmentStore at {self._root} is read-only")
+
+    def _new_segment(self) -> _Segment:
+        self._dirty = True
+        segment = _Segment(
+            self._root, f"seg-{self._next_segment:06d}", 0, 0, self._dim or 0
+        )
+        self._next_segment += 1
+        self._segments.append(segment)
+        return segment
+
+    # Lookups
+
+    def _find(self, id: str) -> Optional[Tuple[int, int]]:
+        """(segment index, row) of a live id, or None.
+
+        Segments are searched newest first and each one decodes its ids only
+        when first searched, so recently written ids are found without
+        reading older sidecars.
+        """
+        for seg_index in range(len(self._segments) - 1, -1, -1):
+            row = self._segments[seg_index].locations().get(id)
+            if row is not None:
+                return seg_index, row
+        return None
+
+    def _find_many(self, ids: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        """Locations of the live ids among ``ids``"""
+        found = {}
+        for id in ids:
+            location = self._find(id)
+            if location is not None:
+                found[id] = location
+        return found
+
+    def _locate(self, id: str) -> Tuple[int, int]:
+        location = self._find(id)
+        if location is None:
+            raise KeyError(f"No embedding found with id: {id}")
+        return location
+
+    def __len__(self) -> int:
+        return sum(s.live_rows for s in self._segments)
+
+    # Writes
+
+    def _check_dim(self, matrix: np.ndarray) -> None:
+        if self._dim is not None and matrix.shape[1] != self._dim:
+            raise ValueError(
+                f"Embedding dimension mismatch: expected {self._dim}, "
+                f"got {matrix.shape[1]}"
+            )
+
+    def _append(
+        self,
+        matrix: np.ndarray,
+        metadata: List[Optional[Dict[str, Any]]],
+        ids: List[str],
+    ) -> None:
+        self._check_dim(matrix)
+        if self._dim is None:
+            self._dim = matrix.shape[1]
+            for segment in self._segments:
+                segment.dim = self._dim
+
+        for doc_id in ids:
+            if self._find(doc_id) is not None:
+                raise ValueError(f"Embedding with id {doc_id} already exists")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in batch")
+
+        self._dirty = True
+
+        start = 0
+        while start < len(ids):
+            if not self._segments or self._segments[-1].rows >= self._segment_rows:
+                self._new_segment()
+            segment = self._segments[-1]
+            end = min(len(ids), start + self._segment_rows - segment.rows)
+            segment.append(
+                matrix[start:end],
+                [
+                    {"id": doc_id, "metadata": m}
+                    for doc_id, m in zip(ids[start:end], metadata[start:end])
+                ],
+            )
+            start = end
+        self._save_manifest()
+
+    async def add(
+        self,
+        embeddings: Union[np.ndarray, List[float]],
+        metadata: Optional[Dict[str, Any]] = None,
+        id: Optional[str] = None,
+    ) -> str:
+        self._check_writable()
+        doc_id = id or str(uuid.uuid4())
+        async with self._writing():
+            self._append(as_vector(embeddings)[None, :], [metadata or None], [doc_id])
+        return doc_id
+
+    async def add_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        self._check_writable()
+        if not ids:
+            ids = [str(uuid.uuid4()) for _ in embeddings]
+        if metadata is None:
+            metadata = [None] * len(ids)
+        if not (len(embeddings) == len(ids) == len(metadata)):
+            raise ValueError("embeddings, metadata and ids must have the same length")
+        if not ids:
+            return []
+
+        async with self._writing():
+            self._append(
+                as_matrix(embeddings), [m or None for m in metadata], list(ids)
+            )
+        return list(ids)
+
+    async def get(
+        self, id: str, include: Optional[Sequence[str]] = None
+    ) -> VectorRecord:
+        if self._read_only:
+            self.refresh()
+        seg_index, row = self._locate(id)
+        return self._result(seg_index, row, resolve_include(include, GET_INCLUDE))
+
+    async def get_many(
+        self,
+        ids: Sequence[str],
+        include: Optional[Sequence[str]] = None,
+        on_missing: str = "raise",
+    ) -> List[VectorRecord]:
+        fields = resolve_include(include, GET_INCLUDE)
+        if self._read_only:
+            self.refresh()
+        locations = self._find_many(ids)
+        check_missing([id for id in ids if id not in locations], on_missing, "get")
+        found = [locations[id] for id in ids if id in locations]
+
+        # One sidecar read and one vector gather per segment
+        by_segment: Dict[int, List[int]] = {}
+        for seg_index, row in found:
+            by_segment.setdefault(seg_index, []).append(row)
+        records: Dict[Tuple[int, int], VectorRecord] = {}
+        for seg_index, rows in by_segment.items():
+            segment = self._segments[seg_index]
+            vectors = (
+                np.asarray(segment.vectors[rows])
+                if "embedding" in fields
+                else [None] * len(rows)
+            )
+            for row, entry, vector in zip(rows, segment.entries_at(rows), vectors):
+                records[seg_index, row] = VectorRecord(
+                    entry["id"],
+                    vector,
+                    entry["metadata"] if "metadata" in fields else None,
+                )
+        return [records[location] for location in found]
+
+    def _tombstone(self, ids: Sequence[str]) -> None:
+        """Tombstone live ids, one write per segment. Does not save the manifest."""
+        self._dirty = True
+        by_segment: Dict[int, List[int]] = {}
+        for id in ids:
+            seg_index, row = self._locate(id)
+            del self._segments[seg_index].locations()[id]
+            by_segment.setdefault(seg_index, []).append(row)
+        for seg_index, rows in by_segment.items():
+            self._segments[seg_index].tombstone(rows)
+
+    def _replace(
+        self,
+        ids: List[str],
+        matrix: Optional[np.ndarray],
+        metadata: Optional[List[Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Rewrite existing ids as a tombstone plus an append of the new rows.
+
+        Entries without a new embedding or metadata keep their current value.
+        """
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in batch")
+        if matrix is not None:
+            self._check_dim(matrix)
+        vectors = []
+        new_metadata = []
+        for i, id in enumerate(ids):
+            seg_index, row = self._locate(id)
+            segment = self._segments[seg_index]
+            vectors.append(
+                matrix[i] if matrix is not None else np.array(segment.vectors[row])
+            )
+            if metadata is not None and metadata[i]:
+                new_metadata.append(metadata[i])
+            else:
+                new_metadata.append(segment.entry(row)["metadata"])
+        self._tombstone(ids)
+        self._append(np.stack(vectors), new_metadata, ids)
+
+    async def update(
+        self,
+        id: str,
+        embedding: Optional[Union[np.ndarray, List[float]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._check_writable()
+        async with self._writing():
+            if self._find(id) is None:
+                raise KeyError(f"Cannot update: no embedding found with id: {id}")
+            self._replace(
+                [id],
+                as_vector(embedding)[None, :] if embedding is not None else None,
+                [metadata],
+            )
+
+    async def delete(self, id: str) -> None:
+        self._check_writable()
+        async with self._writing():
+            if self._find(id) is None:
+                raise KeyError(f"Cannot delete: no embedding found with id: {id}")
+            self._tombstone([id])
+            self._save_manifest()
+
+    async def upsert_many(
+        self,
+        embeddings: List[Union[np.ndarray, List[float]]],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        self._check_writable()
+        if not ids:
+            raise ValueError("upsert_many requires ids")
+        if metadata is None:
+            metadata = [None] * len(ids)
+        if not (len(embeddings) == len(ids) == len(metadata)):
+            raise ValueError("embeddings, metadata and ids must have the same length")
+
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in batch")
+        matrix = as_matrix(embeddings)
+        self._check_dim(matrix)
+
+        async with self._writing():
+            locations = self._find_many(ids)
+            # Existing entries keep their metadata unless new metadata is given
+            merged = []
+            for id, m in zip(ids, metadata):
+                if not m and id in locations:
+                    seg_index, row = locations[id]
+                    m = self._segments[seg_index].entry(row)["metadata"]
+                merged.append(m)
+            self._tombstone([id for id in ids if id in locations])
+            self._append(matrix, [m or None for m in merged], list(ids))
+        return list(ids)
+
+    async def update_many(
+        self,
+        ids: List[str],
+        embeddings: Optional[List[Union[np.ndarray, List[float]]]] = None,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        on_missing: str = "raise",
+    ) -> List[str]:
+        self._check_writable()
+        async with self._writing():
+            locations = self._find_many(ids)
+            check_missing(
+                [id for id in ids if id not in locations], on_missing, "update"
+            )
+            present = [i for i, id in enumerate(ids) if id in locations]
+            if present:
+                self._replace(
+                    [ids[i] for i in present],
+                    as_matrix(embeddings)[present] if embeddings is not None else None,
+                    [metadata[i] for i in present] if metadata is not None else None,
+                )
+        return [ids[i] for i in present]
+
+    async def delete_many(self, ids: List[str], on_missing: str = "raise") -> List[str]:
+        self._check_writable()
+        async with self._writing():
+            locations = self._find_many(ids)
+            check_missing(
+                [id for id in ids if id not in locations], on_missing, "delete"
+            )
+            present = list(dict.fromkeys(id for id in ids if id in locations))
+            if present:
+                self._tombstone(present)
+                self._save_manifest()
+        return present
+
+    def _candidate_rows(
+        self, segment: _Segment, metadata_filter: Optional[Dict[str, Any]]
+    ) -> Optional[np.ndarray]:
+        """Live rows of the segment matching the filter, or None without one."""
+        if not metadata_filter:
+            return None
+        rows, exact = segment.metadata_index(self._range_fields).lookup(metadata_filter)
+        if not exact:
+            entries = segment.entries()
+            rows = np.fromiter(
+                (
+                    row
+                    for row in (range(segment.rows) if rows is None else rows.tolist())
+                    if matches_filter(entries[row]["metadata"], metadata_filter)
+                ),
+                dtype=np.intp,
+            )
+        return rows[segment.alive[rows]]
+
+    def _result(
+        self,
+        seg_index: int,
+        row: int,
+        fields: FrozenSet[str],
+        distance: Optional[float] = None,
+    ) -> VectorRecord:
+        segment = self._segments[seg_index]
+        entry = segment.entry(row)
+        return VectorRecord(
+            entry["id"],
+            np.array(segment.vectors[row]) if "embedding" in fields else None,
+            entry["metadata"] if "metadata" in fields else None,
+            distance if "distance" in fields else None,
+        )
+
+    async def search(
+        self,
+        query_embedding: Union[np.ndarray, List[float]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[VectorRecord]:
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        if self._read_only:
+            self.refresh()
+        query = as_vector(query_embedding)
+
+        # Top-k per segment, then merge the candidates
+        candidates: List[Tuple[float, int, int]] = []
+        for seg_index, segment in enumerate(self._segments):
+            if segment.live_rows == 0:
+                continue
+            rows = self._candidate_rows(segment, metadata_filter)
+            if rows is None:
+                distances = squared_l2(segment.vectors, segment.norms, query)
+                distances[~segment.alive] = np.inf
+                best = top_k(distances, min(limit, segment.live_rows))
+            else:
+                distances = squared_l2(
+                    segment.vectors[rows], segment.norms[rows], query
+                )
+                best = top_k(distances, limit)
+            for row, distance in zip(
+                (best if rows is None else rows[best]).tolist(),
+                distances[best].tolist(),
+            ):
+                candidates.append((distance, seg_index, row))
+
+        candidates.sort()
+        return [
+            self._result(seg_index, row, fields, distance)
+            for distance, seg_index, row in candidates[:limit]
+        ]
+
+    async def search_many(
+        self,
+        query_matrix: Union[np.ndarray, List[List[float]]],
+        limit: int = 10,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        include: Optional[Sequence[str]] = None,
+    ) -> List[List[VectorRecord]]:
+        fields = resolve_include(include, SEARCH_INCLUDE)
+        if self._read_only:
+            self.refresh()
+        queries = as_matrix(query_matrix)
+
+        candidates: List[List[Tuple[float, int, int]]] = [[] for _ in queries]
+        for seg_index, segment in enumerate(self._segments):
+            if segment.live_rows == 0:
+                continue
+            rows = self._candidate_rows(segment, metadata_filter)
+            if rows is None:
+                vectors, norms = segment.vectors, segment.norms
+                k = min(limit, segment.live_rows)
+            else:
+                vectors, norms = segment.vectors[rows], segment.norms[rows]
+                k = min(limit, len(rows))
+            offset = 0
+            for batch in query_batches(queries, len(norms)):
+                distances = squared_l2_many(vectors, norms, batch)
+                if rows is None:
+                    distances[:, ~segment.alive] = np.inf
+                best = top_k_rows(distances, k)
+                best_distances = np.take_along_axis(distances, best, axis=1)
+                if rows is not None:
+                    best = rows[best]
+                for i, (hits, hit_distances) in enumerate(
+                    zip(best.tolist(), best_distances.tolist())
+                ):
+                    candidates[offset + i].extend(
+                        (d, seg_index, row) for row, d in zip(hits, hit_distances)
+                    )
+                offset += len(batch)
+
+        results = []
+        for query_candidates in candidates:
+            query_candidates.sort()
+            results.append(
+                [
+                    self._result(seg_index, row, fields, distance)
+                    for distance, seg_index, row in query_candidates[:limit]
+                ]
+            )
+        return results
+
+    async def clear(self) -> None:
+        self._check_writable()
+        async with self._writing():
+            old_segments = self._segments
+            self._segments = []
+            self._dirty = True
+            self._save_manifest()
+            for segment in old_segments:
+                segment.remove_files()
+
+    # Compaction
+
+    def needs_compaction(
+        self, max_deleted_ratio: float = 0.2, max_segments: int = 8
+    ) -> bool:
+        """Whether tombstones or segment count make a compaction worthwhile."""
+        rows = sum(s.rows for s in self._segments)
+        deleted = sum(s.deleted for s in self._segments)
+        return len(self._segments) > max_segments or (
+            rows > 0 and deleted / rows > max_deleted_ratio
+        )
+
+    def _compact_sync(self) -> Tuple[List[_Segment], List[_Segment]]:
+        """Write live rows into fresh segments. Does not touch the manifest."""
+        merged: List[_Segment] = []
+        pending_vectors: List[np.ndarray] = []
+        pending_entries: List[Dict[str, Any]] = []
+
+        def flush() -> None:
+            if not pending_entries:
+                return
+            segment = _Segment(
+                self._root, f"seg-{self._next_segment:06d}", 0, 0, self._dim or 0
+            )
+            self._next_segment += 1
+            segment.append(np.concatenate(pending_vectors), list(pending_entries))
+            merged.append(segment)
+            pending_vectors.clear()
+            pending_entries.clear()
+
+        pending_rows = 0
+        for segment in self._segments:
+            rows = np.flatnonzero(segment.alive)
+            entries = segment.entries()
+            start = 0
+            while start < len(rows):
+                chunk = rows[start : start + self._segment_rows - pending_rows]
+                pending_vectors.append(np.asarray(segment.vectors[chunk]))
+                pending_entries.extend(entries[row] for row in chunk.tolist())
+                pending_rows += len(chunk)
+                start += len(chunk)
+                if pending_rows >= self._segment_rows:
+                    flush()
+                    pending_rows = 0
+        flush()
+        return list(self._segments), merged
+
+    async def compact(self) -> None:
+        """Merge all segments and drop tombstoned rows.
+
+        The merge runs on a worker thread; writers wait for it while readers
+        keep using the current segments until the new manifest is in place.
+        """
+        self._check_writable()
+        async with self._writing():
+            loop = asyncio.get_running_loop()
+            self._dirty = True
+            old_segments, merged = await loop.run_in_executor(None, self._compact_sync)
+            self._segments = merged
+            self._save_manifest()
+            for segment in old_segments:
+                segment.remove_files()
@@ -0,0 +1,167 @@
+import operator
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+FILTER_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+COMPARISONS = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+def as_vector(embedding: Union[np.ndarray, List[float]]) -> np.ndarray:
+    """Convert a single embedding to a 1-D float32 array without copying if possible."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.ndim != 1:
+        raise ValueError(f"Expected a 1-D embedding, got shape {vector.shape}")
+    return vector
+
+
+def as_matrix(embeddings: Sequence[Union[np.ndarray, List[float]]]) -> np.ndarray:
+    """Stack embeddings into a contiguous 2-D float32 matrix."""
+    if isinstance(embeddings, np.ndarray):
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    else:
+        matrix = np.ascontiguousarray(
+            np.stack([as_vector(e) for e in embeddings]) if len(embeddings) else [],
+            dtype=np.float32,
+        )
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D embedding matrix, got shape {matrix.shape}")
+    return matrix
+
+
+def squared_l2(vectors: np.ndarray, norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Squared euclidean distance from ``query`` to every row of ``vectors``.
+
+    Uses ``|x|^2 - 2 x.q + |q|^2`` with precomputed row norms so the whole
+    computation is a single matrix-vector product.
+    """
+    distances = norms - 2.0 * (vectors @ query) + float(query @ query)
+    np.maximum(distances, 0.0, out=distances)
+    return distances
+
+
+def squared_l2_many(
+    vectors: np.ndarray, norms: np.ndarray, queries: np.ndarray
+) -> np.ndarray:
+    """Squared euclidean distances for a batch of queries, shape (queries, rows).
+
+    Same expansion as ``squared_l2`` but with a single matrix-matrix product.
+    """
+    distances = norms[None, :] - 2.0 * (queries @ vectors.T)
+    distances += np.einsum("ij,ij->i", queries, queries)[:, None]
+    np.maximum(distances, 0.0, out=distances)
+    return distances
+
+
+def top_k_rows(distances: np.ndarray, k: int) -> np.ndarray:
+    """Per-row indices of the ``k`` smallest distances, each row sorted ascending."""
+    n = distances.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((distances.shape[0], 0), dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), distances.shape)
+    order = np.argsort(
+        np.take_along_axis(distances, candidates, axis=1), axis=1, kind="stable"
+    )
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def query_batches(
+    queries: np.ndarray, rows: int, max_cells: int = 1 << 24
+) -> Iterator[np.ndarray]:
+    """Split a query matrix so each distance block stays under ``max_cells``."""
+    step = max(1, max_cells // max(rows, 1))
+    for start in range(0, queries.shape[0], step):
+        yield queries[start : start + step]
+
+
+def top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` smallest distances, sorted ascending."""
+    if k <= 0 or distances.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < distances.size:
+        candidates = np.argpartition(distances, k - 1)[:k]
+    else:
+        candidates = np.arange(distances.size)
+    return candidates[np.argsort(distances[candidates], kind="stable")]
+
+
+def filter_operators(key: str, condition: Any) -> List[Tuple[str, Any]]:
+    """The ``(operator, operand)`` pairs of one field's filter condition.
+
+    A bare value means ``$eq``; a dict may combine several operators, e.g.
+    ``{"$gte": "2024-01-01", "$lt": "2024-02-12"}``.
+    """
+    if not isinstance(condition, dict):
+        return [("$eq", condition)]
+    for op, operand in condition.items():
+        if op not in FILTER_OPERATORS:
+            raise ValueError(
+                f"Unknown filter operator {op!r} on {key!r}. "
+                f"Expected one of {FILTER_OPERATORS}"
+            )
+        if op in ("$in", "$nin") and not isinstance(operand, (list, tuple, set)):
+            raise ValueError(f"{op} on {key!r} expects a list, got {operand!r}")
+    return list(condition.items())
+
+
+def _matches(metadata: Dict[str, Any], key: str, op: str, operand: Any) -> bool:
+    if key not in metadata:
+        # Like Chroma, negations match records without the field
+        return op in ("$ne", "$nin")
+    value = metadata[key]
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    try:
+        return bool(COMPARISONS[op](value, operand))
+    except TypeError:
+        return False
+
+
+def matches_filter(
+    metadata: Optional[Dict[str, Any]], metadata_filter: Optional[Dict[str, Any]]
+) -> bool:
+    """Check whether metadata satisfies a filter.
+
+    Filters follow Chroma's ``where`` syntax: ``{"type": "tempo"}`` for
+    equality, ``{"date": {"$gte": "2024-01-01"}}`` for operators (see
+    ``FILTER_OPERATORS``), and ``$and``/``$or`` lists of filters. Keys of one
+    dict must all hold. Ranges compare values of the same type only, so ISO
+    dates compare as strings.
+
+    Raises:
+        ValueError: If the filter uses an unknown operator
+    """
+    if not metadata_filter:
+        return True
+    metadata = metadata or {}
+    for key, condition in metadata_filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown filter operator {key!r}")
+        elif not all(
+            _matches(metadata, key, op, operand)
+            for op, operand in filter_operators(key, condition)
+        ):
+            return False
+    return True
@@ -1,6 +1,26 @@
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import AsyncIterator, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+import numpy as np
+
+from .ratelimit import RateLimiter, backoff_delay, estimate_tokens
+from .tokenizer import RegexTokenizer, Tokenizer
+
+if TYPE_CHECKING:
+    from .embeddings import EmbeddingCache
 
 
 @dataclass
@@ -15,6 +35,18 @@ class LLMResponse:
 class LLMProvider(ABC):
     """Base class for LLM providers"""
 
+    # Identify what a response depends on, e.g. for response caching
+    model_name: str = ""
+    generation_config: Optional[Dict[str, Any]] = None
+
+    # Embedding settings; providers that support embeddings override these
+    embedding_model: str = ""
+    embedding_batch_size: int = 100
+    embedding_cache: Optional["EmbeddingCache"] = None
+
+    # Errors generate_many retries with backoff, e.g. quota or availability errors
+    retryable_errors: Tuple[Type[BaseException], ...] = ()
+
     @abstractmethod
     async def generate(
         self, prompt: str, context: Optional[List[str]] = None
@@ -28,3 +60,162 @@ class LLMProvider(ABC):
     ) -> AsyncIterator[str]:
         """Stream LLM response"""
         pass
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """Token counter for this provider's model, e.g. for ContextInjector.
+
+        Providers with a token counting API override this; the default is the
+        offline RegexTokenizer estimate.
+        """
+        return RegexTokenizer()
+
+    def _build_prompt(self, prompt: str, context: Optional[List[str]] = None) -> str:
+        """Build full prompt with context"""
+        if not context:
+            return prompt
+
+        context_str = "\n".join(context)
+        return f"""Context:
+{context_str}
+
+Based on the above context, please respond to:
+{prompt}"""
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed a single text"""
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, serving repeats from the cache and batching the rest.
+
+        Returns a float32 matrix with one row per input text, in input order.
+        """
+        if not self.supports_embeddings:
+            raise NotImplementedError(
+                f"{type(self).__name__} does not support embeddings"
+            )
+        cached = (
+            await self.embedding_cache.aget_many(self.embedding_model, texts)
+            if self.embedding_cache is not None
+            else {}
+        )
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+
+        computed = {}
+        for start in range(0, len(missing), self.embedding_batch_size):
+            batch = missing[start : start + self.embedding_batch_size]
+            vectors = await self._embed_batch(batch)
+            computed.update(zip(batch, np.asarray(vectors, dtype=np.float32)))
+        if computed and self.embedding_cache is not None:
+            await self.embedding_cache.aset_many(
+                self.embedding_model, list(computed.items())
+            )
+
+        vectors = {**cached, **computed}
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[text] for text in texts])
+
+    @property
+    def supports_embeddings(self) -> bool:
+        """Whether the provider implements ``_embed_batch``"""
+        return type(self)._embed_batch is not LLMProvider._embed_batch
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch of at most ``embedding_batch_size`` texts.
+
+        Providers that support embeddings override this; ``embed_many``
+        checks ``supports_embeddings`` before calling it.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support embeddings")
+
+    async def generate_many(
+        self,
+        prompts: Sequence[str],
+        contexts: Optional[Sequence[Optional[List[str]]]] = None,
+        concurrency: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+        retry_delay: float = 1.0,
+        expected_output_tokens: int = 512,
+    ) -> AsyncIterator[Tuple[int, Union[LLMResponse, Exception]]]:
+        """Generate responses for many prompts concurrently.
+
+        ``concurrency`` workers take prompts in order and yield
+        ``(index, response)`` pairs as calls complete. A prompt that still
+        fails after ``max_retries`` retries, or with a non-retryable error,
+        yields ``(index, exception)`` instead of stopping the batch. Workers
+        pause once ``concurrency`` results are waiting, so a slow consumer
+        holds back new requests.
+
+        Args:
+            prompts: Prompts to generate responses for
+            contexts: Optional context per prompt, aligned with prompts
+            concurrency: Maximum number of requests in flight
+            rate_limiter: Optional requests/min and tokens/min budget
+            max_retries: Retries per prompt on ``retryable_errors``
+            retry_delay: Base delay in seconds of the jittered exponential backoff
+            expected_output_tokens: Output tokens budgeted per request up front
+        """
+        if contexts is not None and len(contexts) != len(prompts):
+            raise ValueError("contexts must have one entry per prompt")
+
+        results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        jobs = iter(enumerate(prompts))
+
+        async def worker() -> None:
+            for index, prompt in jobs:
+                context = contexts[index] if contexts is not None else None
+                try:
+                    result = await self._generate_with_retry(
+                        prompt,
+                        context,
+                        rate_limiter,
+                        max_retries,
+                        retry_delay,
+                        expected_output_tokens,
+                    )
+                except Exception as e:
+                    result = e
+                await results.put((index, result))
+
+        workers = [
+            asyncio.create_task(worker()) for _ in range(min(concurrency, len(prompts)))
+        ]
+        try:
+            for _ in range(len(prompts)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _generate_with_retry(
+        self,
+        prompt: str,
+        context: Optional[List[str]],
+        rate_limiter: Optional[RateLimiter],
+        max_retries: int,
+        retry_delay: float,
+        expected_output_tokens: int,
+    ) -> LLMResponse:
+        estimate = (
+            estimate_tokens(self._build_prompt(prompt, context))
+            + expected_output_tokens
+        )
+        for attempt in range(max_retries + 1):
+            if rate_limiter is not None:
+                await rate_limiter.acquire(estimate)
+            try:
+                response = await self.generate(prompt, context)
+            except self.retryable_errors:
+                if attempt == max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, base=retry_delay))
+                continue
+
+            if rate_limiter is not None:
+                usage = response.usage or {}
+                rate_limiter.record(estimate, usage.get("total_tokens"))
+            return response
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.cache import DiskCache
+
+from .base import LLMProvider, LLMResponse
+from .tokenizer import Tokenizer
+
+
+def response_key(model: str, prompt: str, params: Optional[Dict[str, Any]]) -> str:
+    """Cache key of a response: model, final prompt and generation parameters."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "params": params or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier LLM response cache: an in-memory LRU in front of a SQLite file.
+
+    Entries expire ``ttl`` seconds after they were stored in either tier.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        persist: bool = True,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 10_000,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Initialize ResponseCache.
+
+        Args:
+            path: SQLite file for the disk tier. Defaults to ~/.running_coach/cache
+            persist: Set to False to keep the cache in memory only
+            max_memory_entries: Maximum entries in the in-memory tier
+            max_disk_entries: Maximum entries in the disk tier
+            ttl: Seconds before an entry expires. None keeps entries until evicted
+            clock: Time source, injectable for tests
+        """
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self._clock = clock
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._disk: Optional[DiskCache] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if persist:
+            path = path or Path.home() / ".running_coach" / "cache" / "responses.sqlite"
+            self._disk = DiskCache(path, max_disk_entries, ttl=ttl, clock=clock)
+            # One thread keeps SQLite off the event loop and its calls in order
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="response-cache"
+            )
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def _remember(self, key: str, stored_at: float, entry: Dict[str, Any]) -> None:
+        self._memory[key] = (stored_at, entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self._memory.get(key)
+        if cached is not None:
+            stored_at, entry = cached
+            if self.ttl is None or self._clock() - stored_at <= self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+            del self._memory[key]
+        return None
+
+    def _from_disk(self, key: str, value: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            self.misses += 1
+            return None
+        entry = json.loads(value)
+        self._remember(key, entry.pop("stored_at"), entry)
+        self.disk_hits += 1
+        return entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached ``{"content", "usage"}`` entry for a key, or None."""
+        entry = self._from_memory(key)
+        if entry is not None:
+            return entry
+        return self._from_disk(key, self._disk.get(key) if self._disk else None)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """``get`` that reads the disk tier off the event loop"""
+        entry = self._from_memory(key)
+        if entry is not None:
+            return entry
+        value = None
+        if self._disk is not None:
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(self._executor, self._disk.get, key)
+        return self._from_disk(key, value)
+
+    def _entry(self, key: str, content: str, usage: Optional[Dict[str, int]]) -> bytes:
+        """Remember an entry in memory and serialize it for the disk tier"""
+        now = self._clock()
+        entry = {"content": content, "usage": usage}
+        self._remember(key, now, entry)
+        return json.dumps({**entry, "stored_at": now}).encode()
+
+    def set(self, key: str, content: str, usage: Optional[Dict[str, int]]) -> None:
+        value = self._entry(key, content, usage)
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    async def aset(
+        self, key: str, content: str, usage: Optional[Dict[str, int]]
+    ) -> None:
+        """``set`` that writes the disk tier off the event loop"""
+        value = self._entry(key, content, usage)
+        if self._disk is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._disk.set, key, value)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def close(self) -> None:
+        """Finish pending disk work and close the disk tier"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self._disk is not None:
+            self._disk.close()
+
+
+class CachedProvider(LLMProvider):
+    """Wrap any LLMProvider with a response cache.
+
+    Keys cover the provider's model, the final prompt built from prompt and
+    context, and its generation parameters. ``stream`` replays cached
+    responses as chunks, so callers see the same interface on hits and misses.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        cache: Optional[ResponseCache] = None,
+        chunk_size: int = 64,
+    ):
+        """Initialize CachedProvider.
+
+        Args:
+            provider: Provider that answers cache misses
+            cache: Response cache. Defaults to a ResponseCache with default settings
+            chunk_size: Approximate characters per chunk when replaying a stream
+        """
+        self.provider = provider
+        self.cache = cache or ResponseCache()
+        self.chunk_size = chunk_size
+        self.model_name = provider.model_name
+        self.generation_config = provider.generation_config
+        self.retryable_errors = provider.retryable_errors
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        return self.provider.tokenizer
+
+    @property
+    def supports_embeddings(self) -> bool:
+        return self.provider.supports_embeddings
+
+    def _key(self, prompt: str, context: Optional[List[str]]) -> str:
+        return response_key(
+            self.provider.model_name,
+            self.provider._build_prompt(prompt, context),
+            self.provider.generation_config,
+        )
+
+    def _build_prompt(self, prompt: str, context: Optional[List[str]] = None) -> str:
+        return self.provider._build_prompt(prompt, context)
+
+    async def generate(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> LLMResponse:
+        """Return a cached response or generate and cache a new one"""
+        key = self._key(prompt, context)
+        entry = await self.cache.aget(key)
+        if entry is not None:
+            return LLMResponse(content=entry["content"], usage=entry["usage"])
+
+        response = await self.provider.generate(prompt, context)
+        await self.cache.aset(key, response.content, response.usage)
+        return response
+
+    async def stream(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        """Replay a cached response as chunks or stream and cache a new one"""
+        key = self._key(prompt, context)
+        entry = await self.cache.aget(key)
+        if entry is not None:
+            for chunk in self._chunks(entry["content"]):
+                yield chunk
+            return
+
+        chunks = []
+        async for chunk in self.provider.stream(prompt, context):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete responses are cached; an abandoned stream never gets here
+        await self.cache.aset(key, "".join(chunks), None)
+
+    def _chunks(self, content: str) -> List[str]:
+        """Split content into chunks of about ``chunk_size`` characters on spaces."""
+        chunks = []
+        start = 0
+        while start < len(content):
+            end = start + self.chunk_size
+            if end < len(content):
+                space = content.find(" ", end)
+                end = len(content) if space == -1 else space + 1
+            chunks.append(content[start:end])
+            start = end
+        return chunks
+
+    async def embed_many(self, texts: List[str]) -> np.ndarray:
+        return await self.provider.embed_many(texts)
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .tokenizer import Tokenizer
+
+if TYPE_CHECKING:
+    from data.vector_store.base import VectorRecord
+
+
+@dataclass
+class ContextItem:
+    """A piece of prompt context with its relevance to the query.
+
+    Higher scores are more relevant. ``embedding`` is only needed for MMR.
+    """
+
+    text: str
+    score: float = 0.0
+    embedding: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_record(
+        cls, record: "VectorRecord", text_field: str = "text"
+    ) -> "ContextItem":
+        """Build an item from a search result, scoring it by negated distance"""
+        return cls(
+            text=record.metadata[text_field],
+            score=-record.distance if record.distance is not None else 0.0,
+            embedding=record.embedding,
+        )
+
+
+def as_items(context: Sequence[Union[str, ContextItem]]) -> List[ContextItem]:
+    """Normalize context to items. Plain strings keep their order as relevance."""
+    return [
+        item if isinstance(item, ContextItem) else ContextItem(item, score=-i)
+        for i, item in enumerate(context)
+    ]
+
+
+def pack_context(
+    items: Sequence[ContextItem],
+    max_tokens: int,
+    tokenizer: Tokenizer,
+    mmr_lambda: Optional[float] = None,
+) -> Tuple[List[ContextItem], int]:
+    """Choose the context items that fit ``max_tokens``, most relevant first.
+
+    Items are taken greedily by score; an item that does not fit is skipped
+    rather than ending the fill, so smaller items further down still use the
+    remaining budget. With ``mmr_lambda`` set, items are instead picked by
+    maximal marginal relevance: ``mmr_lambda`` weighs relevance against cosine
+    similarity to the items already chosen (1.0 is pure relevance).
+
+    Returns:
+        The chosen items in selection order and the tokens they use
+    """
+    if not items:
+        return [], 0
+    counts = np.array(tokenizer.count_many([item.text for item in items]))
+    fits = counts <= max_tokens
+    if mmr_lambda is None:
+        order = sorted(range(len(items)), key=lambda i: -items[i].score)
+        chosen, used = [], 0
+        for i in order:
+            if fits[i] and used + counts[i] <= max_tokens:
+                chosen.append(items[i])
+                used += int(counts[i])
+        return chosen, used
+
+    if any(item.embedding is None for item in items):
+        raise ValueError("MMR needs an embedding for every context item")
+    embeddings = np.stack([np.asarray(item.embedding, np.float32) for item in items])
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings / np.where(norms == 0, 1, norms)
+    similarity = embeddings @ embeddings.T
+
+    scores = np.array([item.score for item in items], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread else np.ones_like(scores)
+
+    max_similarity = np.zeros(len(items), dtype=np.float32)
+    available = fits.copy()
+    chosen, used = [], 0
+    while available.any():
+        mmr = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        i = int(np.argmax(np.where(available, mmr, -np.inf)))
+        chosen.append(items[i])
+        used += int(counts[i])
+        max_similarity = np.maximum(max_similarity, similarity[i])
+        available &= counts <= max_tokens - used
+        available[i] = False
+    return chosen, used
@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.cache import DiskCache
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Content address of an embedding: hash of the model name and the text."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent, size-bounded LRU cache of embeddings keyed by model and text.
+
+    ``aget_many`` and ``aset_many`` do the SQLite work on one thread, off the
+    event loop and in call order.
+    """
+
+    def __init__(
+        self, path: Optional[Union[str, Path]] = None, max_entries: int = 100_000
+    ):
+        """Initialize EmbeddingCache.
+
+        Args:
+            path: SQLite file for the cache. Defaults to ~/.running_coach/cache
+            max_entries: Maximum number of cached embeddings
+        """
+        path = path or Path.home() / ".running_coach" / "cache" / "embeddings.sqlite"
+        self._cache = DiskCache(path, max_entries=max_entries)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="embedding-cache"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Cached embeddings for the given texts, keyed by text."""
+        keys = {embedding_key(model, text): text for text in texts}
+        found = self._cache.get_many(keys)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return {
+            keys[key]: np.frombuffer(value, dtype=np.float32)
+            for key, value in found.items()
+        }
+
+    async def aget_many(
+        self, model: str, texts: Iterable[str]
+    ) -> Dict[str, np.ndarray]:
+        """``get_many`` that reads the cache off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_many, model, texts)
+
+    def set_many(self, model: str, items: List[Tuple[str, np.ndarray]]) -> None:
+        self._cache.set_many(
+            [
+                (embedding_key(model, text), np.asarray(vector, np.float32).tobytes())
+                for text, vector in items
+            ]
+        )
+
+    async def aset_many(self, model: str, items: List[Tuple[str, np.ndarray]]) -> None:
+        """``set_many`` that writes the cache off the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.set_many, model, items)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def close(self) -> None:
+        """Finish pending writes and close the cache"""
+        self._executor.shutdown(wait=True)
+        self._cache.close()
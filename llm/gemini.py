@@ -1,55 +1,209 @@
+import asyncio
+import hashlib
 import os
-from typing import AsyncIterator, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
 from google.generativeai.types import GenerateContentResponse
 
+from utils.cache import DiskCache
+from utils.metrics import metrics
+
 from .base import LLMProvider, LLMResponse
+from .embeddings import EmbeddingCache
+from .tokenizer import Tokenizer
 
 
 class GeminiProvider(LLMProvider):
     """Google Gemini implementation"""
 
-    def __init__(self, model: str = "gemini-pro"):
+    # Upper bound of texts per batchEmbedContents request
+    embedding_batch_size = 100
+
+    # Quota and transient server errors
+    retryable_errors = (
+        api_exceptions.ResourceExhausted,
+        api_exceptions.TooManyRequests,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.InternalServerError,
+    )
+
+    def __init__(
+        self,
+        model: str = "gemini-pro",
+        embedding_model: str = "models/text-embedding-004",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ):
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable is not set")
 
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model)
+        self.model_name = model
+        self.generation_config = dict(generation_config or {})
+        self.model = genai.GenerativeModel(
+            model, generation_config=self.generation_config or None
+        )
+        self.embedding_model = embedding_model
+        self.embedding_cache = embedding_cache
+        self._tokenizer: Optional[GeminiTokenizer] = None
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """countTokens of this provider's model, created on first use"""
+        if self._tokenizer is None:
+            self._tokenizer = GeminiTokenizer(self.model_name)
+        return self._tokenizer
 
     async def generate(
         self, prompt: str, context: Optional[List[str]] = None
     ) -> LLMResponse:
         """Generate response using Gemini"""
         full_prompt = self._build_prompt(prompt, context)
-        response: GenerateContentResponse = await self.model.generate_content_async(
-            full_prompt
-        )
+        with metrics.span("llm.generate", model=self.model_name):
+            response: GenerateContentResponse = await self.model.generate_content_async(
+                full_prompt
+            )
 
-        return LLMResponse(content=response.text, raw_response=response, usage=None)
+        usage = self._usage(response)
+        self._count_tokens(usage)
+        return LLMResponse(content=response.text, raw_response=response, usage=usage)
 
     async def stream(
         self, prompt: str, context: Optional[List[str]] = None
     ) -> AsyncIterator[str]:
         """Stream response using Gemini"""
         full_prompt = self._build_prompt(prompt, context)
-        response_stream = await self.model.generate_content_async(
-            full_prompt, stream=True
+        with metrics.span("llm.stream", model=self.model_name):
+            started = time.perf_counter()
+            response_stream = await self.model.generate_content_async(
+                full_prompt, stream=True
+            )
+
+            first = True
+            async for chunk in response_stream:
+                if first:
+                    metrics.observe(
+                        "llm_first_chunk_seconds",
+                        time.perf_counter() - started,
+                        model=self.model_name,
+                    )
+                    first = False
+                if chunk.text:
+                    yield chunk.text
+        self._count_tokens(self._usage(response_stream))
+
+    def _count_tokens(self, usage: Optional[Dict[str, int]]) -> None:
+        if usage:
+            metrics.inc(
+                "llm_tokens_total",
+                usage["prompt_tokens"] or 0,
+                model=self.model_name,
+                kind="prompt",
+            )
+            metrics.inc(
+                "llm_tokens_total",
+                usage["completion_tokens"] or 0,
+                model=self.model_name,
+                kind="completion",
+            )
+
+    @staticmethod
+    def _usage(response: GenerateContentResponse) -> Optional[Dict[str, int]]:
+        """Token counts reported by Gemini for a response"""
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is None:
+            return None
+        return {
+            "prompt_tokens": metadata.prompt_token_count,
+            "completion_tokens": metadata.candidates_token_count,
+            "total_tokens": metadata.total_token_count,
+        }
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts with a single Gemini request"""
+        result = await genai.embed_content_async(
+            model=self.embedding_model,
+            content=texts,
+            task_type="retrieval_document",
+        )
+        return result["embedding"]
+
+
+class GeminiTokenizer(Tokenizer):
+    """Exact token counts from Gemini's countTokens API, cached on disk.
+
+    countTokens answers for a whole request, so each distinct uncached text
+    costs one call; the calls of a batch run ``concurrency`` at a time, and
+    later counts come from the cache, so recurring context items are free
+    after the first run. ``acount_many`` does the lookups and calls in a
+    thread, so async callers never block their event loop on them.
+    """
+
+    def __init__(
+        self,
+        model: str = "gemini-pro",
+        cache_path: Optional[Union[str, Path]] = None,
+        max_entries: int = 100_000,
+        concurrency: int = 8,
+    ):
+        """Initialize GeminiTokenizer.
+
+        Args:
+            model: Model whose tokenizer to use
+            cache_path: SQLite file for counts. Defaults to ~/.running_coach/cache
+            max_entries: Maximum number of cached counts
+            concurrency: Maximum number of countTokens calls in flight
+        """
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is not set")
+
+        genai.configure(api_key=api_key)
+        self.model_name = model
+        self.model = genai.GenerativeModel(model)
+        cache_path = cache_path or (
+            Path.home() / ".running_coach" / "cache" / "tokens.sqlite"
         )
+        self._cache = DiskCache(cache_path, max_entries=max_entries)
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="gemini-tokens"
+        )
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
 
-        async for chunk in response_stream:
-            if chunk.text:
-                yield chunk.text
+    def count_many(self, texts: List[str]) -> List[int]:
+        keys = [self._key(text) for text in texts]
+        cached = {key: int(value) for key, value in self._cache.get_many(keys).items()}
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            with metrics.span("llm.count_tokens", model=self.model_name):
+                counts = list(self._executor.map(self._count_tokens, missing.values()))
+            computed = dict(zip(missing, counts))
+            self._cache.set_many(
+                [(key, str(count).encode()) for key, count in computed.items()]
+            )
+            cached.update(computed)
+        return [cached[key] for key in keys]
 
-    def _build_prompt(self, prompt: str, context: Optional[List[str]] = None) -> str:
-        """Build full prompt with context"""
-        if not context:
-            return prompt
+    async def acount_many(self, texts: List[str]) -> List[int]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.count_many, texts)
 
-        context_str = "\n".join(context)
-        return f"""Context:
-{context_str}
+    def _count_tokens(self, text: str) -> int:
+        return self.model.count_tokens(text).total_tokens
 
-Based on the above context, please respond to:
-{prompt}"""
+    def close(self) -> None:
+        """Finish pending calls and close the cache"""
+        self._executor.shutdown(wait=True)
+        self._cache.close()
@@ -1,4 +1,5 @@
 from .templates.analysis import WORKOUT_ANALYSIS
 from .templates.planning import TRAINING_PLAN
+from .utils import ContextInjector, PromptTemplate
 
-__all__ = ["WORKOUT_ANALYSIS", "TRAINING_PLAN"]
+__all__ = ["WORKOUT_ANALYSIS", "TRAINING_PLAN", "ContextInjector", "PromptTemplate"]
@@ -1,8 +1,11 @@
 from ..utils import PromptTemplate
 
 WORKOUT_ANALYSIS = PromptTemplate(
-    template="""Workout data: {workout_data}
-User's goal: {user_goal}{context}
+    template="""Analyze this workout and provide actionable insights.
 
-Analyze this workout and provide actionable insights."""
+User's goal: {user_goal}
+{context}
+Workout data: {workout_data}""",
+    input_variables=["user_goal", "context", "workout_data"],
+    defaults={"context": ""},
 )
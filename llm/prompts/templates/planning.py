@@ -1,7 +1,11 @@
 from ..utils import PromptTemplate
 
 TRAINING_PLAN = PromptTemplate(
-    template="""Based on user's goal: {user_goal}{context}
+    template="""Generate a realistic training plan and explain key points.
 
-Generate a realistic training plan and explain key points."""
+User's goal: {user_goal}
+{training_load}
+{context}""",
+    input_variables=["user_goal", "training_load", "context"],
+    defaults={"training_load": "", "context": ""},
 )
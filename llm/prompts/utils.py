@@ -1,43 +1,170 @@
-from typing import Dict, List, Optional
+import string
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
-import google.generativeai as genai
+from utils.metrics import metrics
 
+from ..tokenizer import MemoizedTokenizer, RegexTokenizer, Tokenizer
 
-class ContextInjector:
-    MAX_TOKENS = 30720  # Gemini's context window
+if TYPE_CHECKING:
+    from ..context import ContextItem
+
+
+class PromptTemplate:
+    """Prompt template with named placeholders, validated when it is defined.
+
+    Placeholders must be plain names, and ``input_variables``, if given, must
+    match them exactly. Lay templates out with the static instructions first
+    and the per-call data last, so every rendered prompt starts with the same
+    ``prefix`` for providers and caches to reuse.
+    """
+
+    def __init__(
+        self,
+        template: str,
+        input_variables: Optional[Iterable[str]] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+    ):
+        """Initialize PromptTemplate.
 
-    def __init__(self, template: str):
+        Args:
+            template: Template text with ``{name}`` placeholders
+            input_variables: Optional list of expected placeholder names
+            defaults: Values for placeholders that may be omitted when rendering
+        """
         self.template = template
-        self.token_count = 0
+        fields: List[str] = []
+        literals: List[str] = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if not fields:
+                literals.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise ValueError(
+                    f"Template placeholders must be plain names, got {{{field}}}"
+                )
+            if spec and "{" in spec:
+                raise ValueError(f"Nested placeholder in format spec of {field}")
+            if conversion not in (None, "r", "s", "a"):
+                raise ValueError(f"Unknown conversion !{conversion} of {field}")
+            fields.append(field)
+        # Static text before the first field, shared by every rendering
+        self.prefix = "".join(literals)
+
+        self.variables = tuple(dict.fromkeys(fields))
+        if input_variables is not None and set(input_variables) != set(self.variables):
+            raise ValueError(
+                f"Template placeholders {sorted(self.variables)} do not match "
+                f"input_variables {sorted(input_variables)}"
+            )
+        self.defaults = dict(defaults or {})
+        unknown = set(self.defaults) - set(self.variables)
+        if unknown:
+            raise ValueError(f"Defaults for unknown variables: {sorted(unknown)}")
+        self.required = tuple(v for v in self.variables if v not in self.defaults)
+
+    def format(self, **kwargs: Any) -> str:
+        """Render the template. Variables it does not use are ignored"""
+        # str.format_map re-parses the template in C, which for prompt-sized
+        # templates is faster than joining pre-parsed segments in Python.
+        # Defaults are only merged in when a variable is actually missing.
+        try:
+            return self.template.format_map(kwargs)
+        except KeyError:
+            pass
+        missing = [name for name in self.required if name not in kwargs]
+        if missing:
+            raise KeyError(f"Missing template variables: {', '.join(missing)}")
+        return self.template.format_map({**self.defaults, **kwargs})
 
-    def _count_tokens(self, text: str) -> int:
-        # Simple token counting for Gemini
-        return len(text.split())
+    def __repr__(self) -> str:
+        return f"PromptTemplate(variables={list(self.variables)!r})"
 
-    def _truncate_context(self, context: List[str], max_tokens: int) -> List[str]:
-        truncated = []
-        current_tokens = 0
 
-        for item in context:
-            tokens = self._count_tokens(item)
-            if current_tokens + tokens <= max_tokens:
-                truncated.append(item)
-                current_tokens += tokens
-            else:
-                break
+class ContextInjector:
+    MAX_TOKENS = 30720  # Gemini's context window
+
+    def __init__(
+        self,
+        template: Union[str, PromptTemplate],
+        tokenizer: Optional[Tokenizer] = None,
+        mmr_lambda: Optional[float] = None,
+    ):
+        """Initialize ContextInjector.
 
-        return truncated
+        Args:
+            template: Prompt template with a ``{context}`` field
+            tokenizer: Token counter, e.g. ``provider.tokenizer`` for the
+                model's real counts. Defaults to the offline RegexTokenizer
+            mmr_lambda: Diversify context with MMR when set (1.0 is pure relevance)
+        """
+        self.template = (
+            template
+            if isinstance(template, PromptTemplate)
+            else PromptTemplate(template)
+        )
+        self.tokenizer = MemoizedTokenizer(tokenizer or RegexTokenizer())
+        self.mmr_lambda = mmr_lambda
+        self.token_count = 0
 
     def inject(
-        self, context: List[str], variables: Optional[Dict[str, str]] = None
+        self,
+        context: Sequence[Union[str, "ContextItem"]],
+        variables: Optional[Dict[str, str]] = None,
     ) -> str:
-        max_context_tokens = int(self.MAX_TOKENS * 0.8)
+        """Render the template with the most relevant context that fits.
 
-        truncated_context = self._truncate_context(context, max_context_tokens)
+        Context is either plain strings, most relevant first, or ContextItems
+        carrying a relevance score, e.g. built from vector search results.
+        From async code use ``ainject``, which counts tokens without blocking
+        the event loop.
+        """
+        # Context packing needs NumPy, which templates alone should not load
+        from ..context import as_items
+
+        return self._inject(as_items(context), variables)
+
+    async def ainject(
+        self,
+        context: Sequence[Union[str, "ContextItem"]],
+        variables: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """``inject`` for async code.
 
-        context_str = "\n".join(truncated_context)
+        Uncached items are counted in one ``acount_many`` call first, so
+        packing only reads the memoized counts.
+        """
+        from ..context import as_items
+
+        items = as_items(context)
+        await self.tokenizer.acount_many([item.text for item in items])
+        return self._inject(items, variables)
+
+    def _inject(
+        self, items: List["ContextItem"], variables: Optional[Dict[str, str]]
+    ) -> str:
+        from ..context import pack_context
+
+        max_context_tokens = int(self.MAX_TOKENS * 0.8)
+        with metrics.span("prompt.inject"):
+            packed, self.token_count = pack_context(
+                items, max_context_tokens, self.tokenizer, self.mmr_lambda
+            )
+            context_str = "\n".join(item.text for item in packed)
 
-        variables = variables or {}
-        variables["context"] = context_str
+            variables = dict(variables or {})
+            variables["context"] = context_str
 
-        return self.template.format(**variables)
+            prompt = self.template.format(**variables)
+        metrics.inc("prompt_context_tokens_total", self.token_count)
+        metrics.inc("prompt_context_items_total", len(packed))
+        return prompt
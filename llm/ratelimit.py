@@ -0,0 +1,121 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``.
+
+    ``acquire`` waits until enough tokens are available. Callers that only
+    know the true cost afterwards can ``adjust`` the bucket, which may leave
+    it in debt and delay later acquisitions.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """Initialize TokenBucket.
+
+        Args:
+            rate_per_minute: Tokens added per minute
+            capacity: Maximum burst size. Defaults to one minute of tokens
+            clock: Monotonic time source, injectable for tests
+            sleep: Async sleep function, injectable for tests
+        """
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait for and take ``amount`` tokens (capped at the bucket capacity)."""
+        amount = min(amount, self.capacity)
+        # The lock keeps waiters first-come, first-served
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await self._sleep((amount - self._tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Take (positive) or return (negative) tokens without waiting."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for LLM calls."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """Initialize RateLimiter.
+
+        Args:
+            requests_per_minute: Optional request quota
+            tokens_per_minute: Optional token quota (prompt plus output tokens)
+            clock: Monotonic time source, injectable for tests
+            sleep: Async sleep function, injectable for tests
+        """
+        self.requests = (
+            TokenBucket(requests_per_minute, clock=clock, sleep=sleep)
+            if requests_per_minute
+            else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, clock=clock, sleep=sleep)
+            if tokens_per_minute
+            else None
+        )
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until one request with ``estimated_tokens`` fits both budgets."""
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(estimated_tokens)
+
+    def record(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token budget once the real usage of a call is known."""
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used to budget a request before it is sent."""
+    return len(text) // 4 + 1
+
+
+def backoff_delay(
+    attempt: int, base: float = 1.0, cap: float = 60.0, rng: random.Random = random
+) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return rng.uniform(0, min(cap, base * 2**attempt))
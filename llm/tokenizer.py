@@ -0,0 +1,89 @@
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+
+class Tokenizer(ABC):
+    """Counts the tokens a model sees for a piece of text"""
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        pass
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        return [self.count(text) for text in texts]
+
+    async def acount_many(self, texts: List[str]) -> List[int]:
+        """Count texts from async code.
+
+        Tokenizers that call an API override this to keep the calls off the
+        event loop.
+        """
+        return self.count_many(texts)
+
+
+class RegexTokenizer(Tokenizer):
+    """Offline estimate of SentencePiece token counts.
+
+    Gemini's tokenizer splits numbers into single digits and punctuation into
+    separate tokens, which matters for workout data full of paces, distances
+    and heart rates. Words count one token per seven letters. The estimate
+    is meant to err on the high side; ``benchmarks.context_packing`` checks
+    it against Gemini's real counts.
+    """
+
+    _PIECES = re.compile(r"\d|[^\W\d_]+|[^\w\s]|_|\n")
+
+    def count(self, text: str) -> int:
+        tokens = 0
+        for piece in self._PIECES.findall(text):
+            tokens += math.ceil(len(piece) / 7) if piece[0].isalpha() else 1
+        return tokens
+
+
+class MemoizedTokenizer(Tokenizer):
+    """In-memory LRU of token counts in front of another tokenizer"""
+
+    def __init__(self, tokenizer: Tokenizer, max_entries: int = 4096):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Count texts, passing only the uncached ones to the wrapped tokenizer"""
+        known, missing = self._known(texts)
+        if missing:
+            known.update(zip(missing, self.tokenizer.count_many(missing)))
+        return self._remember(texts, known)
+
+    async def acount_many(self, texts: List[str]) -> List[int]:
+        # Hits are read before awaiting, so a concurrent call evicting them
+        # meanwhile does not lose their counts
+        known, missing = self._known(texts)
+        if missing:
+            known.update(zip(missing, await self.tokenizer.acount_many(missing)))
+        return self._remember(texts, known)
+
+    def _known(self, texts: List[str]) -> Tuple[Dict[str, int], List[str]]:
+        """Cached counts of texts, and the distinct texts not cached"""
+        known = {text: self._counts[text] for text in texts if text in self._counts}
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return known, missing
+
+    def _remember(self, texts: List[str], known: Dict[str, int]) -> List[int]:
+        for text in texts:
+            self._counts[text] = known[text]
+            self._counts.move_to_end(text)
+        while len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return [known[text] for text in texts]
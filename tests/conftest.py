@@ -0,0 +1,142 @@
+import calendar
+import hashlib
+import time
+from typing import AsyncIterator, List, Optional
+
+import httpx
+import numpy as np
+import pytest
+
+from llm.base import LLMProvider, LLMResponse
+
+
+class LocalProvider(LLMProvider):
+    """Deterministic, offline stand-in for an LLM provider.
+
+    Embeddings are derived from a hash of the text, and responses echo the
+    prompt. Every call is recorded so tests can count API round trips.
+    """
+
+    embedding_model = "local-embedding"
+
+    def __init__(self, dim: int = 8, embedding_batch_size: int = 100, **kwargs):
+        self.dim = dim
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_cache = kwargs.get("embedding_cache")
+        self.embed_calls: List[List[str]] = []
+        self.prompts: List[str] = []
+
+    async def generate(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> LLMResponse:
+        self.prompts.append(prompt)
+        return LLMResponse(content=f"response to: {prompt}")
+
+    async def stream(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        response = await self.generate(prompt, context)
+        for word in response.content.split(" "):
+            yield word + " "
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        self.embed_calls.append(list(texts))
+        return [self.vector(text) for text in texts]
+
+    def vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).normal(size=self.dim).astype(np.float32)
+
+
+@pytest.fixture
+def local_provider():
+    return LocalProvider()
+
+
+class MockStrava:
+    """In-process Strava API serving activity listings and details.
+
+    Use ``transport`` with StravaClient. Requests are recorded, and listings
+    honour ``after``, ``page`` and ``per_page`` like the real API.
+    """
+
+    def __init__(
+        self, activities=None, short_limit: int = 600, daily_limit: int = 30000
+    ):
+        self.activities = list(activities or [])
+        self.limits = (short_limit, daily_limit)
+        self.requests = []
+        self.failing_ids = set()
+        self.throttle_next = 0
+
+    def add_activity(self, activity_id: int, start: int) -> None:
+        started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start))
+        self.activities.append(
+            {
+                "id": activity_id,
+                "type": "Run",
+                "start_date": started,
+                "athlete": {"id": 1},
+            }
+        )
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        headers = {
+            "X-RateLimit-Limit": f"{self.limits[0]},{self.limits[1]}",
+            "X-RateLimit-Usage": f"{len(self.requests)},{len(self.requests)}",
+        }
+        if self.throttle_next:
+            self.throttle_next -= 1
+            return httpx.Response(429, headers=headers, json={"message": "Rate Limit"})
+
+        path = request.url.path
+        if path.endswith("/athlete/activities"):
+            params = request.url.params
+            after = int(params.get("after", 0))
+            page, per_page = int(params["page"]), int(params["per_page"])
+            matching = sorted(
+                (a for a in self.activities if _epoch(a["start_date"]) > after),
+                key=lambda a: a["start_date"],
+            )
+            start = (page - 1) * per_page
+            return httpx.Response(
+                200, headers=headers, json=matching[start : start + per_page]
+            )
+
+        if path.endswith("/streams"):
+            activity_id = int(path.rsplit("/", 2)[1])
+            keys = request.url.params["keys"].split(",")
+            streams = {
+                "time": {"data": list(range(0, 600, 2))},
+                "distance": {"data": list(range(0, 1800, 6))},
+                "heartrate": {"data": [140 + activity_id] * 300},
+            }
+            return httpx.Response(
+                200,
+                headers=headers,
+                json={key: streams[key] for key in keys if key in streams},
+            )
+
+        activity_id = int(path.rsplit("/", 1)[1])
+        if activity_id in self.failing_ids:
+            return httpx.Response(500, headers=headers, json={"message": "Error"})
+        for activity in self.activities:
+            if activity["id"] == activity_id:
+                return httpx.Response(
+                    200, headers=headers, json={**activity, "detailed": True}
+                )
+        return httpx.Response(404, headers=headers, json={"message": "Not Found"})
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._handle)
+
+
+def _epoch(start_date: str) -> int:
+    return calendar.timegm(time.strptime(start_date, "%Y-%m-%dT%H:%M:%SZ"))
+
+
+@pytest.fixture
+def mock_strava():
+    return MockStrava()
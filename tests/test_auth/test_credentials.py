@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from auth.credentials import CredentialStore, StravaCredentials
+
+
+class TokenEndpoint:
+    """Strava token endpoint that counts refreshes and issues new tokens"""
+
+    def __init__(self, status_code: int = 200, delay: float = 0.0):
+        self.status_code = status_code
+        self.delay = delay
+        self.refreshes = []
+        self._lock = threading.Lock()
+
+    def refresh(self, refresh_token: str):
+        time.sleep(self.delay)
+        with self._lock:
+            self.refreshes.append(refresh_token)
+            n = len(self.refreshes)
+        return {
+            "access_token": f"access-{n}",
+            "refresh_token": f"refresh-{n}",
+            "expires_at": int(time.time()) + 6 * 3600,
+        }
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, text="invalid refresh token")
+        data = dict(httpx.QueryParams(request.content.decode()))
+        return httpx.Response(200, json=self.refresh(data["refresh_token"]))
+
+
+def make_store(path, endpoint=None) -> CredentialStore:
+    transport = endpoint and httpx.MockTransport(endpoint.handle)
+    return CredentialStore(path, "client", "secret", transport=transport)
+
+
+def save_expiring(store: CredentialStore) -> None:
+    store.save_strava_credentials(
+        StravaCredentials("access-0", "refresh-0", int(time.time()) + 60)
+    )
+
+
+def test_credentials_are_decrypted_once_until_the_file_changes(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.save_strava_credentials(StravaCredentials("a", "r", 2_000_000_000))
+    decrypts = []
+    decrypt = store.fernet.decrypt
+    monkeypatch.setattr(
+        store.fernet, "decrypt", lambda token: decrypts.append(1) or decrypt(token)
+    )
+
+    assert store.get_valid_token() == ("a", None)
+    assert store.get_valid_token() == ("a", None)
+    assert decrypts == []
+
+    other = make_store(tmp_path)
+    other.save_strava_credentials(StravaCredentials("b", "r", 2_000_000_000))
+    assert store.get_valid_token() == ("b", None)
+    assert store.get_valid_token() == ("b", None)
+    assert decrypts == [1]
+
+
+@pytest.mark.asyncio
+async def test_async_refresh_is_single_flight(tmp_path):
+    endpoint = TokenEndpoint()
+    store = make_store(tmp_path, endpoint)
+    save_expiring(store)
+
+    results = await asyncio.gather(*(store.aget_valid_token() for _ in range(20)))
+
+    assert endpoint.refreshes == ["refresh-0"]
+    assert set(results) == {("access-1", None)}
+    assert make_store(tmp_path).load_strava_credentials().refresh_token == "refresh-1"
+
+
+def test_refresh_is_coordinated_across_stores(tmp_path, monkeypatch):
+    endpoint = TokenEndpoint(delay=0.05)
+
+    def post(url, data):
+        return httpx.Response(200, json=endpoint.refresh(data["refresh_token"]))
+
+    monkeypatch.setattr("auth.credentials.requests.post", post)
+    stores = [make_store(tmp_path) for _ in range(4)]
+    save_expiring(stores[0])
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: stores[i % 4].get_valid_token(), range(8)))
+
+    assert endpoint.refreshes == ["refresh-0"]
+    assert set(results) == {("access-1", None)}
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_returns_error(tmp_path):
+    store = make_store(tmp_path, TokenEndpoint(status_code=400))
+    assert await store.aget_valid_token() == (None, "No credentials found")
+
+    save_expiring(store)
+    token, error = await store.aget_valid_token()
+
+    assert token is None
+    assert "invalid refresh token" in error
+    assert store.load_strava_credentials().refresh_token == "refresh-0"
@@ -0,0 +1,81 @@
+import httpx
+import pytest
+
+from auth.strava import StravaClient, StravaRateLimiter
+
+
+class FakeTime:
+    def __init__(self, now: float):
+        self.now = now
+        self.sleeps = []
+
+    def clock(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.mark.asyncio
+async def test_limiter_waits_for_the_next_quarter_hour():
+    time = FakeTime(900 * 1000 + 100)
+    limiter = StravaRateLimiter(short_limit=2, clock=time.clock, sleep=time.sleep)
+
+    await limiter.acquire()
+    await limiter.acquire()
+    assert time.sleeps == []
+
+    await limiter.acquire()
+    assert time.sleeps == [800]
+    assert limiter.usage == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_limiter_waits_for_midnight_when_daily_limit_is_spent():
+    time = FakeTime(86400 * 100 + 3600)
+    limiter = StravaRateLimiter(clock=time.clock, sleep=time.sleep)
+    limiter.update(
+        httpx.Headers(
+            {"X-RateLimit-Limit": "600,30000", "X-RateLimit-Usage": "10,30000"}
+        )
+    )
+
+    await limiter.acquire()
+    assert time.sleeps == [86400 - 3600]
+
+
+def test_limiter_prefers_read_limits_and_never_lowers_usage():
+    limiter = StravaRateLimiter()
+    limiter.usage = [5, 5]
+    limiter.update(
+        httpx.Headers(
+            {
+                "X-RateLimit-Limit": "600,30000",
+                "X-RateLimit-Usage": "1,1",
+                "X-ReadRateLimit-Limit": "300,3000",
+                "X-ReadRateLimit-Usage": "2,40",
+            }
+        )
+    )
+
+    assert limiter.limits == [300, 3000]
+    assert limiter.usage == [5, 40]
+
+
+@pytest.mark.asyncio
+async def test_client_waits_out_429_responses(mock_strava):
+    time = FakeTime(900 * 1000)
+    mock_strava.add_activity(1, 1_700_000_000)
+    mock_strava.throttle_next = 1
+    limiter = StravaRateLimiter(clock=time.clock, sleep=time.sleep)
+
+    async with StravaClient(
+        "token", rate_limiter=limiter, transport=mock_strava.transport
+    ) as client:
+        activity = await client.get_activity(1)
+
+    assert activity["id"] == 1
+    assert client.requests_made == 2
+    assert time.sleeps == [900]
+    assert mock_strava.requests[0].headers["Authorization"] == "Bearer token"
@@ -0,0 +1,44 @@
+import json
+from dataclasses import replace
+
+from benchmarks import suite
+
+
+def result(name, p50, scale=1000):
+    return suite.Result(name, scale, "ms", p50, p50, p50, 10)
+
+
+def test_compare_flags_only_meaningful_regressions():
+    baseline = [result("search", 1.0), result("render", 0.01), result("add", 5.0)]
+    current = [
+        result("search", 1.5),  # +50%
+        result("render", 0.03),  # +200%, but only 0.02ms
+        result("add", 5.5),  # +10%
+        result("search", 9.0, scale=100_000),  # No baseline at this scale
+    ]
+
+    regressions = suite.compare(current, baseline, threshold=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("search at 1,000")
+
+
+def test_suite_writes_results_and_gates_on_baseline(tmp_path):
+    output = tmp_path / "results.json"
+    args = ["--scales", "300", "--stores", "numpy,segments", "--queries", "5"]
+
+    assert suite.main(args + ["--output", str(output)]) == 0
+
+    results = suite.load_results(output)
+    names = {r.name for r in results}
+    assert {"numpy.search_filtered", "segments.add_many", "inject", "render"} <= names
+    assert all(r.scale == 300 and r.p50 > 0 for r in results)
+
+    faster = tmp_path / "baseline.json"
+    data = json.loads(output.read_text())
+    data["results"] = [{**r, "p50": r["p50"] / 1000} for r in data["results"]]
+    faster.write_text(json.dumps(data))
+    slower = [replace(r, p50=r.p50 * 1000) for r in results]
+
+    assert suite.main(args + ["--baseline", str(faster)]) == 1
+    assert suite.compare(results, slower, threshold=0.25) == []
@@ -0,0 +1,113 @@
+import json
+import os
+import socket
+
+import pytest
+
+from cli.daemon import CoachDaemon, DaemonUnavailable, request, run_command
+from cli.service import CoachError, CoachService
+from tests.conftest import LocalProvider
+
+
+@pytest.fixture
+async def daemon(tmp_path):
+    daemon = CoachDaemon(CoachService(tmp_path, provider_factory=LocalProvider))
+    await daemon.start()
+    yield daemon
+    await daemon.close()
+
+
+async def collect(output):
+    return [chunk async for chunk in output]
+
+
+@pytest.mark.asyncio
+async def test_daemon_streams_output_and_keeps_provider_warm(daemon):
+    params = {"race": "marathon", "date": "2025-10-12"}
+
+    first = await collect(request("plan", params, daemon.path))
+    second = await collect(request("plan", params, daemon.path))
+
+    assert first[0] == "Generating plan for marathon on 2025-10-12\n"
+    # The provider's output arrives as separate chunks, not one message
+    assert len(first) > 5
+    assert "User's goal: Race marathon on 2025-10-12" in "".join(first)
+    assert first == second
+    assert len(daemon.service.provider.prompts) == 2
+
+
+@pytest.mark.asyncio
+async def test_daemon_reports_command_errors(daemon, tmp_path):
+    with pytest.raises(CoachError, match="Not a Strava activity ID"):
+        await collect(request("analyze", {"workout_id": "last"}, daemon.path))
+    with pytest.raises(CoachError, match="Unknown command"):
+        await collect(request("race", {}, daemon.path))
+
+    activities = tmp_path / "strava" / "activities"
+    activities.mkdir(parents=True)
+    (activities / "5.json").write_text(json.dumps({"id": 5, "distance": 10000.0}))
+    output = "".join(
+        await collect(request("analyze", {"workout_id": "5"}, daemon.path))
+    )
+    assert '"distance": 10000.0' in output
+
+
+@pytest.mark.asyncio
+async def test_daemon_socket_is_private_from_the_start(tmp_path, monkeypatch):
+    modes = []
+    bind = socket.socket.bind
+
+    def record_mode(sock, path):
+        bind(sock, path)
+        modes.append(os.stat(path).st_mode & 0o777)
+
+    monkeypatch.setattr(socket.socket, "bind", record_mode)
+    umask = os.umask(0o022)
+    try:
+        daemon = CoachDaemon(CoachService(tmp_path, provider_factory=LocalProvider))
+        await daemon.start()
+    finally:
+        os.umask(umask)
+    try:
+        assert modes == [0o700]
+        assert os.stat(daemon.path).st_mode & 0o777 == 0o600
+    finally:
+        await daemon.close()
+
+
+@pytest.mark.asyncio
+async def test_daemon_refuses_to_replace_a_running_daemon(daemon):
+    with pytest.raises(CoachError, match="already listening"):
+        await CoachDaemon(CoachService(daemon.service.home), daemon.path).start()
+
+
+@pytest.mark.asyncio
+async def test_cli_runs_in_process_without_daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr("cli.service.default_provider", LocalProvider)
+    with pytest.raises(DaemonUnavailable):
+        await collect(request("plan", {}, tmp_path / "coach.sock"))
+
+    # A socket file left behind by a daemon that died
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(str(tmp_path / "coach.sock"))
+    stale.close()
+
+    params = {"race": "10k", "date": "2025-05-01"}
+    output = await collect(run_command("plan", params, tmp_path))
+
+    assert output[0] == "Generating plan for 10k on 2025-05-01\n"
+    assert "Race 10k" in "".join(output)
+
+
+@pytest.mark.asyncio
+async def test_cli_uses_running_daemon(daemon, monkeypatch):
+    def no_provider():
+        raise AssertionError("Command ran in process")
+
+    monkeypatch.setattr("cli.service.default_provider", no_provider)
+
+    output = await collect(
+        run_command("plan", {"race": "5k", "date": "2025-06-01"}, daemon.service.home)
+    )
+
+    assert "Race 5k" in "".join(output)
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Cumulative import time of cli.main. It imports in about 50ms with Typer and
+# Rich alone; google.generativeai by itself takes about a second.
+CLI_IMPORT_BUDGET_US = 300_000
+
+HEAVY_MODULES = ("numpy", "google.generativeai", "chromadb", "cryptography")
+
+
+def import_times(statement: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_imports_within_budget():
+    times = import_times("import cli.main")
+
+    assert not [name for name in times if name.startswith(HEAVY_MODULES)]
+    # Take the fastest of a few runs so a busy machine doesn't fail the test
+    fastest = min(
+        [times["cli.main"]]
+        + [import_times("import cli.main")["cli.main"] for _ in range(2)]
+    )
+    assert fastest < CLI_IMPORT_BUDGET_US
+
+
+def test_plan_command_skips_heavy_dependencies():
+    times = import_times("import data.training_load, llm.prompts.templates, cli.main")
+
+    assert not [name for name in times if name.startswith(HEAVY_MODULES)]
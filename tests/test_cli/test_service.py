@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from auth.strava import StravaClient
+from cli.service import CoachService
+from tests.conftest import LocalProvider
+
+DAY = 24 * 3600
+
+
+async def collect(output):
+    return [chunk async for chunk in output]
+
+
+@pytest.mark.asyncio
+async def test_sync_feeds_the_training_load_of_plan(tmp_path, mock_strava):
+    now = int(time.time())
+    for i in range(3):
+        mock_strava.add_activity(i, now - (3 - i) * DAY)
+    service = CoachService(tmp_path, provider_factory=LocalProvider)
+    client = StravaClient("token", transport=mock_strava.transport)
+
+    async def strava():
+        return client
+
+    service.strava = strava
+    output = await collect(service.run("sync", {}))
+    assert output[-1] == "Synced 3 new activities\n"
+
+    params = {"race": "10k", "date": "2025-05-01", "athlete_id": 1}
+    await collect(service.run("plan", params))
+    prompt = service.provider.prompts[-1]
+    assert "fitness (CTL)" in prompt
+    assert "no recorded activities" not in prompt
+    await service.aclose()
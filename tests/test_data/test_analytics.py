@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from data import analytics
+from data.analytics import ActivityBatch, AthleteProfile
+from data.streams import StreamStore
+from llm.prompts.templates import WORKOUT_ANALYSIS
+
+
+def steady_run(seconds: int, speed: float, hr) -> dict:
+    time = np.arange(seconds + 1, dtype=float)
+    return {
+        "time": time,
+        "distance": time * speed,
+        "heartrate": np.broadcast_to(hr, time.shape).astype(float),
+    }
+
+
+@pytest.fixture
+def batch():
+    return ActivityBatch.from_streams(
+        [
+            steady_run(3000, 1000 / 300, 150),
+            steady_run(600, 4.0, np.linspace(140, 180, 601)),
+        ]
+    )
+
+
+def test_splits_and_best_efforts(batch):
+    times, offsets = analytics.splits(batch)
+
+    assert offsets.tolist() == [0, 10, 12]
+    np.testing.assert_allclose(times[:10], 300)
+    np.testing.assert_allclose(times[10:], 250)
+    np.testing.assert_allclose(analytics.best_time(batch, 5000), [1500, np.nan])
+    np.testing.assert_allclose(analytics.best_speed(batch, 300), [1000 / 300, 4.0])
+
+
+def test_heart_rate_metrics(batch):
+    profile = AthleteProfile()
+
+    zones = analytics.hr_zone_time(batch, profile)
+
+    assert zones.shape == (2, 5)
+    assert zones[0].tolist() == [0, 3000, 0, 0, 0]
+    assert zones[1].sum() == 600
+    np.testing.assert_allclose(analytics.average_hr(batch), [150, 160], atol=0.1)
+    trimp = analytics.trimp(batch, profile)
+    assert trimp[0] > 0 and trimp[1] > 0
+    hour_at_threshold = ActivityBatch.from_streams([steady_run(3600, 3.0, 170)])
+    np.testing.assert_allclose(
+        analytics.hr_tss(hour_at_threshold, profile), [100], rtol=1e-3
+    )
+
+
+def test_decoupling_reflects_heart_rate_drift(batch):
+    drift = analytics.decoupling(batch)
+
+    assert drift[0] == pytest.approx(0, abs=1e-9)
+    assert drift[1] > 5
+
+
+def test_grade_adjusted_speed():
+    flat = steady_run(600, 3.0, 150)
+    hill = {**flat, "grade_smooth": np.full(601, 8.0)}
+    batch = ActivityBatch.from_streams([flat])
+    climbing = ActivityBatch.from_streams([hill])
+
+    assert analytics.grade_factor(np.array([0.0]))[0] == pytest.approx(1.0)
+    assert analytics.grade_adjusted_speed(batch)[0] == pytest.approx(3.0)
+    assert analytics.grade_adjusted_speed(climbing)[0] > 3.5
+    profile = AthleteProfile(threshold_speed=3.0)
+    tss = analytics.running_tss(batch, profile)
+    assert tss[0] == pytest.approx(600 / 3600 * 100)
+
+
+def test_batch_matches_single_activities(batch):
+    runs = [steady_run(3000, 1000 / 300, 150), steady_run(600, 4.0, 160)]
+
+    together = analytics.summarize(ActivityBatch.from_streams(runs))
+    alone = [analytics.summarize(ActivityBatch.from_streams([run]))[0] for run in runs]
+
+    assert together == alone
+
+
+def test_summary_feeds_workout_analysis(batch):
+    summary = analytics.summarize(batch)[0]
+
+    assert summary["avg_pace"] == "5:00/km"
+    assert summary["distance_km"] == 10.0
+    assert summary["best_efforts"]["5km"] == "25:00"
+    prompt = WORKOUT_ANALYSIS.format(
+        user_goal="Sub 50 10k", workout_data=analytics.format_summary(summary)
+    )
+    assert "avg_pace: 5:00/km" in prompt
+    assert "splits: 5:00 5:00" in prompt
+
+
+def test_from_store_and_missing_heart_rate(tmp_path):
+    store = StreamStore(tmp_path)
+    store.write(1, 1, steady_run(600, 3.0, 150))
+    run = steady_run(300, 3.0, 150)
+    del run["heartrate"]
+    store.write(1, 2, run)
+
+    batch = ActivityBatch.from_store(store, 1, [1, 2])
+
+    assert batch.heartrate is None
+    summaries = analytics.summarize(batch)
+    assert "avg_hr" not in summaries[0]
+    assert summaries[1]["distance_km"] == 0.9
+
+
+def test_activities_without_distance_get_zeros(tmp_path):
+    store = StreamStore(tmp_path)
+    store.write(1, 1, steady_run(600, 3.0, 150))
+    treadmill = steady_run(300, 3.0, 150)
+    del treadmill["distance"]
+    store.write(1, 2, treadmill)
+
+    batch = ActivityBatch.from_store(store, 1, [1, 2])
+
+    assert np.array_equal(batch.distance[batch.offsets[1] :], np.zeros(301))
+    summaries = analytics.summarize(batch)
+    assert summaries[0]["distance_km"] == 1.8
+    assert summaries[1]["distance_km"] == 0
+    assert summaries[1]["avg_hr"] == 150
+    # Also when no activity has a distance stream
+    alone = ActivityBatch.from_store(store, 1, [2])
+    assert analytics.summarize(alone)[0]["distance_km"] == 0
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from data.vector_store.ann import IVFIndex
+from data.vector_store.indexed import IndexedStore
+from data.vector_store.memory import NumpyStore
+from data.vector_store.segments import SegmentStore
+
+
+def clustered(n, dim=16, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)) * 5
+    labels = rng.integers(clusters, size=n)
+    return (centers[labels] + rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_index_trains_after_train_size():
+    index = IVFIndex(n_lists=8, train_size=100, seed=0)
+    data = clustered(150)
+    index.add_many([str(i) for i in range(99)], data[:99])
+    assert not index.is_trained
+
+    index.add_many([str(i) for i in range(99, 150)], data[99:])
+    assert index.is_trained
+    assert len(index) == 150
+
+
+def test_full_probe_matches_exact_search():
+    data = clustered(2000)
+    index = IVFIndex(n_lists=16, seed=0)
+    index.add_many([str(i) for i in range(len(data))], data)
+    index.train()
+
+    query = data[7] + 0.01
+    exact = np.argsort(((data - query) ** 2).sum(axis=1))[:10]
+    hits = index.search(query, limit=10, n_probe=16)
+    assert [id for id, _ in hits] == [str(i) for i in exact]
+
+
+def test_default_probe_has_high_recall():
+    data = clustered(5000)
+    index = IVFIndex(n_lists=32, n_probe=4, seed=0)
+    index.add_many([str(i) for i in range(len(data))], data)
+    index.train()
+
+    rng = np.random.default_rng(1)
+    recall = []
+    for q in rng.choice(len(data), 20, replace=False):
+        query = data[q] + 0.1
+        exact = set(np.argsort(((data - query) ** 2).sum(axis=1))[:10].astype(str))
+        approx = {id for id, _ in index.search(query, limit=10)}
+        recall.append(len(exact & approx) / 10)
+    assert np.mean(recall) >= 0.9
+
+
+def test_remove_and_replace():
+    index = IVFIndex(n_lists=4, train_size=8, seed=0)
+    index.add_many([str(i) for i in range(10)], clustered(10))
+    index.remove("3")
+    index.add("5", np.zeros(16))
+
+    assert "3" not in index
+    assert len(index) == 9
+    assert index.search(np.zeros(16), limit=1, n_probe=4)[0][0] == "5"
+
+
+@pytest.mark.asyncio
+async def test_indexed_store_keeps_index_in_sync():
+    index = IVFIndex(n_lists=4, train_size=8, seed=0)
+    store = IndexedStore(NumpyStore(), index)
+    assert store.index is index  # Empty, but not replaced by a default index
+    ids = await store.add_many(list(clustered(20)))
+    await store.delete(ids[0])
+    await store.update(ids[1], embedding=np.full(16, 100.0))
+
+    assert len(store.index) == 19
+    results = await store.search(np.full(16, 100.0), limit=1, n_probe=4)
+    assert results[0]["id"] == ids[1]
+
+
+@pytest.mark.asyncio
+async def test_indexed_store_over_a_reopened_store(tmp_path):
+    data = clustered(50)
+    ids = await SegmentStore(tmp_path).add_many(list(data))
+    backend = SegmentStore(tmp_path)
+    store = IndexedStore(backend, IVFIndex(n_lists=4, train_size=20, seed=0))
+    queries = data[:3] + 0.1
+
+    def ranked(results):
+        return [[record.id for record in hits] for hits in results]
+
+    expected = ranked(await backend.search_many(queries, limit=5))
+    # The empty index does not cover the backend, so search is exact
+    assert ranked(await store.search_many(queries, limit=5)) == expected
+    assert [r.id for r in await store.search(queries[0], limit=5)] == expected[0]
+
+    await store.reindex(ids)
+    assert len(store.index) == 50
+    assert ranked(await store.search_many(queries, limit=5, n_probe=4)) == expected
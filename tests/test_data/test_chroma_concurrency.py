@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional
+
+import pytest
+
+from data.vector_store.local import ChromaStore
+from llm.base import LLMProvider, LLMResponse
+
+
+class SlowCollection:
+    """Stand-in for a Chroma collection whose queries block their thread."""
+
+    name = "slow"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def query(self, query_embeddings, n_results, where, include):
+        self.calls += 1
+        time.sleep(self.delay)
+        empty = [[] for _ in query_embeddings]
+        return {
+            "ids": empty,
+            "embeddings": empty,
+            "metadatas": empty,
+            "distances": empty,
+        }
+
+
+class TickingProvider(LLMProvider):
+    """LLM stand-in that streams a chunk every ``interval`` seconds."""
+
+    def __init__(self, chunks: int, interval: float):
+        self.chunks = chunks
+        self.interval = interval
+
+    async def generate(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> LLMResponse:
+        return LLMResponse(content="".join([c async for c in self.stream(prompt)]))
+
+    async def stream(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> AsyncIterator[str]:
+        for i in range(self.chunks):
+            await asyncio.sleep(self.interval)
+            yield str(i)
+
+
+def slow_store(delay: float, max_concurrency: int) -> ChromaStore:
+    store = ChromaStore(collection_name="slow", max_concurrency=max_concurrency)
+    store._collection = SlowCollection(delay)
+    return store
+
+
+@pytest.mark.asyncio
+async def test_searches_and_llm_stream_overlap():
+    store = slow_store(delay=0.3, max_concurrency=3)
+    provider = TickingProvider(chunks=5, interval=0.05)
+    chunk_times = []
+
+    async def consume_stream():
+        async for _ in provider.stream("prompt"):
+            chunk_times.append(time.perf_counter())
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(store.search([1.0, 0.0]) for _ in range(3)), consume_stream()
+    )
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    # Sequential execution would take 3 * 0.3 + 5 * 0.05 = 1.15s
+    assert elapsed < 0.6
+    # The stream kept producing chunks while the searches were blocked in Chroma
+    assert chunk_times[-1] - start < 0.3
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency_bounds_parallel_calls():
+    store = slow_store(delay=0.1, max_concurrency=1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(store.search([1.0, 0.0]) for _ in range(3)))
+    elapsed = time.perf_counter() - start
+    store.close()
+
+    assert elapsed >= 0.3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_search_does_not_run():
+    store = slow_store(delay=0.2, max_concurrency=1)
+
+    running = asyncio.ensure_future(store.search([1.0, 0.0]))
+    queued = asyncio.ensure_future(store.search([1.0, 0.0]))
+    await asyncio.sleep(0.05)
+    queued.cancel()
+
+    await running
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    store.close()
+
+    assert store._collection.calls == 1
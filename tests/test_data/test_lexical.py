@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from data.vector_store.hybrid import HybridStore
+from data.vector_store.lexical import BM25Index, tokenize
+from data.vector_store.memory import NumpyStore
+
+NOTES = {
+    "1": "Easy run, left achilles felt tight after the hills",
+    "2": "Tempo 3x2km at 4:05 pace, felt strong",
+    "3": "Long run along the river, legs heavy",
+    "4": "Intervals 6x800m, achilles sore on the last two reps, achilles again",
+}
+
+
+def test_tokenize_drops_case_punctuation_and_stopwords():
+    assert tokenize("Felt STRONG at 4:05!") == ["felt", "strong", "4", "05"]
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity():
+    index = BM25Index()
+    for id, text in NOTES.items():
+        index.add(id, text)
+
+    hits = index.search("achilles")
+    assert [id for id, _ in hits] == ["4", "1"]
+    assert hits[0][1] > hits[1][1] > 0
+    # "run" is in half the notes, "river" in one, so "river" decides
+    assert index.search("river run")[0][0] == "3"
+    assert index.search("marathon") == []
+
+
+def test_bm25_incremental_add_replace_and_remove():
+    index = BM25Index()
+    for id, text in NOTES.items():
+        index.add(id, text)
+    index.search("achilles")  # Cache the posting arrays
+
+    index.remove("4")
+    index.add("1", "Recovery jog, no pain")
+    index.add("5", "Achilles fine on the track")
+    assert len(index) == 4
+    assert "4" not in index
+    assert [id for id, _ in index.search("achilles")] == ["5"]
+    assert [id for id, _ in index.search("pain")] == ["1"]
+
+    with pytest.raises(KeyError):
+        index.remove("4")
+    index.clear()
+    assert len(index) == 0 and index.search("achilles") == []
+
+
+@pytest.fixture
+async def store():
+    store = HybridStore(NumpyStore())
+    rng = np.random.default_rng(0)
+    ids = list(NOTES)
+    await store.add_many(
+        list(rng.normal(size=(len(ids), 8)).astype(np.float32)),
+        [{"text": NOTES[id], "kind": "note"} for id in ids],
+        ids,
+    )
+    await store.add(rng.normal(size=8), {"kind": "feedback"}, id="6")
+    return store
+
+
+@pytest.mark.asyncio
+async def test_search_text_follows_writes(store):
+    results = await store.search_text("achilles", include=["metadata", "distance"])
+    assert [r.id for r in results] == ["4", "1"]
+    assert results[0].distance < results[1].distance < 0
+
+    await store.update("1", metadata={"text": "Achilles rehab drills"})
+    await store.update("6", metadata={"text": "Coach: keep the achilles work going"})
+    await store.delete("4")
+    results = await store.search_text("achilles", include=[])
+    assert {r.id for r in results} == {"1", "6"}
+    assert results[0].metadata is None and results[0].distance is None
+
+    await store.update("6", metadata={"kind": "feedback"})
+    assert [r.id for r in await store.search_text("achilles")] == ["1"]
+
+
+@pytest.mark.asyncio
+async def test_search_text_applies_filter(store):
+    await store.update("6", metadata={"text": "Achilles looks better", "kind": "fb"})
+    results = await store.search_text(
+        "achilles", limit=1, metadata_filter={"kind": "fb"}
+    )
+    assert [r.id for r in results] == ["6"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_rankings(store):
+    query = (await store.get("3", include=["embedding"])).embedding
+    vector = [r.id for r in await store.search(query, limit=6, include=[])]
+    assert vector[0] == "3"
+
+    fused = await store.hybrid_search("achilles", query, limit=3)
+    # Notes ranked by both searches come before notes ranked by one
+    assert fused[0].id in {"1", "4"} and "3" in [r.id for r in fused]
+    assert all(r.distance < 0 for r in fused)
+    assert [r.id for r in await store.hybrid_search("achilles")] == ["4", "1"]
+
+
+@pytest.mark.asyncio
+async def test_hits_and_reindex_are_fetched_in_batches(store, monkeypatch):
+    calls = []
+    get_many = store.store.get_many
+    monkeypatch.setattr(
+        store.store,
+        "get_many",
+        lambda ids, **kw: calls.append(ids) or get_many(ids, **kw),
+    )
+    results = await store.search_text(
+        "achilles", limit=1, metadata_filter={"kind": "note"}
+    )
+    assert [r.id for r in results] == ["4"]
+    assert calls == [["4", "1"]]
+
+    store.lexical.clear()
+    await store.reindex(["1", "2", "3", "4", "6"])
+    assert len(calls) == 2 and len(store.lexical) == 4
+    assert [r.id for r in await store.search_text("achilles")] == ["4", "1"]
@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from data.vector_store.memory import NumpyStore
+from data.vector_store.metadata_index import MetadataIndex
+from data.vector_store.segments import SegmentStore
+from data.vector_store.utils import matches_filter
+
+FILTERS = [
+    {"type": "tempo"},
+    {"type": {"$in": ["tempo", "long"]}},
+    {"date": {"$gte": "2022-01-01", "$lt": "2022-03-01"}},
+    {"date": "2022-05-05"},
+    {"date": {"$gt": 5}},
+    {"type": "easy", "date": {"$gt": "2023-01-01"}},
+    {"athlete": {"$gte": 1, "$lt": 2}},
+    {"distance_km": {"$gt": 30.0}},
+    {"type": {"$ne": "easy"}},
+    {"$or": [{"type": "race"}, {"avg_hr": {"$gte": 170}}]},
+    {"$and": [{"type": "tempo"}, {"pace_s": {"$lte": 300}}]},
+    {"type": {"$nin": ["easy", "long"]}, "athlete": 2},
+    {"tags": ["hills"]},
+    {"missing": 1},
+]
+
+
+def workouts(n, seed=0):
+    metadata = synthetic.workouts(n, np.random.default_rng(seed))
+    for i, m in enumerate(metadata):
+        if i % 7 == 0:
+            del m["date"]
+        if i % 11 == 0:
+            m["tags"] = ["hills"]
+    return metadata
+
+
+def expected(ids, metadata, metadata_filter):
+    return sorted(
+        i for i, m in zip(ids, metadata) if matches_filter(m, metadata_filter)
+    )
+
+
+def test_lookup_answers_indexed_conditions_exactly():
+    metadata = workouts(500)
+    index = MetadataIndex(range_fields=["date"], max_categories=100)
+    index.add_many(0, metadata)
+
+    rows, exact = index.lookup({"type": "tempo", "date": {"$gte": "2022-01-01"}})
+    assert exact
+    assert rows.tolist() == [
+        i
+        for i, m in enumerate(metadata)
+        if m["type"] == "tempo" and m.get("date", "") >= "2022-01-01"
+    ]
+
+    # Distances have more distinct values than max_categories
+    rows, exact = index.lookup({"type": "tempo", "distance_km": {"$gt": 30.0}})
+    assert not exact
+    assert rows.tolist() == [i for i, m in enumerate(metadata) if m["type"] == "tempo"]
+    assert index.lookup({"distance_km": 10.0}) == (None, False)
+
+    with pytest.raises(ValueError):
+        index.lookup({"type": {"$regex": "t.*"}})
+
+
+@pytest.mark.asyncio
+async def test_numpy_store_index_follows_writes():
+    metadata = workouts(2000)
+    ids = [f"w{i}" for i in range(len(metadata))]
+    vectors = synthetic.embeddings(len(ids), 8, seed=0)
+    store = NumpyStore()
+    await store.add_many(list(vectors), metadata, ids)
+    rng = random.Random(0)
+
+    for _ in range(3):
+        for metadata_filter in FILTERS:
+            results = await store.search(vectors[0], len(store), metadata_filter)
+            current = [store._metadata[store._rows[id]] for id in store._ids]
+            assert sorted(r.id for r in results) == expected(
+                store._ids, current, metadata_filter
+            )
+
+        await store.delete_many(rng.sample(list(store._rows), 100))
+        await store.add_many(
+            list(vectors[:50]),
+            [{"type": "tempo", "date": f"2022-02-{d + 1:02d}"} for d in range(50)],
+        )
+        await store.update_many(
+            rng.sample(list(store._rows), 20),
+            metadata=[{"type": "race", "date": "2022-02-02"}] * 20,
+        )
+
+
+@pytest.mark.asyncio
+async def test_segment_store_filters_with_index(tmp_path):
+    metadata = workouts(1000)
+    ids = [f"w{i}" for i in range(len(metadata))]
+    vectors = synthetic.embeddings(len(ids), 8, seed=0)
+    store = SegmentStore(tmp_path, segment_rows=400)
+    await store.add_many(list(vectors[:600]), metadata[:600], ids[:600])
+    await store.search(vectors[0], 5, {"type": "tempo"})  # Builds the indexes
+    await store.add_many(list(vectors[600:]), metadata[600:], ids[600:])
+    await store.delete_many(ids[::5])
+
+    live = [(id, m) for i, (id, m) in enumerate(zip(ids, metadata)) if i % 5]
+    for metadata_filter in FILTERS:
+        results = await store.search(vectors[0], len(ids), metadata_filter)
+        assert sorted(r.id for r in results) == expected(
+            [id for id, _ in live], [m for _, m in live], metadata_filter
+        )
+
+    results = await store.search_many(vectors[:2], 3, {"type": "tempo"})
+    assert all(r.metadata["type"] == "tempo" for hits in results for r in hits)
+    assert [len(hits) for hits in results] == [3, 3]
@@ -1,6 +1,8 @@
+import pytest
+
+from llm.prompts import ContextInjector, PromptTemplate
 from llm.prompts.templates import TRAINING_PLAN, WORKOUT_ANALYSIS
 
-# Test workout analysis
 workout_data = {
     "distance": "10km",
     "time": "50min",
@@ -10,14 +12,74 @@ workout_data = {
 user_goal = "I want to run marathon under 4 hours"
 context = "Last 5 workouts show steady 45-55min 10k runs"
 
-analysis = WORKOUT_ANALYSIS.format(
-    workout_data=workout_data, user_goal=user_goal, context=context
-)
-print("Workout Analysis Template:\n", analysis, "\n")
-
-# Test training plan
-plan = TRAINING_PLAN.format(
-    user_goal="I want to run my first marathon this spring",
-    context="Current weekly mileage: 30km",
-)
-print("Training Plan Template:\n", plan)
+
+def test_workout_analysis_template():
+    analysis = WORKOUT_ANALYSIS.format(
+        workout_data=workout_data, user_goal=user_goal, context=context
+    )
+
+    assert analysis.startswith(WORKOUT_ANALYSIS.prefix)
+    assert str(workout_data) in analysis
+    assert user_goal in analysis
+    assert context in analysis
+
+
+def test_training_plan_template():
+    plan = TRAINING_PLAN.format(
+        user_goal="I want to run my first marathon this spring",
+        context="Current weekly mileage: 30km",
+        training_load="Training load: fitness (CTL) 45",
+    )
+
+    assert plan.startswith(TRAINING_PLAN.prefix)
+    assert "fitness (CTL) 45" in plan
+    assert "Current weekly mileage: 30km" in plan
+
+
+def test_templates_start_with_static_instructions():
+    for template in (WORKOUT_ANALYSIS, TRAINING_PLAN):
+        assert template.prefix.strip()
+        assert "{" not in template.prefix
+
+
+def test_prompt_template_matches_str_format():
+    text = "Pace {pace:>8} for {distance!r}, {{literal}} {pace}"
+    template = PromptTemplate(text)
+
+    assert template.variables == ("pace", "distance")
+    assert template.prefix == "Pace "
+    assert PromptTemplate("Use {{braces}} {x}").prefix == "Use {braces} "
+    assert template.format(pace="5:00", distance="10km", unused=1) == text.format(
+        pace="5:00", distance="10km"
+    )
+
+
+def test_prompt_template_validates_at_definition():
+    with pytest.raises(ValueError):
+        PromptTemplate("Positional {} field")
+    with pytest.raises(ValueError):
+        PromptTemplate("Attribute {workout.distance}")
+    with pytest.raises(ValueError):
+        PromptTemplate("Conversion {distance!x}")
+    with pytest.raises(ValueError):
+        PromptTemplate("Goal: {user_goal}", input_variables=["user_goal", "context"])
+    with pytest.raises(ValueError):
+        PromptTemplate("Goal: {user_goal}", defaults={"context": ""})
+
+
+def test_prompt_template_requires_variables_without_defaults():
+    with pytest.raises(KeyError, match="workout_data"):
+        WORKOUT_ANALYSIS.format(user_goal=user_goal)
+
+    rendered = WORKOUT_ANALYSIS.format(user_goal=user_goal, workout_data="10km")
+    assert "10km" in rendered
+
+
+def test_context_injector_renders_template():
+    injector = ContextInjector(TRAINING_PLAN)
+
+    plan = injector.inject([context], {"user_goal": user_goal})
+
+    assert plan.startswith(TRAINING_PLAN.prefix)
+    assert context in plan
+    assert injector.token_count > 0
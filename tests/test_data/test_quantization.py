@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from data.vector_store.ann import IVFIndex
+from data.vector_store.indexed import IndexedStore
+from data.vector_store.memory import NumpyStore
+from data.vector_store.quantization import (
+    Float16Quantizer,
+    Int8Quantizer,
+    ProductQuantizer,
+)
+from tests.test_data.test_ann import clustered
+
+QUANTIZERS = {
+    "float16": lambda: Float16Quantizer(),
+    "int8": lambda: Int8Quantizer(),
+    "pq": lambda: ProductQuantizer(subvectors=4, seed=0),
+}
+
+
+@pytest.mark.parametrize("kind", QUANTIZERS)
+def test_asymmetric_distances_match_decoded_vectors(kind):
+    data = clustered(1000)
+    quantizer = QUANTIZERS[kind]()
+    quantizer.train(data)
+    codes = quantizer.encode(data)
+    decoded = quantizer.decode(codes)
+    query = clustered(1, seed=1)[0]
+
+    assert codes.shape == (1000, quantizer.code_size)
+    assert codes.dtype == quantizer.dtype
+    assert np.abs(decoded - data).mean() < 0.25 * np.abs(data).mean()
+    np.testing.assert_allclose(
+        quantizer.distances(query, codes, quantizer.norms(codes)),
+        ((decoded - query) ** 2).sum(axis=1),
+        rtol=1e-3,
+        atol=1e-2,
+    )
+
+
+def test_int8_error_is_within_half_a_step():
+    data = clustered(500)
+    quantizer = Int8Quantizer()
+    quantizer.train(data)
+
+    error = np.abs(quantizer.decode(quantizer.encode(data)) - data)
+    assert (error <= quantizer.scale / 2 + 1e-5).all()
+
+
+def test_product_quantizer_needs_divisible_dimension():
+    with pytest.raises(ValueError):
+        ProductQuantizer(subvectors=5).train(clustered(300))
+
+
+@pytest.mark.parametrize("kind", QUANTIZERS)
+def test_quantized_index_uses_less_memory(kind):
+    data = clustered(2000)
+    ids = [str(i) for i in range(len(data))]
+    plain = IVFIndex(n_lists=16, train_size=1000, seed=0)
+    quantized = IVFIndex(
+        n_lists=16, train_size=1000, seed=0, quantizer=QUANTIZERS[kind]()
+    )
+    plain.add_many(ids, data)
+    quantized.add_many(ids[:500], data[:500])
+    assert not quantized.is_quantized
+    quantized.add_many(ids[500:], data[500:])
+
+    assert quantized.is_quantized
+    assert len(quantized) == 2000
+    assert quantized.nbytes < plain.nbytes * 0.75
+    # Near-duplicates of stored vectors still find them
+    hits = [quantized.search(data[i] + 0.01, limit=5)[0][0] for i in range(0, 2000, 50)]
+    assert np.mean([hit == str(i) for hit, i in zip(hits, range(0, 2000, 50))]) > 0.9
+
+    quantized.remove("7")
+    quantized.train()
+    assert "7" not in quantized and len(quantized) == 1999
+
+
+async def make_indexed(data, quantizer, rerank):
+    index = IVFIndex(n_lists=16, train_size=1000, seed=0, quantizer=quantizer)
+    store = IndexedStore(NumpyStore(), index, rerank=rerank)
+    await store.add_many(list(data), ids=[str(i) for i in range(len(data))])
+    return store
+
+
+@pytest.mark.asyncio
+async def test_indexed_store_reranks_with_exact_distances():
+    data = clustered(3000)
+    exact = NumpyStore()
+    await exact.add_many(list(data), ids=[str(i) for i in range(len(data))])
+    store = await make_indexed(data, Int8Quantizer(), rerank=4)
+
+    for query in clustered(20, seed=1):
+        expected = await exact.search(query, 5)
+        results = await store.search(query, 5, n_probe=16)
+        assert [r.id for r in results] == [r.id for r in expected]
+        assert [r.distance for r in results] == pytest.approx(
+            [r.distance for r in expected], rel=1e-4
+        )
+        assert results[0].embedding is None
+
+
+@pytest.mark.asyncio
+async def test_reranking_recovers_product_quantization_recall():
+    data = clustered(3000)
+    queries = clustered(50, seed=1)
+    exact = NumpyStore()
+    await exact.add_many(list(data), ids=[str(i) for i in range(len(data))])
+    store = await make_indexed(data, ProductQuantizer(4, seed=0), rerank=10)
+
+    async def recall():
+        found = 0
+        for query in queries:
+            expected = {r.id for r in await exact.search(query, 10)}
+            results = await store.search(query, 10, n_probe=16)
+            found += len(expected & {r.id for r in results})
+        return found / (10 * len(queries))
+
+    reranked = await recall()
+    store.rerank = 0
+    approximate = await recall()
+    assert reranked > approximate
+    assert reranked > 0.9
+
+
+@pytest.mark.asyncio
+async def test_search_many_fetches_all_candidates_at_once(monkeypatch):
+    data = clustered(2000)
+    queries = clustered(8, seed=1)
+    store = await make_indexed(data, Int8Quantizer(), rerank=4)
+    expected = [await store.search(query, 5, n_probe=16) for query in queries]
+
+    calls = []
+    get_many = store.store.get_many
+    monkeypatch.setattr(
+        store.store, "get_many", lambda *a, **kw: calls.append(a) or get_many(*a, **kw)
+    )
+    results = await store.search_many(queries, 5, n_probe=16)
+    assert len(calls) == 1
+    assert [[r.id for r in hits] for hits in results] == [
+        [r.id for r in hits] for hits in expected
+    ]
+    assert [r.distance for r in results[3]] == [r.distance for r in expected[3]]
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from data.vector_store.segments import SegmentStore
+
+
+@pytest.mark.asyncio
+async def test_reopen_persists_rows(tmp_path):
+    store = SegmentStore(tmp_path)
+    ids = await store.add_many(
+        [[1.0, 0.0], [0.0, 1.0]], [{"type": "A"}, {"type": "B"}], ["a", "b"]
+    )
+
+    reopened = SegmentStore(tmp_path)
+    assert len(reopened) == 2
+    result = await reopened.get(ids[1])
+    assert np.allclose(result["embedding"], [0.0, 1.0])
+    assert result["metadata"] == {"type": "B"}
+
+
+@pytest.mark.asyncio
+async def test_appends_roll_over_into_new_segments(tmp_path):
+    store = SegmentStore(tmp_path, segment_rows=3)
+    await store.add_many([[float(i), 0.0] for i in range(7)])
+
+    assert [s.rows for s in store._segments] == [3, 3, 1]
+    results = await store.search([6.0, 0.0], limit=2, include=["embedding"])
+    assert [np.asarray(r["embedding"])[0] for r in results] == [6.0, 5.0]
+
+
+@pytest.mark.asyncio
+async def test_delete_and_update_write_tombstones(tmp_path):
+    store = SegmentStore(tmp_path)
+    await store.add_many([[1.0, 0.0], [0.0, 1.0]], ids=["a", "b"])
+    await store.delete("a")
+    await store.update("b", embedding=[0.0, 2.0])
+
+    reopened = SegmentStore(tmp_path)
+    with pytest.raises(KeyError):
+        await reopened.get("a")
+    assert np.allclose((await reopened.get("b"))["embedding"], [0.0, 2.0])
+    assert [r["id"] for r in await reopened.search([1.0, 0.0])] == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_compact_drops_tombstoned_rows(tmp_path):
+    store = SegmentStore(tmp_path, segment_rows=2)
+    ids = await store.add_many([[float(i), 1.0] for i in range(5)])
+    for id in ids[:3]:
+        await store.delete(id)
+    assert store.needs_compaction()
+
+    await store.compact()
+
+    assert [(s.rows, s.deleted) for s in store._segments] == [(2, 0)]
+    assert len(list(tmp_path.glob("*.vec"))) == 1
+    reopened = SegmentStore(tmp_path)
+    assert sorted(r["id"] for r in await reopened.search([0.0, 0.0])) == sorted(ids[3:])
+
+
+@pytest.mark.asyncio
+async def test_read_only_reader_sees_new_writes(tmp_path):
+    writer = SegmentStore(tmp_path)
+    await writer.add([1.0, 0.0], id="a")
+    reader = SegmentStore(tmp_path, read_only=True)
+
+    with pytest.raises(PermissionError):
+        await reader.add([0.0, 1.0])
+
+    await writer.add([0.0, 1.0], id="b")
+    results = await reader.search([0.0, 1.0], limit=1)
+    assert results[0]["id"] == "b"
+
+
+def fail_manifest_save(*args):
+    raise OSError("disk full")
+
+
+@pytest.mark.asyncio
+async def test_failed_manifest_save_leaves_no_orphaned_rows(tmp_path, monkeypatch):
+    store = SegmentStore(tmp_path)
+    await store.add_many([[1.0, 0.0], [0.0, 1.0]], ids=["a", "b"])
+    save = SegmentStore._save_manifest
+    monkeypatch.setattr(SegmentStore, "_save_manifest", fail_manifest_save)
+    with pytest.raises(OSError):
+        await store.add([1.0, 1.0], {"n": "c"}, id="c")
+    with pytest.raises(OSError):
+        await store.delete("a")
+    monkeypatch.setattr(SegmentStore, "_save_manifest", save)
+
+    # The failed writes were rolled back on disk and in the open store
+    assert (tmp_path / "seg-000000.vec").stat().st_size == 2 * 2 * 4
+    assert not (tmp_path / "seg-000000.del").stat().st_size
+    await store.add([2.0, 2.0], {"n": "d"}, id="d")
+    assert (await store.get("d"))["metadata"] == {"n": "d"}
+    assert len(store) == 3
+
+
+@pytest.mark.asyncio
+async def test_reopening_after_a_crash_truncates_to_the_manifest(tmp_path):
+    store = SegmentStore(tmp_path)
+    await store.add_many([[1.0, 0.0], [0.0, 1.0]], ids=["a", "b"])
+    # A crash between writing the files and saving the manifest
+    store._segments[0].append(
+        np.array([[1.0, 1.0]], dtype=np.float32), [{"id": "c", "metadata": None}]
+    )
+    store._new_segment().append(
+        np.array([[5.0, 5.0]], dtype=np.float32), [{"id": "e", "metadata": None}]
+    )
+
+    reopened = SegmentStore(tmp_path)
+    assert not list(tmp_path.glob("seg-000001.*"))
+    await reopened.add([2.0, 2.0], {"n": "d"}, id="d")
+    assert (await reopened.get("d"))["metadata"] == {"n": "d"}
+    assert np.allclose((await reopened.get("d"))["embedding"], [2.0, 2.0])
+    with pytest.raises(KeyError):
+        await reopened.get("c")
+    results = await reopened.search([1.0, 1.0], limit=5)
+    assert sorted(r["id"] for r in results) == ["a", "b", "d"]
+
+
+@pytest.mark.asyncio
+async def test_lookups_only_read_the_segments_they_need(tmp_path):
+    store = SegmentStore(tmp_path, segment_rows=2)
+    await store.add_many([[float(i), 0.0] for i in range(5)], ids=list("abcde"))
+
+    reopened = SegmentStore(tmp_path)
+    await reopened.get("e")
+    assert [s._locations is not None for s in reopened._segments] == [
+        False,
+        False,
+        True,
+    ]
+    assert all(s._entries is None for s in reopened._segments)
+    await reopened.get("a")
+    assert all(s._locations is not None for s in reopened._segments)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from data.streams import StreamStore, from_strava
+
+
+def synthetic_streams(samples: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return {
+        "time": np.arange(samples) * 2,
+        "heartrate": rng.integers(100, 190, samples),
+        "velocity_smooth": rng.uniform(2.5, 4.5, samples),
+        "latlng": rng.uniform(-90, 90, (samples, 2)),
+    }
+
+
+@pytest.fixture
+def streams_store(tmp_path):
+    store = StreamStore(tmp_path, chunk_size=100)
+    yield store
+    store.close()
+
+
+def test_write_and_read_round_trip(streams_store):
+    streams = synthetic_streams(1050)
+    streams_store.write(1, 10, streams)
+
+    result = streams_store.read(1, 10)
+
+    assert sorted(result) == sorted(streams)
+    assert result["heartrate"].dtype == np.uint8
+    assert result["velocity_smooth"].dtype == np.float32
+    np.testing.assert_array_equal(result["heartrate"], streams["heartrate"])
+    np.testing.assert_array_equal(result["latlng"], streams["latlng"])
+    np.testing.assert_allclose(
+        result["velocity_smooth"], streams["velocity_smooth"], rtol=1e-6
+    )
+    assert streams_store.activities(1) == [10]
+    assert (1, 10) in streams_store and (2, 10) not in streams_store
+
+
+def test_values_that_do_not_fit_keep_a_wider_dtype(streams_store):
+    streams_store.write(1, 10, {"heartrate": [120, 300], "cadence": [85.5, 90.0]})
+
+    result = streams_store.read(1, 10)
+
+    assert result["heartrate"].tolist() == [120, 300]
+    assert result["cadence"].tolist() == [85.5, 90.0]
+
+
+def test_range_read_decodes_only_overlapping_chunks(streams_store, monkeypatch):
+    streams = synthetic_streams(1000)
+    streams_store.write(1, 10, streams)
+    decoded = []
+    original = streams_store._decode
+
+    def spy(*args):
+        decoded.append(args[-2:])
+        return original(*args)
+
+    monkeypatch.setattr(streams_store, "_decode", spy)
+    result = streams_store.read(1, 10, ["heartrate"], start=450, end=650)
+
+    mask = (streams["time"] >= 450) & (streams["time"] < 650)
+    np.testing.assert_array_equal(result["heartrate"], streams["heartrate"][mask])
+    # Samples are 2s apart, so 450-650s lies in chunks 2 and 3 of 100 samples
+    assert decoded == [(2, 4), (2, 4)]
+
+
+def test_read_many_concatenates_with_offsets(streams_store):
+    lengths = [300, 0, 150]
+    for activity, samples in enumerate(lengths):
+        streams_store.write(1, activity, synthetic_streams(samples, seed=activity))
+    streams_store.write(1, 3, {"time": [0, 1]})
+
+    values, offsets = streams_store.read_many(1, [2, 0, 1, 3], "heartrate")
+
+    assert offsets.tolist() == [0, 150, 450, 450, 450]
+    np.testing.assert_array_equal(
+        values[:150], synthetic_streams(150, seed=2)["heartrate"]
+    )
+    with pytest.raises(KeyError):
+        streams_store.read_many(1, [0, 99], "heartrate")
+
+
+def test_rewrite_and_delete(tmp_path):
+    store = StreamStore(tmp_path, codec="raw")
+    store.write(1, 10, {"time": [0, 1, 2], "heartrate": [100, 110, 120]})
+    store.write(1, 10, {"time": [0, 1], "heartrate": [130, 140]})
+
+    reopened = StreamStore(tmp_path)
+    assert reopened.read(1, 10)["heartrate"].tolist() == [130, 140]
+
+    reopened.delete(1, 10)
+    assert reopened.activities(1) == []
+    with pytest.raises(KeyError):
+        reopened.read(1, 10)
+
+
+def test_from_strava_accepts_both_response_shapes():
+    keyed = {"time": {"data": [0, 1]}, "heartrate": {"data": [150, 151]}}
+    listed = [
+        {"type": "time", "data": [0, 1]},
+        {"type": "heartrate", "data": [150, 151]},
+    ]
+
+    for response in (keyed, listed):
+        streams = from_strava(response)
+        assert streams["heartrate"].dtype == np.uint8
+        assert streams["time"].tolist() == [0, 1]
@@ -0,0 +1,135 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from auth.strava import StravaClient, StravaError
+from data.streams import StreamStore
+from data.sync import ActivitySync
+from data.training_load import TrainingLoadStore
+
+DAY = 24 * 3600
+
+
+def client_for(mock_strava) -> StravaClient:
+    return StravaClient("token", transport=mock_strava.transport)
+
+
+@pytest.mark.asyncio
+async def test_first_sync_fetches_every_page_and_detail(tmp_path, mock_strava):
+    for i in range(25):
+        mock_strava.add_activity(i, 1_700_000_000 + i * DAY)
+
+    async with client_for(mock_strava) as client:
+        result = await ActivitySync(client, tmp_path, per_page=10).run()
+
+    assert sorted(result.activity_ids) == list(range(25))
+    assert result.cursor == 1_700_000_000 + 24 * DAY
+    # 3 pages holding activities and up to 3 empty pages fetched concurrently
+    assert result.requests <= 25 + 6
+    sync = ActivitySync(client, tmp_path)
+    assert sync.cursor == result.cursor
+    assert sync.activity_ids() == list(range(25))
+    assert sync.load_activity(7)["detailed"] is True
+
+
+class ThrottledTailClient(StravaClient):
+    """Holds back listing pages past ``last_page``, like requests waiting on a limit"""
+
+    last_page = 3
+
+    async def list_activities(self, after=None, page=1, per_page=200):
+        if page > self.last_page:
+            await asyncio.sleep(10)
+        return await super().list_activities(after, page, per_page)
+
+
+@pytest.mark.asyncio
+async def test_short_page_cancels_later_page_requests(tmp_path, mock_strava):
+    for i in range(25):
+        mock_strava.add_activity(i, 1_700_000_000 + i * DAY)
+
+    async with ThrottledTailClient("token", transport=mock_strava.transport) as client:
+        sync = ActivitySync(client, tmp_path, per_page=10, page_concurrency=4)
+        result = await asyncio.wait_for(sync.run(), timeout=5)
+
+    listed = [r for r in mock_strava.requests if r.url.path.endswith("/activities")]
+    assert len(listed) == 3
+    assert sorted(result.activity_ids) == list(range(25))
+
+
+@pytest.mark.asyncio
+async def test_up_to_date_sync_costs_one_request(tmp_path, mock_strava):
+    mock_strava.add_activity(1, 1_700_000_000)
+    async with client_for(mock_strava) as client:
+        await ActivitySync(client, tmp_path).run()
+        result = await ActivitySync(client, tmp_path).run()
+
+    assert result.requests == 1
+    assert result.activity_ids == []
+    assert "after=1700000000" in str(mock_strava.requests[-1].url)
+
+
+@pytest.mark.asyncio
+async def test_sync_only_fetches_new_activities(tmp_path, mock_strava):
+    mock_strava.add_activity(1, 1_700_000_000)
+    async with client_for(mock_strava) as client:
+        await ActivitySync(client, tmp_path).run()
+        mock_strava.add_activity(2, 1_700_000_000 + DAY)
+        result = await ActivitySync(client, tmp_path).run()
+
+    assert result.activity_ids == [2]
+    assert result.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_sync_keeps_cursor(tmp_path, mock_strava):
+    mock_strava.add_activity(1, 1_700_000_000)
+    mock_strava.add_activity(2, 1_700_000_000 + DAY)
+    mock_strava.failing_ids.add(2)
+
+    async with client_for(mock_strava) as client:
+        sync = ActivitySync(client, tmp_path)
+        with pytest.raises(StravaError):
+            await sync.run()
+        assert sync.cursor is None
+
+        mock_strava.failing_ids.clear()
+        result = await sync.run()
+
+    assert sorted(result.activity_ids) == [1, 2]
+    assert sync.cursor == 1_700_000_000 + DAY
+
+
+@pytest.mark.asyncio
+async def test_sync_stores_streams(tmp_path, mock_strava):
+    mock_strava.add_activity(1, 1_700_000_000)
+    mock_strava.add_activity(2, 1_700_000_000 + DAY)
+    streams = StreamStore(tmp_path / "streams")
+
+    async with client_for(mock_strava) as client:
+        result = await ActivitySync(client, tmp_path, stream_store=streams).run()
+
+    assert result.requests == 1 + 2 * 2
+    assert streams.activities(1) == [1, 2]
+    hr = streams.read(1, 2, ["heartrate"], start=100, end=110)["heartrate"]
+    assert hr.tolist() == [142] * 5
+
+
+@pytest.mark.asyncio
+async def test_sync_records_training_load(tmp_path, mock_strava):
+    mock_strava.add_activity(1, 1_700_000_000)
+    mock_strava.add_activity(2, 1_700_000_000 + DAY)
+    load = TrainingLoadStore(tmp_path / "load.sqlite")
+
+    async with client_for(mock_strava) as client:
+        sync = ActivitySync(client, tmp_path, training_load=load)
+        await sync.run()
+        mock_strava.add_activity(3, 1_700_000_000 + 2 * DAY)
+        await sync.fetch(3)
+
+    history = load.history(1, date(2023, 11, 14), date(2023, 11, 16))
+    # 598 s at 3 m/s against a 4:30/km threshold
+    assert [state.tss for state in history] == pytest.approx([10.9] * 3, abs=0.05)
+    assert history[-1].ctl > history[0].ctl
+    load.close()
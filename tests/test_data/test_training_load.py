@@ -0,0 +1,98 @@
+import math
+from datetime import date, timedelta
+
+import pytest
+from typer.testing import CliRunner
+
+from cli.main import app
+from data.training_load import TrainingLoadStore, training_load_context
+from tests.conftest import LocalProvider
+
+START = date(2024, 1, 1)
+
+
+def naive_states(activities, end, ctl_days=42, atl_days=7):
+    """Recompute CTL/ATL from scratch over the whole history"""
+    daily = {}
+    for day, tss in activities.values():
+        daily[day] = daily.get(day, 0.0) + tss
+    ctl = atl = 0.0
+    states = {}
+    day = min(daily)
+    while day <= end:
+        tss = daily.get(day, 0.0)
+        ctl += (tss - ctl) * (1 - math.exp(-1 / ctl_days))
+        atl += (tss - atl) * (1 - math.exp(-1 / atl_days))
+        states[day] = (ctl, atl)
+        day += timedelta(days=1)
+    return states
+
+
+def assert_matches(store, activities, end):
+    for day, (ctl, atl) in naive_states(activities, end).items():
+        state = store.state(1, day)
+        assert state.ctl == pytest.approx(ctl)
+        assert state.atl == pytest.approx(atl)
+        assert state.tsb == pytest.approx(ctl - atl)
+
+
+def test_incremental_updates_match_full_recompute(tmp_path):
+    store = TrainingLoadStore(tmp_path / "load.sqlite")
+    activities = {}
+    for i in range(60):
+        day = START + timedelta(days=i + i // 3)
+        activities[i] = (day, 40.0 + i % 5 * 10)
+        # Appending a new day only materializes the days since the last one
+        assert store.record_many(1, [(i, day, activities[i][1])]) == day
+
+    assert_matches(store, activities, START + timedelta(days=100))
+
+
+def test_editing_past_activity_recomputes_from_that_day(tmp_path):
+    store = TrainingLoadStore(tmp_path / "load.sqlite")
+    activities = {i: (START + timedelta(days=i), 50.0) for i in range(30)}
+    store.record_many(1, [(i, d, t) for i, (d, t) in activities.items()])
+    before = store.history(1, START, START + timedelta(days=9))
+
+    activities[10] = (START + timedelta(days=12), 120.0)
+    assert store.record(1, 10, *activities[10]) == START + timedelta(days=10)
+    assert store.history(1, START, START + timedelta(days=9)) == before
+    assert_matches(store, activities, START + timedelta(days=40))
+
+    del activities[5]
+    assert store.delete(1, 5) == START + timedelta(days=5)
+    assert store.delete(1, 5) is None
+    assert_matches(store, activities, START + timedelta(days=40))
+
+
+def test_state_decays_after_last_activity(tmp_path):
+    store = TrainingLoadStore(tmp_path / "load.sqlite")
+    store.record(1, 1, START, 100.0)
+    store.record(2, 1, START, 30.0)
+
+    assert store.state(1, START - timedelta(days=1)) is None
+    last = store.state(1, START)
+    later = store.state(1, START + timedelta(days=7))
+    assert later.tss == 0.0
+    assert later.ctl == pytest.approx(last.ctl * math.exp(-7 / 42))
+    assert later.atl == pytest.approx(last.atl * math.exp(-1))
+    assert store.state(2, START).ctl < last.ctl
+
+    assert "no recorded activities" in training_load_context(store, 3, START)
+    assert "fitness (CTL)" in training_load_context(store, 1, later.day)
+
+
+def test_plan_command_reads_training_load(tmp_path, monkeypatch):
+    monkeypatch.setattr("pathlib.Path.home", lambda: tmp_path)
+    monkeypatch.setattr("cli.service.default_provider", LocalProvider)
+    store = TrainingLoadStore()
+    store.record(7, 1, date.today() - timedelta(days=1), 80.0)
+    store.close()
+
+    result = CliRunner().invoke(
+        app, ["plan", "Berlin Marathon", "2025-09-21", "--athlete-id", "7"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "fitness (CTL)" in result.output
+    assert "Berlin Marathon" in result.output
@@ -1,13 +1,24 @@
 import numpy as np
 import pytest
 
+from data.vector_store.ann import IVFIndex
+from data.vector_store.indexed import IndexedStore
 from data.vector_store.local import ChromaStore
-
-
-@pytest.fixture
-async def store():
-    """Create a fresh in-memory store for each test."""
-    store = ChromaStore(collection_name="test_collection")
+from data.vector_store.memory import NumpyStore
+from data.vector_store.segments import SegmentStore
+
+
+@pytest.fixture(params=["chroma", "numpy", "segments", "indexed"])
+async def store(request, tmp_path):
+    """Create a fresh store for each test and backend."""
+    if request.param == "chroma":
+        store = ChromaStore(collection_name="test_collection")
+    elif request.param == "segments":
+        store = SegmentStore(tmp_path / "vectors")
+    elif request.param == "indexed":
+        store = IndexedStore(NumpyStore(), IVFIndex(n_lists=4))
+    else:
+        store = NumpyStore()
     yield store
     await store.clear()
 
@@ -22,6 +33,7 @@ async def test_add_and_get(store):
     result = await store.get(id)
 
     assert len(result["embedding"]) == 3
+    assert result["embedding"].dtype == np.float32
     assert np.allclose(result["embedding"], embedding)
     assert result["metadata"] == metadata
 
@@ -79,7 +91,9 @@ async def test_search(store):
 
     # Search with vector closest to first embedding
     query = [0.9, 0.1, 0.0]
-    results = await store.search(query, limit=2)
+    results = await store.search(
+        query, limit=2, include=["embedding", "metadata", "distance"]
+    )
 
     assert len(results) == 2
     assert np.allclose(
@@ -87,6 +101,35 @@ async def test_search(store):
     )  # Closest should be first
 
 
+@pytest.mark.asyncio
+async def test_search_include_projection(store):
+    id = await store.add([1.0, 0.0, 0.0], {"type": "A"})
+
+    default = await store.search([1.0, 0.0, 0.0], limit=1)
+    assert default[0].id == id
+    assert default[0].embedding is None
+    assert default[0].metadata == {"type": "A"}
+    assert default[0].distance == pytest.approx(0.0)
+    assert default[0] == default[0]
+    assert default == await store.search([1.0, 0.0, 0.0], limit=1)
+
+    ids_only = await store.search([1.0, 0.0, 0.0], limit=1, include=[])
+    assert (ids_only[0].id, ids_only[0].metadata, ids_only[0].distance) == (
+        id,
+        None,
+        None,
+    )
+
+    record = await store.get(id, include=["metadata"])
+    assert record.embedding is None
+    assert record["metadata"] == {"type": "A"}
+    assert record == await store.get(id, include=["metadata"])
+    assert record != await store.get(id)
+
+    with pytest.raises(ValueError):
+        await store.search([1.0, 0.0, 0.0], include=["documents"])
+
+
 @pytest.mark.asyncio
 async def test_search_with_filter(store):
     embeddings = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
@@ -100,6 +143,32 @@ async def test_search_with_filter(store):
     assert results[0]["metadata"]["type"] == "B"
 
 
+@pytest.mark.asyncio
+async def test_search_with_filter_operators(store):
+    embeddings = [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.8, 0.2, 0.0], [0.7, 0.3, 0.0]]
+    metadata = [
+        {"type": "easy", "week": 1},
+        {"type": "tempo", "week": 2},
+        {"type": "long", "week": 3},
+        {"type": "tempo", "week": 4, "race": True},
+    ]
+    ids = await store.add_many(embeddings, metadata, ["a", "b", "c", "d"])
+
+    async def matching(metadata_filter):
+        results = await store.search([1.0, 0.0, 0.0], 10, metadata_filter)
+        return [r.id for r in results]
+
+    assert await matching({"week": {"$gte": 2}}) == ids[1:]
+    assert await matching({"week": {"$gt": 1, "$lte": 3}}) == ["b", "c"]
+    assert await matching({"type": {"$in": ["easy", "long"]}}) == ["a", "c"]
+    assert await matching({"type": {"$nin": ["easy", "long"]}}) == ["b", "d"]
+    assert await matching({"type": {"$ne": "tempo"}}) == ["a", "c"]
+    assert await matching({"race": {"$ne": True}}) == ["a", "b", "c"]
+    assert await matching({"type": "tempo", "week": {"$lt": 4}}) == ["b"]
+    assert await matching({"$or": [{"type": "easy"}, {"week": 4}]}) == ["a", "d"]
+    assert await matching({"type": "missing"}) == []
+
+
 @pytest.mark.asyncio
 async def test_clear(store):
     await store.add([1.0, 2.0, 3.0])
@@ -108,3 +177,97 @@ async def test_clear(store):
     # Search should return empty results
     results = await store.search([1.0, 2.0, 3.0])
     assert len(results) == 0
+
+
+@pytest.mark.asyncio
+async def test_search_many(store):
+    embeddings = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    metadata = [{"type": "A"}, {"type": "B"}, {"type": "A"}]
+    ids = await store.add_many(embeddings, metadata)
+
+    queries = np.array([[0.9, 0.1, 0.0], [0.0, 0.1, 0.9]])
+    results = await store.search_many(queries, limit=2)
+
+    assert len(results) == 2
+    assert [r["id"] for r in results[0]] == [ids[0], ids[1]]
+    assert results[1][0]["id"] == ids[2]
+
+    filtered = await store.search_many(queries, metadata_filter={"type": "A"})
+    assert [[r["id"] for r in hits] for hits in filtered] == [
+        [ids[0], ids[2]],
+        [ids[2], ids[0]],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_upsert_many(store):
+    await store.add_many(
+        [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], [{"type": "A"}, {"type": "B"}], ["a", "b"]
+    )
+
+    ids = await store.upsert_many(
+        [[0.0, 0.0, 2.0], [0.0, 0.0, 3.0]], [{"type": "C"}, {"type": "D"}], ["a", "c"]
+    )
+
+    assert ids == ["a", "c"]
+    a = await store.get("a")
+    assert np.allclose(a["embedding"], [0.0, 0.0, 2.0])
+    assert a["metadata"]["type"] == "C"
+    assert (await store.get("b"))["metadata"] == {"type": "B"}
+    assert (await store.get("c"))["metadata"] == {"type": "D"}
+
+
+@pytest.mark.asyncio
+async def test_update_many(store):
+    await store.add_many(
+        [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], [{"type": "A"}, {"type": "B"}], ["a", "b"]
+    )
+
+    with pytest.raises(KeyError):
+        await store.update_many(["a", "missing"], metadata=[{"type": "X"}] * 2)
+    assert (await store.get("a"))["metadata"] == {"type": "A"}
+
+    updated = await store.update_many(
+        ["a", "missing", "b"],
+        embeddings=[[0.0, 0.0, 1.0]] * 3,
+        on_missing="ignore",
+    )
+    assert updated == ["a", "b"]
+    for id in updated:
+        assert np.allclose((await store.get(id))["embedding"], [0.0, 0.0, 1.0])
+
+
+@pytest.mark.asyncio
+async def test_delete_many(store):
+    ids = await store.add_many([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+
+    with pytest.raises(KeyError):
+        await store.delete_many([ids[0], "missing"])
+    await store.get(ids[0])
+
+    deleted = await store.delete_many([ids[0], "missing", ids[2]], on_missing="ignore")
+    assert deleted == [ids[0], ids[2]]
+    results = await store.search([1.0, 0.0, 0.0])
+    assert [r["id"] for r in results] == [ids[1]]
+
+
+@pytest.mark.asyncio
+async def test_get_many(store):
+    ids = await store.add_many(
+        [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]],
+        [{"n": 0}, {"n": 1}, {"n": 2}],
+    )
+
+    records = await store.get_many([ids[2], ids[0]])
+    assert [r.id for r in records] == [ids[2], ids[0]]
+    assert [r.metadata for r in records] == [{"n": 2}, {"n": 0}]
+    assert records[0].embedding.dtype == np.float32
+    assert np.allclose(records[0].embedding, [0.0, 0.0, 1.0])
+
+    with pytest.raises(KeyError):
+        await store.get_many([ids[0], "missing"])
+    records = await store.get_many(
+        ["missing", ids[1]], include=["metadata"], on_missing="ignore"
+    )
+    assert [r.id for r in records] == [ids[1]]
+    assert records[0].embedding is None and records[0].metadata == {"n": 1}
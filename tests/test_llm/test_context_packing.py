@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from data.vector_store.base import VectorRecord
+from llm.cache import CachedProvider, ResponseCache
+from llm.context import ContextItem, as_items, pack_context
+from llm.gemini import GeminiProvider, GeminiTokenizer
+from llm.prompts.utils import ContextInjector
+from llm.tokenizer import MemoizedTokenizer, RegexTokenizer, Tokenizer
+
+
+class WordTokenizer(Tokenizer):
+    """One token per word, with every call recorded"""
+
+    def __init__(self):
+        self.calls = []
+
+    def count_many(self, texts):
+        self.calls.append(list(texts))
+        return [len(text.split()) for text in texts]
+
+    def count(self, text):
+        return self.count_many([text])[0]
+
+
+def words(n: int, word: str = "run") -> str:
+    return " ".join([word] * n)
+
+
+def test_regex_tokenizer_splits_digits_and_punctuation():
+    tokenizer = RegexTokenizer()
+
+    assert tokenizer.count("easy run") == 2
+    assert tokenizer.count("5:00/km") == 6
+    assert tokenizer.count("155bpm") == 4
+    assert tokenizer.count("") == 0
+
+
+def test_memoized_tokenizer_counts_each_text_once():
+    inner = WordTokenizer()
+    tokenizer = MemoizedTokenizer(inner, max_entries=2)
+
+    assert tokenizer.count_many(["a b", "c", "a b"]) == [2, 1, 2]
+    assert tokenizer.count("c") == 1
+    assert inner.calls == [["a b", "c"]]
+    assert (tokenizer.hits, tokenizer.misses) == (2, 2)
+
+    tokenizer.count("d e f")
+    tokenizer.count("a b")
+    assert inner.calls[-1] == ["a b"]
+
+
+class GatedTokenizer(WordTokenizer):
+    """WordTokenizer whose async counts wait until the gate opens"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+
+    async def acount_many(self, texts):
+        await self.gate.wait()
+        return self.count_many(texts)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_eviction_keeps_counted_hits():
+    inner = GatedTokenizer()
+    tokenizer = MemoizedTokenizer(inner, max_entries=2)
+    tokenizer.count("a")
+
+    pending = asyncio.ensure_future(tokenizer.acount_many(["a", "x y"]))
+    await asyncio.sleep(0)
+    tokenizer.count_many(["b", "c"])  # Evicts "a" while the call above waits
+    inner.gate.set()
+
+    assert await pending == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_ainject_counts_uncached_items_in_one_call():
+    inner = WordTokenizer()
+    injector = ContextInjector("{context}", tokenizer=inner)
+
+    prompt = await injector.ainject(["a b", "c", "a b"])
+    await injector.ainject(["c", "d"])
+
+    assert prompt == "a b\nc\na b"
+    assert inner.calls == [["a b", "c"], ["d"]]
+
+
+class FakeCountTokens:
+    """countTokens stand-in that only answers once two calls are in flight"""
+
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout=5)
+        self.texts = []
+        self.threads = set()
+
+    def __call__(self, text):
+        self.texts.append(text)
+        self.threads.add(threading.get_ident())
+        self.barrier.wait()
+        return SimpleNamespace(total_tokens=len(text.split()))
+
+
+@pytest.fixture
+def gemini_tokenizer(tmp_path, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    tokenizer = GeminiTokenizer(cache_path=tmp_path / "tokens.sqlite")
+    tokenizer.model = SimpleNamespace(count_tokens=FakeCountTokens())
+    yield tokenizer
+    tokenizer.close()
+
+
+@pytest.mark.asyncio
+async def test_gemini_tokenizer_counts_concurrently_off_the_event_loop(
+    gemini_tokenizer,
+):
+    count_tokens = gemini_tokenizer.model.count_tokens
+
+    # Both texts are counted at once, or the barrier times out
+    assert await gemini_tokenizer.acount_many(["a b", "c", "a b"]) == [2, 1, 2]
+    assert sorted(count_tokens.texts) == ["a b", "c"]
+    assert threading.get_ident() not in count_tokens.threads
+
+    # Later counts come from the disk cache
+    assert gemini_tokenizer.count_many(["c", "a b"]) == [1, 2]
+    assert len(count_tokens.texts) == 2
+
+
+def test_gemini_provider_supplies_its_tokenizer(tmp_path, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    provider = CachedProvider(GeminiProvider(), ResponseCache(persist=False))
+
+    assert isinstance(provider.tokenizer, GeminiTokenizer)
+    assert provider.tokenizer is provider.tokenizer
+    provider.tokenizer.close()
+
+
+def test_pack_fills_budget_by_relevance_and_skips_oversized_items():
+    items = [
+        ContextItem(words(5, "low"), score=0.1),
+        ContextItem(words(6, "best"), score=0.9),
+        ContextItem(words(8, "big"), score=0.5),
+        ContextItem(words(3, "small"), score=0.2),
+    ]
+
+    packed, used = pack_context(items, 10, WordTokenizer())
+
+    # "big" does not fit after "best" but the smaller items behind it still do
+    assert [item.text.split()[0] for item in packed] == ["best", "small"]
+    assert used == 9
+
+
+def test_plain_strings_keep_their_order_as_relevance():
+    packed, used = pack_context(
+        as_items([words(4, "a"), words(7, "b"), words(4, "c")]), 9, WordTokenizer()
+    )
+
+    assert [item.text[0] for item in packed] == ["a", "c"]
+    assert used == 8
+
+
+def test_items_from_search_results_rank_by_distance():
+    records = [
+        VectorRecord("far", metadata={"text": "far"}, distance=3.0),
+        VectorRecord("near", metadata={"text": "near"}, distance=0.5),
+    ]
+
+    packed, _ = pack_context(
+        [ContextItem.from_record(record) for record in records], 1, WordTokenizer()
+    )
+
+    assert [item.text for item in packed] == ["near"]
+
+
+def test_mmr_prefers_diverse_items():
+    items = [
+        ContextItem("first", 1.0, np.array([1.0, 0.0])),
+        ContextItem("duplicate", 0.9, np.array([1.0, 0.01])),
+        ContextItem("different", 0.5, np.array([0.0, 1.0])),
+    ]
+
+    relevance_only, _ = pack_context(items, 2, WordTokenizer())
+    diverse, _ = pack_context(items, 2, WordTokenizer(), mmr_lambda=0.5)
+
+    assert [item.text for item in relevance_only] == ["first", "duplicate"]
+    assert [item.text for item in diverse] == ["first", "different"]
+
+
+def test_mmr_requires_embeddings():
+    with pytest.raises(ValueError):
+        pack_context(as_items(["a", "b"]), 10, WordTokenizer(), mmr_lambda=0.5)
@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+import pytest
+
+from llm.base import LLMProvider
+from llm.cache import CachedProvider, ResponseCache
+from llm.embeddings import EmbeddingCache
+from tests.conftest import LocalProvider
+
+
+@pytest.mark.asyncio
+async def test_embed_many_batches_requests():
+    provider = LocalProvider(embedding_batch_size=2)
+    texts = ["easy 5k", "tempo 8k", "long run", "intervals", "recovery"]
+
+    vectors = await provider.embed_many(texts)
+
+    assert vectors.shape == (5, provider.dim)
+    assert vectors.dtype == np.float32
+    assert [len(batch) for batch in provider.embed_calls] == [2, 2, 1]
+    assert np.allclose(vectors[2], provider.vector("long run"))
+
+
+@pytest.mark.asyncio
+async def test_embed_many_deduplicates_texts(local_provider):
+    vectors = await local_provider.embed_many(["a", "b", "a"])
+
+    assert local_provider.embed_calls == [["a", "b"]]
+    assert np.allclose(vectors[0], vectors[2])
+
+
+@pytest.mark.asyncio
+async def test_cache_skips_api_calls_for_unchanged_texts(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    first = LocalProvider(embedding_cache=EmbeddingCache(path))
+    await first.embed_many(["easy 5k", "tempo 8k"])
+
+    # A new process re-indexing the same descriptions hits the disk cache
+    second = LocalProvider(embedding_cache=EmbeddingCache(path))
+    vectors = await second.embed_many(["tempo 8k", "easy 5k", "long run"])
+
+    assert second.embed_calls == [["long run"]]
+    assert second.embedding_cache.hits == 2
+    assert np.allclose(vectors[0], first.vector("tempo 8k"))
+    assert np.allclose(await second.embed("easy 5k"), first.vector("easy 5k"))
+    assert len(second.embed_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_keyed_by_model(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite")
+    provider = LocalProvider(embedding_cache=cache)
+    await provider.embed("easy 5k")
+
+    provider.embedding_model = "other-model"
+    await provider.embed("easy 5k")
+
+    assert len(provider.embed_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite", max_entries=2)
+    provider = LocalProvider(embedding_cache=cache)
+    await provider.embed("a")
+    await provider.embed("b")
+    await provider.embed("a")  # refresh "a"
+    await provider.embed("c")  # evicts "b"
+
+    assert len(cache) == 2
+    await provider.embed("a")
+    await provider.embed("b")
+    assert [batch for batch in provider.embed_calls] == [["a"], ["b"], ["c"], ["b"]]
+
+
+@pytest.mark.asyncio
+async def test_cache_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite")
+    threads = set()
+    for name in ("get_many", "set_many"):
+        method = getattr(cache._cache, name)
+
+        def record(*args, method=method):
+            threads.add(threading.get_ident())
+            return method(*args)
+
+        monkeypatch.setattr(cache._cache, name, record)
+
+    await LocalProvider(embedding_cache=cache).embed_many(["easy 5k"])
+
+    assert threads and threading.get_ident() not in threads
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_providers_without_embeddings_fail_up_front(tmp_path):
+    class TextOnly(LocalProvider):
+        _embed_batch = LLMProvider._embed_batch
+
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite")
+    provider = TextOnly(embedding_cache=cache)
+
+    assert LocalProvider().supports_embeddings
+    assert not provider.supports_embeddings
+    assert CachedProvider(
+        LocalProvider(), ResponseCache(persist=False)
+    ).supports_embeddings
+    with pytest.raises(NotImplementedError, match="does not support embeddings"):
+        await provider.embed("easy 5k")
+    assert cache.misses == 0  # Failed before looking anything up
@@ -0,0 +1,169 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from llm.base import LLMResponse
+from llm.ratelimit import RateLimiter, TokenBucket
+from tests.conftest import LocalProvider
+
+
+class Transient(Exception):
+    pass
+
+
+class FlakyProvider(LocalProvider):
+    """LocalProvider that fails some prompts and tracks requests in flight"""
+
+    retryable_errors = (Transient,)
+
+    def __init__(self, failures=None, delays=None, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = dict(failures or {})
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(
+        self, prompt: str, context: Optional[List[str]] = None
+    ) -> LLMResponse:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(prompt, 0.001))
+            failure = self.failures.get(prompt)
+            if failure is not None and failure[1] > 0:
+                self.failures[prompt] = (failure[0], failure[1] - 1)
+                raise failure[0]
+            response = await super().generate(prompt, context)
+            response.usage = {"total_tokens": 10}
+            return response
+        finally:
+            self.in_flight -= 1
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+async def collect(provider, prompts, **kwargs):
+    return [item async for item in provider.generate_many(prompts, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_generate_many_returns_every_prompt():
+    provider = FlakyProvider()
+    prompts = [f"athlete {i}" for i in range(20)]
+
+    results = await collect(provider, prompts, concurrency=3)
+
+    assert sorted(index for index, _ in results) == list(range(20))
+    for index, response in results:
+        assert response.content == f"response to: {prompts[index]}"
+    assert provider.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_generate_many_yields_in_completion_order():
+    provider = FlakyProvider(delays={"slow": 0.05})
+
+    results = await collect(provider, ["slow", "fast"], concurrency=2)
+
+    assert [index for index, _ in results] == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_generate_many_retries_retryable_errors():
+    provider = FlakyProvider(
+        failures={"a": (Transient("quota"), 2), "b": (ValueError("bad"), 1)}
+    )
+
+    results = dict(
+        await collect(provider, ["a", "b", "c"], max_retries=3, retry_delay=0)
+    )
+
+    assert results[0].content == "response to: a"
+    assert isinstance(results[1], ValueError)
+    assert results[2].content == "response to: c"
+    assert provider.prompts.count("a") == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_many_gives_up_after_max_retries():
+    provider = FlakyProvider(failures={"a": (Transient("quota"), 5)})
+
+    [(index, result)] = await collect(provider, ["a"], max_retries=2, retry_delay=0)
+
+    assert index == 0
+    assert isinstance(result, Transient)
+    assert provider.failures["a"][1] == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_many_applies_backpressure():
+    provider = FlakyProvider()
+    stream = provider.generate_many([str(i) for i in range(50)], concurrency=2)
+
+    await stream.__anext__()
+    await asyncio.sleep(0.05)
+    # Two queued results plus two in flight at most, not the whole batch
+    assert len(provider.prompts) <= 5
+
+    await stream.aclose()
+    assert provider.in_flight == 0
+
+
+def test_contexts_must_align_with_prompts():
+    provider = FlakyProvider()
+    with pytest.raises(ValueError):
+        asyncio.run(collect(provider, ["a", "b"], contexts=[["x"]]))
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill():
+    time = FakeTime()
+    bucket = TokenBucket(60, clock=time.clock, sleep=time.sleep)
+
+    for _ in range(60):
+        await bucket.acquire()
+    assert time.now == 0
+
+    await bucket.acquire(2)
+    assert time.now == pytest.approx(2.0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_reconciles_token_estimates():
+    time = FakeTime()
+    limiter = RateLimiter(tokens_per_minute=600, clock=time.clock, sleep=time.sleep)
+
+    await limiter.acquire(500)
+    # The call used far fewer tokens than estimated, so the budget is returned
+    limiter.record(500, 50)
+    await limiter.acquire(500)
+    assert time.now == 0
+
+    await limiter.acquire(600)
+    assert time.now > 0
+
+
+@pytest.mark.asyncio
+async def test_generate_many_respects_request_rate():
+    time = FakeTime()
+    limiter = RateLimiter(requests_per_minute=2, clock=time.clock, sleep=time.sleep)
+    provider = FlakyProvider()
+
+    results = await collect(provider, ["a", "b", "c", "d"], rate_limiter=limiter)
+
+    assert len(results) == 4
+    # Two requests fit the initial burst, the others wait 30s each
+    assert time.now == pytest.approx(60.0)
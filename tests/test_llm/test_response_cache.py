@@ -0,0 +1,104 @@
+import pytest
+
+from llm.cache import CachedProvider, ResponseCache
+from tests.conftest import LocalProvider
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(tmp_path / "responses.sqlite", ttl=60, clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_generate_hits_memory_tier(cache):
+    provider = LocalProvider()
+    cached = CachedProvider(provider, cache)
+
+    first = await cached.generate("analyze", context=["10k in 50min"])
+    second = await cached.generate("analyze", context=["10k in 50min"])
+
+    assert second.content == first.content
+    assert len(provider.prompts) == 1
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 0, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_key_covers_context_and_generation_params(cache):
+    provider = LocalProvider()
+    cached = CachedProvider(provider, cache)
+
+    await cached.generate("analyze", context=["10k in 50min"])
+    await cached.generate("analyze", context=["10k in 48min"])
+    provider.generation_config = {"temperature": 0.2}
+    await cached.generate("analyze", context=["10k in 50min"])
+
+    assert len(provider.prompts) == 3
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path, clock):
+    path = tmp_path / "responses.sqlite"
+    await CachedProvider(LocalProvider(), ResponseCache(path, clock=clock)).generate(
+        "plan"
+    )
+
+    provider = LocalProvider()
+    cache = ResponseCache(path, clock=clock)
+    response = await CachedProvider(provider, cache).generate("plan")
+
+    assert response.content == "response to: plan"
+    assert provider.prompts == []
+    assert cache.disk_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl(cache, clock):
+    provider = LocalProvider()
+    cached = CachedProvider(provider, cache)
+
+    await cached.generate("plan")
+    clock.now += 61
+    await cached.generate("plan")
+
+    assert len(provider.prompts) == 2
+    assert cache.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_lru_bounded(tmp_path, clock):
+    cache = ResponseCache(persist=False, max_memory_entries=2, clock=clock)
+    provider = LocalProvider()
+    cached = CachedProvider(provider, cache)
+
+    for prompt in ["a", "b", "a", "c", "b"]:
+        await cached.generate(prompt)
+
+    # "b" was evicted when "c" arrived, so it is generated twice
+    assert provider.prompts == ["a", "b", "c", "b"]
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_cached_response_as_chunks(cache):
+    provider = LocalProvider()
+    cached = CachedProvider(provider, cache, chunk_size=4)
+
+    live = [chunk async for chunk in cached.stream("analyze my long run")]
+    replay = [chunk async for chunk in cached.stream("analyze my long run")]
+
+    assert len(provider.prompts) == 1
+    assert "".join(replay) == "".join(live)
+    assert len(replay) > 1
+    assert (await cached.generate("analyze my long run")).content == "".join(live)
@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+
+import pytest
+
+from llm.cache import ResponseCache
+from utils.cache import DiskCache
+
+
+def accessed_at(path, key):
+    with sqlite3.connect(str(path)) as conn:
+        row = conn.execute("SELECT accessed_at FROM entries WHERE key = ?", (key,))
+        return row.fetchone()[0]
+
+
+def test_reads_defer_access_times_to_next_write(tmp_path):
+    now = [100.0]
+    path = tmp_path / "cache.sqlite"
+    cache = DiskCache(path, max_entries=2, clock=lambda: now[0])
+    cache.set_many([("a", b"1"), ("b", b"2")])
+
+    now[0] = 200.0
+    assert cache.get("a") == b"1"
+    assert accessed_at(path, "a") == 100.0
+
+    cache.set("c", b"3")  # Flushes the read of "a", then evicts "b"
+    assert accessed_at(path, "a") == 200.0
+    assert sorted(cache.get_many(["a", "b", "c"])) == ["a", "c"]
+    assert len(cache) == 2
+
+
+def test_entry_count_follows_replace_delete_and_expiry(tmp_path):
+    now = [100.0]
+    cache = DiskCache(tmp_path / "cache.sqlite", ttl=10, clock=lambda: now[0])
+    cache.set_many([("a", b"1"), ("b", b"2"), ("a", b"3")])
+    cache.set("b", b"4")
+    assert cache._count == len(cache) == 2
+
+    cache.delete("a")
+    now[0] = 200.0
+    assert cache.get("b") is None
+    assert cache._count == len(cache) == 0
+
+    cache.set("c", b"5")
+    cache.close()
+    assert len(DiskCache(tmp_path / "cache.sqlite")) == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_reads_disk_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "responses.sqlite")
+    await cache.aset("key", "content", None)
+    cache._memory.clear()
+
+    threads = []
+    get = DiskCache.get
+    monkeypatch.setattr(
+        DiskCache,
+        "get",
+        lambda self, key: threads.append(threading.current_thread()) or get(self, key),
+    )
+    assert (await cache.aget("key"))["content"] == "content"
+    assert threads and threads[0] is not threading.main_thread()
+    cache.close()
@@ -0,0 +1,200 @@
+import asyncio
+import gzip
+import json
+import logging
+import threading
+
+import pytest
+
+import utils.logging
+from utils.logging import (
+    CompressingRotatingFileHandler,
+    JsonFormatter,
+    SamplingFilter,
+    log_context,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def configure(tmp_path):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+
+    def configure(**kwargs):
+        kwargs.setdefault("console", False)
+        return setup_logging(log_dir=tmp_path, **kwargs)
+
+    yield configure
+    shutdown_logging()
+    for handler in list(root.handlers):
+        if handler not in handlers:
+            root.removeHandler(handler)
+    root.setLevel(level)
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_records_carry_context_and_extras(configure, tmp_path):
+    configure()
+    logger = logging.getLogger("running_coach.test")
+
+    async def handle(request_id):
+        with log_context(request_id=request_id, athlete_id=7):
+            await asyncio.sleep(0)
+            logger.info("Handled %s", "plan", extra={"duration_ms": 12})
+
+    async def main():
+        await asyncio.gather(handle("a"), handle("b"))
+
+    asyncio.run(main())
+    logger.info("Outside")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+    shutdown_logging()
+
+    records = read_records(tmp_path / "running_coach.log")[1:]
+    handled = [r for r in records if r["message"] == "Handled plan"]
+    assert sorted(r["request_id"] for r in handled) == ["a", "b"]
+    assert all(r["athlete_id"] == 7 and r["duration_ms"] == 12 for r in handled)
+    assert handled[0]["level"] == "INFO"
+    assert handled[0]["logger"] == "running_coach.test"
+    outside = next(r for r in records if r["message"] == "Outside")
+    assert "request_id" not in outside
+    failed = next(r for r in records if r["message"] == "Failed")
+    assert "ValueError: boom" in failed["exception"]
+
+
+def test_files_are_written_by_the_listener_thread(configure, tmp_path):
+    threads = []
+    listener = configure()
+    emit = listener.handlers[0].emit
+
+    def record_thread(record):
+        threads.append(threading.current_thread())
+        emit(record)
+
+    listener.handlers[0].emit = record_thread
+    logging.getLogger("running_coach.test").info("Hello")
+    shutdown_logging()
+
+    assert threads and threading.current_thread() not in threads
+
+
+def test_sampling_keeps_a_share_of_debug_records():
+    sampler = SamplingFilter({"running_coach.store": 0.25, "running_coach.store.x": 0})
+
+    def kept(name, level, n=100):
+        records = [
+            logging.LogRecord(name, level, "", 0, "msg", None, None) for _ in range(n)
+        ]
+        return sum(sampler.filter(record) for record in records)
+
+    assert kept("running_coach.store.segments", logging.DEBUG) == 25
+    assert kept("running_coach.store.x", logging.DEBUG) == 0
+    assert kept("running_coach.store", logging.WARNING) == 100
+    assert kept("running_coach.daemon", logging.DEBUG) == 100
+    with pytest.raises(ValueError):
+        SamplingFilter({"running_coach": 2})
+
+
+def test_sampling_through_setup(configure, tmp_path):
+    configure(debug=True, sample_rates={"running_coach.noisy": 0.1})
+    logger = logging.getLogger("running_coach.noisy")
+    for i in range(50):
+        logger.debug("step %d", i)
+    logger.error("failed")
+    shutdown_logging()
+
+    messages = [r["message"] for r in read_records(tmp_path / "running_coach.log")]
+    assert [m for m in messages if m.startswith("step")] == [
+        f"step {i}" for i in range(0, 50, 10)
+    ]
+    assert "failed" in messages
+
+
+def test_size_rotation_compresses_backups(tmp_path):
+    path = tmp_path / "app.log"
+    handler = CompressingRotatingFileHandler(
+        path, max_bytes=200, backup_count=2, interval=None
+    )
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("running_coach.rotation")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for i in range(20):
+            logger.warning("record %02d with some padding", i)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+        handler.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "app.log",
+        "app.log.1.gz",
+        "app.log.2.gz",
+    ]
+    with gzip.open(tmp_path / "app.log.1.gz", "rt") as f:
+        backup = [json.loads(line)["message"] for line in f]
+    current = [json.loads(line)["message"] for line in path.read_text().splitlines()]
+    assert backup and current
+    assert current[-1] == "record 19 with some padding"
+    assert int(backup[-1].split()[1]) + 1 == int(current[0].split()[1])
+
+
+def test_time_rotation(tmp_path):
+    path = tmp_path / "app.log"
+    handler = CompressingRotatingFileHandler(path, interval=3600)
+    record = logging.LogRecord("x", logging.INFO, "", 0, "msg", None, None)
+    try:
+        handler.emit(record)
+        assert not handler.shouldRollover(record)
+
+        handler.rollover_at -= 3600
+        handler.emit(record)
+    finally:
+        handler.close()
+
+    assert (tmp_path / "app.log.1.gz").exists()
+    assert path.read_text() == "msg\n"
+    assert handler.rollover_at > record.created
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_time_rotation_survives_reopening(tmp_path, monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(utils.logging, "time", clock)
+    path = tmp_path / "app.log"
+    record = logging.LogRecord("x", logging.INFO, "", 0, "msg", None, None)
+
+    # A short-lived process per record, one second apart
+    for second in range(5):
+        clock.now = 1000.0 + second
+        handler = CompressingRotatingFileHandler(path, interval=2)
+        handler.emit(record)
+        handler.close()
+
+    assert (tmp_path / "app.log.1.gz").exists()
+    assert (tmp_path / "app.log.2.gz").exists()
+    assert path.read_text() == "msg\n"
+
+
+def test_setup_again_closes_previous_handlers(configure):
+    first = configure()
+    file_handler = first.handlers[0]
+    configure()
+
+    assert file_handler.stream is None
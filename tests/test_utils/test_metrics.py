@@ -0,0 +1,125 @@
+import json
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from cli.main import app
+from data.vector_store.indexed import IndexedStore
+from data.vector_store.memory import NumpyStore
+from llm.prompts import ContextInjector
+from llm.prompts.templates import TRAINING_PLAN
+from tests.conftest import LocalProvider
+from tests.test_auth.test_credentials import TokenEndpoint, make_store, save_expiring
+from utils.metrics import Metrics, metrics
+
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+    metrics.path = None
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+
+    with registry.span("llm.generate", model="m") as span:
+        span.set(tokens=10)
+    registry.inc("llm_tokens_total", 5)
+    registry.observe("llm_first_chunk_seconds", 0.2)
+
+    assert registry.span("other") is span
+    assert registry.to_dict() == {"counters": [], "histograms": [], "spans": []}
+
+
+def test_spans_nest_and_record_latency_and_errors(tmp_path):
+    registry = Metrics(enabled=True)
+
+    with registry.span("cli.command", command="plan"):
+        with registry.span("llm.generate", model="m") as inner:
+            inner.set(cached=True)
+        with pytest.raises(KeyError):
+            with registry.span("vector_store.get", store="S"):
+                raise KeyError("missing")
+
+    (outer,) = [s for s in registry.spans() if s.name == "cli.command"]
+    assert {s.parent for s in registry.spans() if s is not outer} == {outer.id}
+    assert (
+        registry.histogram(
+            "span_seconds", span="llm.generate", model="m", cached=True
+        ).count
+        == 1
+    )
+    assert (
+        registry.counter(
+            "span_errors_total", span="vector_store.get", store="S", error="KeyError"
+        )
+        == 1
+    )
+
+    registry.inc("llm_tokens_total", 120, model="m", kind="prompt")
+    text = registry.export(tmp_path / "metrics.prom").read_text()
+    assert "# TYPE running_coach_llm_tokens_total counter" in text
+    assert 'running_coach_llm_tokens_total{kind="prompt",model="m"} 120' in text
+    assert (
+        'running_coach_span_seconds_bucket{command="plan",span="cli.command",'
+        'le="+Inf"} 1'
+    ) in text
+
+    data = json.loads(registry.export(tmp_path / "metrics.json").read_text())
+    assert len(data["spans"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_vector_store_operations_are_traced(recording):
+    store = IndexedStore(NumpyStore())
+    vectors = np.random.default_rng(0).normal(size=(20, 4)).astype(np.float32)
+
+    await store.add_many(list(vectors), ids=[str(i) for i in range(20)])
+    await store.search(vectors[0], limit=3)
+
+    for name in ("IndexedStore", "NumpyStore"):
+        assert recording.histogram(
+            "span_seconds", span="vector_store.add_many", store=name
+        )
+    assert recording.histogram(
+        "span_seconds", span="vector_store.search", store="IndexedStore"
+    )
+
+
+def test_inject_counts_context_tokens(recording):
+    injector = ContextInjector(TRAINING_PLAN)
+
+    injector.inject(["Easy 10k yesterday"], {"user_goal": "Sub-40 10k"})
+
+    assert recording.histogram("span_seconds", span="prompt.inject").count == 1
+    assert recording.counter("prompt_context_tokens_total") == injector.token_count
+    assert recording.counter("prompt_context_items_total") == 1
+
+
+def test_cli_exports_metrics_file(tmp_path, monkeypatch, recording):
+    monkeypatch.setattr("pathlib.Path.home", lambda: tmp_path)
+    monkeypatch.setattr("cli.service.default_provider", LocalProvider)
+    recording.disable()
+    monkeypatch.setenv("RUNNING_COACH_METRICS", str(tmp_path / "coach.prom"))
+
+    result = CliRunner().invoke(app, ["plan", "marathon", "2025-10-12"])
+
+    assert result.exit_code == 0, result.output
+    text = (tmp_path / "coach.prom").read_text()
+    assert 'command="plan",span="cli.command"' in text
+
+
+@pytest.mark.asyncio
+async def test_credential_refresh_is_traced(tmp_path, recording):
+    store = make_store(tmp_path, TokenEndpoint())
+    save_expiring(store)
+
+    await store.aget_valid_token()
+
+    assert recording.counter("credential_refreshes_total", outcome="ok") == 1
+    assert recording.histogram("span_seconds", span="auth.refresh", mode="async")
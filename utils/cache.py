@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# SQLite's default bound-parameter limit is 999; stay well below it
+_MAX_PARAMS = 500
+
+
+def _chunks(keys: List[str]) -> Iterator[List[str]]:
+    for start in range(0, len(keys), _MAX_PARAMS):
+        yield keys[start : start + _MAX_PARAMS]
+
+
+class DiskCache:
+    """Persistent key-value cache in a single SQLite file with LRU eviction.
+
+    Values are raw bytes. Once the cache holds more than ``max_entries`` rows
+    the least recently used ones are evicted. With a ``ttl`` set, entries
+    older than that are treated as missing and removed when they are next
+    read.
+
+    Reads do not write: access times of hits are kept in memory and written
+    with the next ``set``, once ``touch_batch`` of them are pending, or on
+    ``close``. The entry count is kept alongside the table and only
+    recounted when it says the cache is over capacity, since other
+    processes may share the file.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_entries: int = 100_000,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+        touch_batch: int = 256,
+    ):
+        """Initialize DiskCache.
+
+        Args:
+            path: SQLite file to store entries in. Parent directories are created
+            max_entries: Maximum number of entries kept before LRU eviction
+            ttl: Optional lifetime of an entry in seconds
+            clock: Time source, injectable for tests
+            touch_batch: Pending access times that force a write on read
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.touch_batch = touch_batch
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        self._touched: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Look up several keys at once. Missing keys are left out of the result."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, bytes] = {}
+        expired: List[str] = []
+        if not keys:
+            return found
+
+        now = self._clock()
+        with self._lock:
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT key, value, created_at FROM entries "
+                    f"WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self.ttl is not None and now - created_at > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = value
+            for key in found:
+                self._touched[key] = now
+            if expired:
+                self._count -= self._conn.executemany(
+                    "DELETE FROM entries WHERE key = ?", [(key,) for key in expired]
+                ).rowcount
+                for key in expired:
+                    self._touched.pop(key, None)
+            if expired or len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many([(key, value)])
+
+    def set_many(self, items: List[Tuple[str, bytes]]) -> None:
+        """Store several entries in one transaction, then evict if over capacity."""
+        if not items:
+            return
+        now = self._clock()
+        keys = list(dict.fromkeys(key for key, _ in items))
+        with self._lock:
+            existing = 0
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                existing += self._conn.execute(
+                    f"SELECT COUNT(*) FROM entries WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items],
+            )
+            self._count += len(keys) - existing
+            for key in keys:
+                self._touched.pop(key, None)
+            self._flush_touched()
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Write pending access times into the current transaction"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                """DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY accessed_at LIMIT ?
+                )""",
+                (excess,),
+            )
+            self._count -= excess
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._count -= self._conn.execute(
+                "DELETE FROM entries WHERE key = ?", (key,)
+            ).rowcount
+            self._touched.pop(key, None)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._count = 0
+            self._touched.clear()
+
+    def flush(self) -> None:
+        """Write pending access times"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
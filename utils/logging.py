@@ -1,27 +1,277 @@
+"""Queue-based logging with JSON records, rotation and sampling.
+
+Log calls only put records on a queue; a ``QueueListener`` thread formats
+them and does the file and console I/O, so async code never blocks on disk.
+Request and athlete ids set with ``log_context`` are attached to records in
+the calling thread, where the context is visible.
+"""
+
+import atexit
+import contextvars
+import gzip
+import itertools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
 
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime"}
 
-def setup_logging(debug: bool = False) -> None:
-    """Configure logging for the application."""
-    # Create logs directory in user's home
-    log_dir = Path.home() / ".running_coach" / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / "running_coach.log"
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "running_coach_log_context", default={}
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Attach fields such as ``request_id`` or ``athlete_id`` to records logged
+    inside the block, including from tasks it starts"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with context fields and ``extra`` values"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in every ``1 / rate`` low-level records of noisy loggers.
+
+    Rates apply to a logger and its children, the most specific name winning.
+    Records above ``max_level`` are always kept, so sampling never hides
+    warnings or errors.
+    """
+
+    def __init__(self, rates: Dict[str, float], max_level: int = logging.DEBUG):
+        """Initialize SamplingFilter.
+
+        Args:
+            rates: Share of records to keep per logger name, between 0 and 1
+            max_level: Highest level that is sampled
+        """
+        super().__init__()
+        for name, rate in rates.items():
+            if not 0 <= rate <= 1:
+                raise ValueError(f"Sampling rate for {name} must be in [0, 1]")
+        self.rates = rates
+        self.max_level = max_level
+        self._counters: Dict[str, Iterator[int]] = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, name: str) -> Optional[str]:
+        while name:
+            if name in self.rates:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        name = self._rate(record.name)
+        if name is None:
+            return True
+        rate = self.rates[name]
+        if rate <= 0:
+            return False
+        with self._lock:
+            counter = self._counters.setdefault(name, itertools.count())
+            return next(counter) % round(1 / rate) == 0
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that attaches the log context and defers formatting.
+
+    Only work that needs the calling thread happens here: merging the
+    message arguments, rendering tracebacks and copying context fields.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in _log_context.get().items():
+            record.__dict__.setdefault(key, value)
+        return record
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotate by size and at least every ``interval`` seconds, gzipping backups.
+
+    Backups are ``<name>.1.gz`` (newest) to ``<name>.<backup_count>.gz``.
+    With an ``interval``, the time the current file was started is kept in
+    ``<name>.started``, so the deadline holds across short-lived processes
+    that each open the log for a few records.
+    """
 
-    # Set up basic configuration
+    def __init__(
+        self,
+        filename: Union[str, Path],
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        interval: Optional[float] = 24 * 60 * 60,
+        encoding: str = "utf-8",
+    ):
+        """Initialize CompressingRotatingFileHandler.
+
+        Args:
+            filename: Log file path
+            max_bytes: Rotate before the file would grow past this size
+            backup_count: Number of compressed backups to keep
+            interval: Rotate files older than this many seconds. None disables
+            encoding: Text encoding of the log file
+        """
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding=encoding,
+        )
+        self.interval = interval
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotator
+        self.started_path = Path(self.baseFilename + ".started")
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self) -> Optional[float]:
+        if self.interval is None:
+            return None
+        started = None
+        # An empty file was just created, whatever an old sidecar says
+        if os.path.getsize(self.baseFilename) > 0:
+            try:
+                started = float(self.started_path.read_text())
+            except (FileNotFoundError, ValueError):
+                pass
+        if started is None:
+            started = self._start()
+        return started + self.interval
+
+    def _start(self) -> float:
+        """Record that the current file starts now"""
+        started = time.time()
+        self.started_path.write_text(repr(started))
+        return started
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return os.path.exists(self.baseFilename)
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        if self.interval is not None:
+            self.rollover_at = self._start() + self.interval
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def setup_logging(
+    debug: bool = False,
+    log_dir: Optional[Union[str, Path]] = None,
+    json_format: bool = True,
+    console: bool = True,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    rotation_interval: Optional[float] = 24 * 60 * 60,
+    sample_rates: Optional[Dict[str, float]] = None,
+) -> logging.handlers.QueueListener:
+    """Configure logging for the application.
+
+    Calling it again replaces the previous configuration, stopping its
+    listener and closing its handlers. The listener is stopped at exit,
+    flushing queued records.
+
+    Args:
+        debug: Log DEBUG records instead of INFO and above
+        log_dir: Directory of running_coach.log. Defaults to ~/.running_coach/logs
+        json_format: Write JSON lines to the file instead of plain text
+        console: Also log to stderr, as plain text
+        max_bytes: Rotate the log file at this size
+        backup_count: Number of compressed backups to keep
+        rotation_interval: Also rotate after this many seconds. None disables
+        sample_rates: Share of DEBUG records kept per logger, e.g.
+            ``{"running_coach.vector_store": 0.01}``
+    """
+    global _listener
+
+    shutdown_logging()
+    log_dir = Path(log_dir or Path.home() / ".running_coach" / "logs")
+    log_dir.mkdir(parents=True, exist_ok=True)
     level = logging.DEBUG if debug else logging.INFO
-    format_str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-
-    logging.basicConfig(
-        level=level,
-        format=format_str,
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(),  # Also log to console
-        ],
+    text_format = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    file_handler = CompressingRotatingFileHandler(
+        log_dir / "running_coach.log",
+        max_bytes=max_bytes,
+        backup_count=backup_count,
+        interval=rotation_interval,
     )
+    file_handler.setFormatter(JsonFormatter() if json_format else text_format)
+    handlers: list = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(text_format)
+        handlers.append(console_handler)
+
+    queue_handler = ContextQueueHandler(queue.SimpleQueue())
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, ContextQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
 
     # Create logger for the package
     logger = logging.getLogger("running_coach")
@@ -29,3 +279,17 @@ def setup_logging(debug: bool = False) -> None:
 
     # Log startup message
     logger.info("Logging initialized")
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Stop the listener thread after it has handled every queued record"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
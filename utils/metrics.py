@@ -0,0 +1,308 @@
+"""Lightweight spans, latency histograms and counters.
+
+Everything records into the module-level ``metrics`` registry, which is
+disabled by default: ``span`` then returns a shared no-op context manager
+and ``observe``/``inc`` return immediately, so instrumented code costs an
+attribute check. Set ``RUNNING_COACH_METRICS`` to a file path (``.json``
+for JSON, anything else for Prometheus text) and the CLI enables the
+registry and writes it there after each command.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+METRICS_ENV = "RUNNING_COACH_METRICS"
+PREFIX = "running_coach"
+
+# Latency buckets in seconds, from cache lookups to long generations
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """Counts of observations per bucket, with their count and sum"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+@dataclass
+class Span:
+    """A timed operation; spans started inside it record it as their parent"""
+
+    name: str
+    labels: Dict[str, str]
+    id: int
+    parent: Optional[int] = None
+    start: float = field(default_factory=time.time)
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "running_coach_span", default=None
+)
+
+
+class _NoopSpan:
+    """What ``span`` returns while metrics are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def set(self, **labels: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("metrics", "span", "_started", "_token")
+
+    def __init__(self, metrics: "Metrics", span: Span):
+        self.metrics = metrics
+        self.span = span
+
+    def __enter__(self) -> "_ActiveSpan":
+        self.span.parent = getattr(_current_span.get(), "id", None)
+        self._token = _current_span.set(self.span)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.span.duration = time.perf_counter() - self._started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Closed from another context, e.g. an abandoned async generator
+            pass
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        self.metrics._finish(self.span)
+
+    def set(self, **labels: Any) -> None:
+        """Add labels, e.g. ones only known once the operation ran"""
+        self.span.labels.update((key, str(value)) for key, value in labels.items())
+
+
+class Metrics:
+    """Registry of counters, latency histograms and recent spans.
+
+    Each finished span is observed in the ``span_seconds`` histogram, labelled
+    with its name and labels, so keep label values low-cardinality (model
+    and store names, not prompts or ids). Failed spans also count towards
+    ``span_errors_total``.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        max_spans: int = 1000,
+    ):
+        """Initialize Metrics.
+
+        Args:
+            enabled: Record from the start
+            buckets: Histogram bucket upper bounds, in the observed unit
+            max_spans: Number of most recent spans kept for export
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self.path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._next_id = 0
+
+    def enable(self, path: Optional[Union[str, Path]] = None) -> None:
+        """Start recording, exporting to ``path`` on ``export()`` if given"""
+        self.enabled = True
+        if path is not None:
+            self.path = Path(path)
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def configure_from_env(self) -> None:
+        """Enable with the export path in RUNNING_COACH_METRICS, if set"""
+        path = os.getenv(METRICS_ENV)
+        if path:
+            self.enable(path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._spans.clear()
+
+    def span(self, name: str, **labels: Any) -> Union[_ActiveSpan, _NoopSpan]:
+        """Time a block: ``with metrics.span("llm.generate", model=...):``"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        return _ActiveSpan(self, Span(name, dict(_labels(labels)), span_id))
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _finish(self, span: Span) -> None:
+        labels = {"span": span.name, **span.labels}
+        self.observe("span_seconds", span.duration, **labels)
+        if span.error is not None:
+            self.inc("span_errors_total", **labels, error=span.error)
+        with self._lock:
+            self._spans.append(span)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        return self._counters.get((name, _labels(labels)), 0)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        return self._histograms.get((name, _labels(labels)))
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": list(h.buckets),
+                        "counts": list(h.counts),
+                        "count": h.count,
+                        "sum": h.sum,
+                    }
+                    for (name, labels), h in sorted(self._histograms.items())
+                ],
+                "spans": [asdict(span) for span in self._spans],
+            }
+
+    def to_prometheus(self) -> str:
+        """Counters and histograms in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                metric = f"{PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(
+                        f"{metric}_bucket{_format_labels(labels + (('le', le),))} "
+                        f"{cumulative}"
+                    )
+                lines.append(f"{metric}_sum{_format_labels(labels)} {h.sum:g}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Optional[Union[str, Path]] = None) -> Optional[Path]:
+        """Write the metrics atomically, as JSON for ``.json`` paths.
+
+        Returns:
+            The path written, or None without a path or while disabled
+        """
+        path = Path(path) if path is not None else self.path
+        if path is None or not self.enabled:
+            return None
+        if path.suffix == ".json":
+            text = json.dumps(self.to_dict(), indent=2)
+        else:
+            text = self.to_prometheus()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text)
+        os.replace(tmp, path)
+        return path
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+metrics = Metrics()